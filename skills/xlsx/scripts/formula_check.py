@@ -10,12 +10,16 @@ Usage:
     python3 formula_check.py <input.xlsx> --report -o out # report to file
     python3 formula_check.py <input.xlsx> --sheet Sales   # limit to one sheet
     python3 formula_check.py <input.xlsx> --summary       # error counts only, no details
+    python3 formula_check.py <input.xlsx> --stream        # iterparse sheets (flat memory on huge files)
+    python3 formula_check.py <input.xlsx> --jobs 8        # check sheets in parallel worker processes
+    python3 formula_check.py <input.xlsx> --expand-shared # also check shared-formula consumer cells
 
 What it checks:
 1. Error-value cells: <c t="e"><v>#REF!</v></c> — all 7 Excel error types
 2. Broken cross-sheet references: formula references a sheet not in workbook.xml
 3. Broken named-range references: formula references a name not in workbook.xml <definedNames>
 4. Shared formula integrity: shared formula primary cell exists and has formula text
+   (consumer cells are only expanded and checked with --expand-shared)
 5. Missing <v> on t="e" cells (malformed XML)
 
 Checks NOT performed (require dynamic recalculation):
@@ -29,9 +33,19 @@ Exit code:
 
 import sys
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 import xml.etree.ElementTree as ET
-import re
 import json
+from functools import lru_cache
+from typing import IO, Iterable, Iterator
+
+from formula_tokens import (
+    TOKEN_CACHE_SIZE,
+    cell_position,
+    relative_key,
+    tokenize,
+    translate_formula,
+)
 
 # OOXML SpreadsheetML namespace
 NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
@@ -57,10 +71,10 @@ _BUILTIN_FUNCTIONS = {
 }
 
 
-def get_sheet_names(z: zipfile.ZipFile) -> dict[str, str]:
-    """Return dict of {r:id -> sheet_name} from workbook.xml."""
-    wb_xml = z.read("xl/workbook.xml")
-    wb = ET.fromstring(wb_xml)
+def get_sheet_names(z: zipfile.ZipFile, wb: ET.Element | None = None) -> dict[str, str]:
+    """Return dict of {r:id -> sheet_name} from workbook.xml (or an already-parsed root)."""
+    if wb is None:
+        wb = ET.fromstring(z.read("xl/workbook.xml"))
     rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
     sheets = {}
     for sheet in wb.findall(f".//{NSP}sheet"):
@@ -70,10 +84,10 @@ def get_sheet_names(z: zipfile.ZipFile) -> dict[str, str]:
     return sheets
 
 
-def get_defined_names(z: zipfile.ZipFile) -> set[str]:
+def get_defined_names(z: zipfile.ZipFile, wb: ET.Element | None = None) -> set[str]:
     """Return set of named ranges defined in workbook.xml <definedNames>."""
-    wb_xml = z.read("xl/workbook.xml")
-    wb = ET.fromstring(wb_xml)
+    if wb is None:
+        wb = ET.fromstring(z.read("xl/workbook.xml"))
     names = set()
     for dn in wb.findall(f".//{NSP}definedName"):
         n = dn.get("name", "")
@@ -98,25 +112,43 @@ def get_sheet_files(z: zipfile.ZipFile) -> dict[str, str]:
     return mapping
 
 
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _scan_refs(formula: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Single pass over the cached token stream: (sheet refs, candidate names)."""
+    quoted = []
+    unquoted = []
+    names = []
+    after_sheet = False
+    for tok in tokenize(formula):
+        kind = tok.kind
+        if kind == "sheet":
+            (quoted if tok.text[0] == "'" else unquoted).append(tok.value)
+            after_sheet = True
+            continue
+        if (kind == "name" and not after_sheet and len(tok.text) >= 3
+                # Exclude built-in function names (they appear without parens sometimes in array formulas)
+                and tok.text.upper() not in _BUILTIN_FUNCTIONS):
+            names.append(tok.text)
+        after_sheet = False
+    return tuple(quoted + unquoted), tuple(names)
+
+
 def extract_sheet_refs(formula: str) -> list[str]:
     """
     Extract all sheet names referenced in a formula string.
 
     Handles:
-      - 'Sheet Name'!A1  (quoted, may contain spaces)
+      - 'Sheet Name'!A1  (quoted, may contain spaces; '' unescaped to ')
       - SheetName!A1     (unquoted, no spaces)
 
+    String literals ("Total!") and error literals (#REF!) are not sheet
+    prefixes and are ignored.
+
     Returns a list of sheet name strings (may contain duplicates if the same
-    sheet is referenced multiple times in one formula).
+    sheet is referenced multiple times in one formula). Quoted names come
+    first, then unquoted ones.
     """
-    refs = []
-    # Quoted sheet names: 'Sheet Name'!
-    for m in re.finditer(r"'([^']+)'!", formula):
-        refs.append(m.group(1))
-    # Unquoted sheet names: SheetName! (not preceded by a single quote)
-    for m in re.finditer(r"(?<!')([A-Za-z_\u4e00-\u9fff][A-Za-z0-9_.·\u4e00-\u9fff]*)!", formula):
-        refs.append(m.group(1))
-    return refs
+    return list(_scan_refs(formula)[0])
 
 
 def extract_name_refs(formula: str) -> list[str]:
@@ -126,35 +158,295 @@ def extract_name_refs(formula: str) -> list[str]:
     Heuristic: identifiers that:
     - Are not preceded by a sheet reference (no "!" before them)
     - Are not followed by "(" (which would make them function calls)
-    - Match the pattern of a name (letters/underscore start, alphanumeric/underscore body)
-    - Are not single-letter column references or row references
+    - Are not inside a string literal
+    - Are at least 3 characters long and are not cell references
 
     This is approximate. False positives are possible; false negatives are rare.
     """
-    names = []
-    # Remove quoted sheet references first to avoid false matches
-    formula_clean = re.sub(r"'[^']*'![A-Z$0-9:]+", "", formula)
-    formula_clean = re.sub(r"[A-Za-z_][A-Za-z0-9_.]*![A-Z$0-9:]+", "", formula_clean)
-    # Find identifiers not followed by "(" (not function calls)
-    for m in re.finditer(r"\b([A-Za-z_][A-Za-z0-9_]{2,})\b(?!\s*\()", formula_clean):
-        candidate = m.group(1)
-        # Exclude Excel cell references like A1, B10, AA100
-        if re.fullmatch(r"[A-Z]{1,3}[0-9]+", candidate):
+    return list(_scan_refs(formula)[1])
+
+
+def iter_cells(ws_stream: IO[bytes]) -> Iterator[ET.Element]:
+    """
+    Stream the <c> elements of a worksheet without building the full tree.
+
+    Each yielded element still carries its <f>/<v> children, but it is cleared
+    as soon as the caller advances and finished rows are dropped from
+    <sheetData>, so memory stays flat regardless of sheet size. Callers must
+    not keep references to yielded elements.
+    """
+    sheet_data = None
+    for event, elem in ET.iterparse(ws_stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag == f"{NSP}sheetData":
+                sheet_data = elem
             continue
-        # Exclude built-in function names (they appear without parens sometimes in array formulas)
-        if candidate.upper() in _BUILTIN_FUNCTIONS:
+        if elem.tag == f"{NSP}c":
+            yield elem
+            elem.clear()
+        elif elem.tag == f"{NSP}row" and sheet_data is not None:
+            sheet_data.clear()
+
+
+def _formula_findings(
+    formula: str,
+    valid_sheet_names: set[str],
+    defined_names: set[str],
+) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Return (missing sheets, unknown names) referenced by a formula."""
+    sheet_refs, name_refs = _scan_refs(formula)
+    return (
+        tuple(ref for ref in sheet_refs if ref not in valid_sheet_names),
+        tuple(name for name in name_refs if name not in defined_names),
+    )
+
+
+def _report_findings(
+    results: dict,
+    sheet_name: str,
+    cell_ref: str,
+    formula: str,
+    findings: tuple[tuple[str, ...], tuple[str, ...]],
+    valid_sheet_names: set[str],
+    defined_names: set[str],
+) -> None:
+    """Append broken_sheet_ref / unknown_name_ref errors for one formula cell."""
+    missing_sheets, unknown_names = findings
+
+    # Check 2: cross-sheet references
+    for ref_sheet in missing_sheets:
+        results["errors"].append(
+            {
+                "type": "broken_sheet_ref",
+                "sheet": sheet_name,
+                "cell": cell_ref,
+                "formula": formula,
+                "missing_sheet": ref_sheet,
+                "valid_sheets": sorted(valid_sheet_names),
+            }
+        )
+        results["error_count"] += 1
+
+    # Check 3: named range references
+    # Only flag if the name is not a built-in and not a sheet-prefixed ref
+    for name_ref in unknown_names:
+        results["errors"].append(
+            {
+                "type": "unknown_name_ref",
+                "sheet": sheet_name,
+                "cell": cell_ref,
+                "formula": formula,
+                "unknown_name": name_ref,
+                "defined_names": sorted(defined_names),
+                "note": "Heuristic check — verify manually if this is a false positive",
+            }
+        )
+        results["error_count"] += 1
+
+
+def _in_range(row: int, col: int, ref: str) -> bool:
+    """True if (row, col) lies inside an A1 range like "D2:D40"."""
+    first, _, last = ref.partition(":")
+    top_left = cell_position(first)
+    bottom_right = cell_position(last or first)
+    if top_left is None or bottom_right is None:
+        return True  # unparseable range: do not second-guess it
+    return (top_left[0] <= row <= bottom_right[0]
+            and top_left[1] <= col <= bottom_right[1])
+
+
+def _check_cells(
+    sheet_name: str,
+    cells: Iterable[ET.Element],
+    valid_sheet_names: set[str],
+    defined_names: set[str],
+    results: dict,
+    expand_shared: bool = False,
+) -> None:
+    """
+    Run the per-cell checks over one worksheet, appending into results.
+
+    With expand_shared, shared-formula consumer cells are checked too. Each
+    distinct formula is only analysed once, keyed on its R1C1-style relative
+    form: consumers inherit the findings of their primary (same key by
+    definition), and copy-pasted formulas such as B2*C2 / B3*C3 share one
+    cache entry. A consumer's own A1 text is only rebuilt when it has
+    something to report.
+    """
+    # Shared formula groups seen on this sheet:
+    # si -> (primary formula, primary row, primary col, ref range, findings)
+    shared_groups: dict[str, tuple] = {}
+    # R1C1 key -> findings (expand_shared mode only)
+    findings_by_key: dict[tuple[str, ...], tuple] = {}
+
+    for cell in cells:
+        cell_ref = cell.get("r", "?")
+        cell_type = cell.get("t", "n")
+
+        # ── Check 1: error-value cell ──────────────────────────────────────
+        if cell_type == "e":
+            v_elem = cell.find(f"{NSP}v")
+            if v_elem is None:
+                # Malformed: t="e" but no <v> — record as structural issue
+                results["errors"].append(
+                    {
+                        "type": "malformed_error_cell",
+                        "sheet": sheet_name,
+                        "cell": cell_ref,
+                        "detail": "Cell has t='e' but no <v> child element",
+                    }
+                )
+                results["error_count"] += 1
+            else:
+                error_val = v_elem.text or "#UNKNOWN"
+                f_elem = cell.find(f"{NSP}f")
+                results["errors"].append(
+                    {
+                        "type": "error_value",
+                        "error": error_val,
+                        "sheet": sheet_name,
+                        "cell": cell_ref,
+                        # Include formula text if present
+                        "formula": f_elem.text if (f_elem is not None and f_elem.text) else None,
+                    }
+                )
+                results["error_count"] += 1
+
+        # ── Check 2 & 3: formulas ──────────────────────────────────────────
+        f_elem = cell.find(f"{NSP}f")
+        if f_elem is None:
             continue
-        names.append(candidate)
-    return names
 
+        f_type = f_elem.get("t", "")  # "shared", "array", or "" for normal
+        f_si = f_elem.get("si")       # shared formula group ID
+
+        # Count formulas:
+        # - Normal formulas: always count
+        # - Shared formula PRIMARY (has text + ref attribute): count once
+        # - Shared formula CONSUMER (si only, no text): do NOT count separately
+        #   (they are covered by the primary's ref range) unless expand_shared
+        if f_type == "shared" and f_elem.text is None:
+            if not expand_shared:
+                # Consumer cell: skip formula counting and cross-ref checks
+                # (the primary cell already covers this formula)
+                continue
+
+            # ── Check 4: shared formula integrity ──────────────────────────
+            group = shared_groups.get(f_si)
+            pos = cell_position(cell_ref)
+            detail = None
+            if group is None:
+                detail = f"Shared formula consumer si={f_si} has no primary cell with formula text"
+            elif pos is not None and group[3] and not _in_range(*pos, group[3]):
+                detail = f"Cell lies outside its shared formula's ref range {group[3]}"
+            if detail:
+                results["errors"].append(
+                    {
+                        "type": "broken_shared_formula",
+                        "sheet": sheet_name,
+                        "cell": cell_ref,
+                        "si": f_si,
+                        "detail": detail,
+                    }
+                )
+                results["error_count"] += 1
+                continue
 
-def check(xlsx_path: str, sheet_filter: str | None = None) -> dict:
+            results["formula_count"] += 1
+            primary_formula, primary_row, primary_col, _, findings = group
+            if (findings[0] or findings[1]) and pos is not None:
+                formula = translate_formula(primary_formula,
+                                            pos[0] - primary_row, pos[1] - primary_col)
+                _report_findings(results, sheet_name, cell_ref, formula, findings,
+                                 valid_sheet_names, defined_names)
+            continue
+
+        formula = f_elem.text or ""
+        is_primary = f_type == "shared" and bool(f_elem.get("ref"))
+
+        if is_primary:
+            results["shared_formula_ranges"] += 1
+
+        if formula:
+            results["formula_count"] += 1
+
+            pos = cell_position(cell_ref) if expand_shared else None
+            if pos is not None:
+                key = relative_key(formula, *pos)
+                findings = findings_by_key.get(key)
+                if findings is None:
+                    findings = _formula_findings(formula, valid_sheet_names, defined_names)
+                    findings_by_key[key] = findings
+                if is_primary and f_si is not None:
+                    shared_groups[f_si] = (formula, pos[0], pos[1], f_elem.get("ref"), findings)
+            else:
+                findings = _formula_findings(formula, valid_sheet_names, defined_names)
+
+            _report_findings(results, sheet_name, cell_ref, formula, findings,
+                             valid_sheet_names, defined_names)
+
+
+def _check_sheet(
+    z: zipfile.ZipFile,
+    sheet_name: str,
+    ws_file: str,
+    valid_sheet_names: set[str],
+    defined_names: set[str],
+    stream: bool,
+    expand_shared: bool = False,
+) -> dict:
+    """Check one worksheet and return its partial results (counts + errors)."""
+    partial = {
+        "formula_count": 0,
+        "shared_formula_ranges": 0,
+        "error_count": 0,
+        "errors": [],
+    }
+    if stream:
+        with z.open(ws_file) as ws_stream:
+            _check_cells(sheet_name, iter_cells(ws_stream),
+                         valid_sheet_names, defined_names, partial, expand_shared)
+    else:
+        ws = ET.fromstring(z.read(ws_file))
+        _check_cells(sheet_name, ws.iter(f"{NSP}c"),
+                     valid_sheet_names, defined_names, partial, expand_shared)
+    return partial
+
+
+def _check_sheet_worker(
+    xlsx_path: str,
+    sheet_name: str,
+    ws_file: str,
+    valid_sheet_names: set[str],
+    defined_names: set[str],
+    stream: bool,
+    expand_shared: bool = False,
+) -> dict:
+    """Process-pool entry point: each worker opens its own handle on the zip."""
+    with zipfile.ZipFile(xlsx_path, "r") as z:
+        return _check_sheet(z, sheet_name, ws_file, valid_sheet_names, defined_names,
+                            stream, expand_shared)
+
+
+def check(
+    xlsx_path: str,
+    sheet_filter: str | None = None,
+    stream: bool = False,
+    jobs: int = 1,
+    expand_shared: bool = False,
+) -> dict:
     """
     Run all static checks on the given xlsx file.
 
     Args:
         xlsx_path: path to the .xlsx file
         sheet_filter: if provided, only check the sheet with this name
+        stream: if True, iterparse each worksheet straight from the zip member
+                instead of loading it into a DOM (same report, flat memory)
+        jobs: number of worker processes; sheets are checked in parallel when
+              > 1 and merged back in workbook order, so the output is identical
+        expand_shared: if True, also check (and count) shared-formula consumer
+                       cells, deduplicating work per R1C1-normalised formula
 
     Returns:
         A dict with keys:
@@ -178,119 +470,52 @@ def check(xlsx_path: str, sheet_filter: str | None = None) -> dict:
         return results
 
     with z:
-        sheet_names = get_sheet_names(z)
+        wb = ET.fromstring(z.read("xl/workbook.xml"))
+        sheet_names = get_sheet_names(z, wb)
         sheet_files = get_sheet_files(z)
         valid_sheet_names = set(sheet_names.values())
-        defined_names = get_defined_names(z)
+        defined_names = get_defined_names(z, wb)
+        members = set(z.namelist())
 
+        targets = []  # (sheet_name, ws_file) in workbook order
         for rid, sheet_name in sheet_names.items():
             # Apply sheet filter if requested
             if sheet_filter and sheet_name != sheet_filter:
                 continue
 
             ws_file = sheet_files.get(rid)
-            if not ws_file or ws_file not in z.namelist():
+            if not ws_file or ws_file not in members:
                 continue
-
-            results["sheets_checked"].append(sheet_name)
-            ws_xml = z.read(ws_file)
-            ws = ET.fromstring(ws_xml)
-
-            # Track shared formula IDs seen on this sheet (si -> primary cell ref)
-            shared_primary: dict[str, str] = {}
-
-            for cell in ws.findall(f".//{NSP}c"):
-                cell_ref = cell.get("r", "?")
-                cell_type = cell.get("t", "n")
-
-                # ── Check 1: error-value cell ──────────────────────────────
-                if cell_type == "e":
-                    v_elem = cell.find(f"{NSP}v")
-                    if v_elem is None:
-                        # Malformed: t="e" but no <v> — record as structural issue
-                        results["errors"].append(
-                            {
-                                "type": "malformed_error_cell",
-                                "sheet": sheet_name,
-                                "cell": cell_ref,
-                                "detail": "Cell has t='e' but no <v> child element",
-                            }
-                        )
-                        results["error_count"] += 1
-                    else:
-                        error_val = v_elem.text or "#UNKNOWN"
-                        f_elem = cell.find(f"{NSP}f")
-                        results["errors"].append(
-                            {
-                                "type": "error_value",
-                                "error": error_val,
-                                "sheet": sheet_name,
-                                "cell": cell_ref,
-                                # Include formula text if present
-                                "formula": f_elem.text if (f_elem is not None and f_elem.text) else None,
-                            }
-                        )
-                        results["error_count"] += 1
-
-                # ── Check 2 & 3: formulas ──────────────────────────────────
-                f_elem = cell.find(f"{NSP}f")
-                if f_elem is None:
-                    continue
-
-                f_type = f_elem.get("t", "")  # "shared", "array", or "" for normal
-                f_si = f_elem.get("si")       # shared formula group ID
-
-                # Count formulas:
-                # - Normal formulas: always count
-                # - Shared formula PRIMARY (has text + ref attribute): count once
-                # - Shared formula CONSUMER (si only, no text): do NOT count separately
-                #   (they are covered by the primary's ref range)
-                if f_type == "shared" and f_elem.text is None:
-                    # Consumer cell: skip formula counting and cross-ref checks
-                    # (the primary cell already covers this formula)
-                    continue
-
-                formula = f_elem.text or ""
-
-                if f_type == "shared" and f_elem.get("ref"):
-                    results["shared_formula_ranges"] += 1
-                    if f_si is not None:
-                        shared_primary[f_si] = cell_ref
-
-                if formula:
-                    results["formula_count"] += 1
-
-                    # Check 2: cross-sheet references
-                    for ref_sheet in extract_sheet_refs(formula):
-                        if ref_sheet not in valid_sheet_names:
-                            results["errors"].append(
-                                {
-                                    "type": "broken_sheet_ref",
-                                    "sheet": sheet_name,
-                                    "cell": cell_ref,
-                                    "formula": formula,
-                                    "missing_sheet": ref_sheet,
-                                    "valid_sheets": sorted(valid_sheet_names),
-                                }
-                            )
-                            results["error_count"] += 1
-
-                    # Check 3: named range references
-                    # Only flag if the name is not a built-in and not a sheet-prefixed ref
-                    for name_ref in extract_name_refs(formula):
-                        if name_ref not in defined_names:
-                            results["errors"].append(
-                                {
-                                    "type": "unknown_name_ref",
-                                    "sheet": sheet_name,
-                                    "cell": cell_ref,
-                                    "formula": formula,
-                                    "unknown_name": name_ref,
-                                    "defined_names": sorted(defined_names),
-                                    "note": "Heuristic check — verify manually if this is a false positive",
-                                }
-                            )
-                            results["error_count"] += 1
+            targets.append((sheet_name, ws_file))
+
+        if jobs > 1 and len(targets) > 1:
+            # Submit the largest sheets first so one big sheet does not end up
+            # queued behind many small ones; results are merged in workbook order.
+            by_size = sorted(range(len(targets)),
+                             key=lambda i: z.getinfo(targets[i][1]).file_size,
+                             reverse=True)
+            partials: list[dict] = [{}] * len(targets)
+            with ProcessPoolExecutor(max_workers=min(jobs, len(targets))) as pool:
+                futures = {
+                    i: pool.submit(_check_sheet_worker, xlsx_path, *targets[i],
+                                   valid_sheet_names, defined_names, stream, expand_shared)
+                    for i in by_size
+                }
+                for i, future in futures.items():
+                    partials[i] = future.result()
+        else:
+            partials = [
+                _check_sheet(z, sheet_name, ws_file, valid_sheet_names, defined_names,
+                             stream, expand_shared)
+                for sheet_name, ws_file in targets
+            ]
+
+    for (sheet_name, _), partial in zip(targets, partials):
+        results["sheets_checked"].append(sheet_name)
+        results["formula_count"] += partial["formula_count"]
+        results["shared_formula_ranges"] += partial["shared_formula_ranges"]
+        results["error_count"] += partial["error_count"]
+        results["errors"].extend(partial["errors"])
 
     return results
 
@@ -320,50 +545,8 @@ def build_report(results: dict) -> dict:
     }
 
 
-def main() -> None:
-    use_json = "--json" in sys.argv
-    use_report = "--report" in sys.argv
-    summary_only = "--summary" in sys.argv
-    output_file = None
-    sheet_filter = None
-    args_clean = []
-
-    i = 1
-    while i < len(sys.argv):
-        arg = sys.argv[i]
-        if arg == "--sheet" and i + 1 < len(sys.argv):
-            sheet_filter = sys.argv[i + 1]
-            i += 2
-        elif arg == "-o" and i + 1 < len(sys.argv):
-            output_file = sys.argv[i + 1]
-            i += 2
-        elif arg.startswith("--"):
-            i += 1  # skip flags already handled
-        else:
-            args_clean.append(arg)
-            i += 1
-
-    if not args_clean:
-        print("Usage: formula_check.py <input.xlsx> [--json] [--report [-o FILE]] [--sheet NAME] [--summary]")
-        sys.exit(1)
-
-    results = check(args_clean[0], sheet_filter=sheet_filter)
-
-    if use_report:
-        report = build_report(results)
-        output = json.dumps(report, indent=2, ensure_ascii=False)
-        if output_file:
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(output + "\n")
-        else:
-            print(output)
-        sys.exit(1 if results["error_count"] > 0 else 0)
-
-    if use_json:
-        print(json.dumps(results, indent=2, ensure_ascii=False))
-        sys.exit(1 if results["error_count"] > 0 else 0)
-
-    # Human-readable output
+def print_results(results: dict, sheet_filter: str | None = None, summary_only: bool = False) -> int:
+    """Print the human-readable check() output. Returns the exit code (0 pass, 1 fail)."""
     sheets = ", ".join(results["sheets_checked"]) or "(none)"
     if sheet_filter:
         sheets = f"{sheet_filter} (filtered)"
@@ -396,6 +579,8 @@ def main() -> None:
                 print(f"         Defined names: {e.get('defined_names', [])}")
             elif e["type"] == "malformed_error_cell":
                 print(f"  [FAIL] [{e['sheet']}!{e['cell']}] malformed error cell: {e['detail']}")
+            elif e["type"] == "broken_shared_formula":
+                print(f"  [FAIL] [{e['sheet']}!{e['cell']}] broken shared formula: {e['detail']}")
             elif e["type"] == "file_error":
                 print(f"  [FAIL] File error: {e['message']}")
         print()
@@ -410,12 +595,71 @@ def main() -> None:
             print(f"FAIL — {len(hard_errors)} error(s) must be fixed before delivery")
             if warnings:
                 print(f"WARN — {len(warnings)} heuristic warning(s) require manual review")
-            sys.exit(1)
+            return 1
         else:
             # Only heuristic warnings — do not block delivery but alert
             print(f"PASS with WARN — {len(warnings)} heuristic warning(s) require manual review")
             # Exit 0: heuristic warnings alone do not block delivery
-            sys.exit(0)
+            return 0
+    return 0
+
+
+
+def main() -> None:
+    use_json = "--json" in sys.argv
+    use_report = "--report" in sys.argv
+    summary_only = "--summary" in sys.argv
+    use_stream = "--stream" in sys.argv
+    expand_shared = "--expand-shared" in sys.argv
+    output_file = None
+    sheet_filter = None
+    jobs = 1
+    args_clean = []
+
+    i = 1
+    while i < len(sys.argv):
+        arg = sys.argv[i]
+        if arg == "--sheet" and i + 1 < len(sys.argv):
+            sheet_filter = sys.argv[i + 1]
+            i += 2
+        elif arg == "--jobs" and i + 1 < len(sys.argv):
+            try:
+                jobs = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                print(f"ERROR: --jobs expects an integer, got '{sys.argv[i + 1]}'")
+                sys.exit(1)
+            i += 2
+        elif arg == "-o" and i + 1 < len(sys.argv):
+            output_file = sys.argv[i + 1]
+            i += 2
+        elif arg.startswith("--"):
+            i += 1  # skip flags already handled
+        else:
+            args_clean.append(arg)
+            i += 1
+
+    if not args_clean:
+        print("Usage: formula_check.py <input.xlsx> [--json] [--report [-o FILE]] [--sheet NAME] [--summary] [--stream] [--jobs N] [--expand-shared]")
+        sys.exit(1)
+
+    results = check(args_clean[0], sheet_filter=sheet_filter, stream=use_stream, jobs=jobs,
+                    expand_shared=expand_shared)
+
+    if use_report:
+        report = build_report(results)
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if output_file:
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+        else:
+            print(output)
+        sys.exit(1 if results["error_count"] > 0 else 0)
+
+    if use_json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        sys.exit(1 if results["error_count"] > 0 else 0)
+
+    sys.exit(print_results(results, sheet_filter, summary_only))
 
 
 if __name__ == "__main__":
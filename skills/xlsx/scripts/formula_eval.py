@@ -0,0 +1,1475 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+"""
+formula_eval.py — Native formula evaluation for Tier 2 validation without LibreOffice.
+
+Recalculates a workbook's formulas in Python and reports the cells whose
+result is an Excel error (#DIV/0!, #REF!, #N/A, #VALUE!, ...). It covers the
+common function subset, so most models can be checked in well under a
+second where starting LibreOffice alone takes several; anything outside the
+subset falls back to the value Excel cached in <v>.
+
+How it works:
+    1. Cells are streamed from each worksheet (formula_check.iter_cells).
+    2. Formulas are tokenized with formula_tokens (the tokenizer formula_check
+       uses) and parsed into a small AST once per R1C1 form: a shared-formula
+       group, or a column of copied formulas, shares one AST.
+    3. A dependency graph links every formula cell to the formula cells it
+       reads, directly, through ranges (including cross-sheet and whole-
+       column ranges) or through defined names.
+    4. Formula cells are evaluated in topological order; each result is
+       cached, so a cell feeding a thousand others is computed once.
+
+Supported:
+    numbers, strings, TRUE/FALSE, error literals, cell / range / cross-sheet
+    references, defined names; + - * / ^ & % unary minus, = <> < > <= >=
+    SUM AVERAGE MIN MAX COUNT COUNTA IF IFERROR IFNA AND OR NOT ABS ROUND
+    VLOOKUP HLOOKUP INDEX MATCH
+
+Not evaluated (the cell keeps its cached <v>, and cells that depend on it
+without a cached value are reported as not evaluated): any other function,
+array constants, whole-row ranges, implicit intersection. Cells on a
+circular reference keep their cached value and are reported.
+
+Usage:
+    python3 formula_eval.py input.xlsx
+    python3 formula_eval.py input.xlsx --json          # machine-readable output
+    python3 formula_eval.py input.xlsx --sheet Sales   # report one sheet (all are evaluated)
+    python3 formula_eval.py input.xlsx --all-errors    # also list errors that read an erroring cell
+
+Exit code:
+    0 — no formula evaluates to an error
+    1 — runtime errors or circular references found (or file cannot be opened)
+"""
+
+import json
+import math
+import re
+import sys
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import lru_cache
+
+from formula_check import EXCEL_ERRORS, NSP, iter_cells
+from formula_tokens import (
+    MAX_COL,
+    MAX_ROW,
+    TOKEN_CACHE_SIZE,
+    cell_position,
+    col_letter,
+    col_number,
+    relative_key,
+    split_ref,
+    tokenize,
+    translate_formula,
+)
+from xlsx_stream_reader import XlsxStreamReader, element_text
+
+
+class XlError(str):
+    """An Excel error value (#DIV/0!, #REF!, ...), kept apart from text."""
+
+
+REF = XlError("#REF!")
+DIV0 = XlError("#DIV/0!")
+VALUE = XlError("#VALUE!")
+NA = XlError("#N/A")
+NAME = XlError("#NAME?")
+NUM = XlError("#NUM!")
+
+
+class Unsupported(Exception):
+    """The formula uses something this evaluator does not implement."""
+
+
+class _Unknown(Exception):
+    """A cell the formula reads has no known value."""
+
+
+# ---------------------------------------------------------------------------
+# Workbook loading
+# ---------------------------------------------------------------------------
+
+class Workbook:
+    """
+    Cell contents of every worksheet:
+
+        sheets     sheet names in workbook order
+        cells      {sheet: {(row, col): value}} — constants, and the cached
+                   <v> of formula cells
+        formulas   {(sheet, row, col): formula text} for cells with <f> text
+        shared     {(sheet, row, col): key of the group's primary cell} for
+                   shared-formula cells that only carry <f t="shared" si>
+        names      {(sheet or None, NAME): formula text} from <definedNames>
+        max_row    {sheet: last used row} (bounds whole-column ranges)
+    """
+
+    def __init__(self):
+        self.sheets = []
+        self.cells = {}
+        self.formulas = {}
+        self.shared = {}
+        self.names = {}
+        self.max_row = {}
+
+    def formula(self, key) -> str:
+        """Formula text of a cell, shared formulas translated to it."""
+        primary = self.shared.get(key)
+        if primary is None:
+            return self.formulas[key]
+        return translate_formula(self.formulas[primary], key[1] - primary[1], key[2] - primary[2])
+
+    def formula_keys(self) -> list:
+        return [*self.formulas, *self.shared]
+
+    def sheet_name(self, name: str) -> str:
+        """Workbook spelling of a sheet name; Excel matches them case-insensitively."""
+        if name in self.cells:
+            return name
+        key = name.casefold()
+        return next((n for n in self.cells if n.casefold() == key), name)
+
+
+def _cell_value(c: ET.Element, strings: list):
+    """Cached / constant value of a <c> element; None when empty."""
+    t = c.get("t", "n")
+    if t == "inlineStr":
+        inline = c.find(f"{NSP}is")
+        return element_text(inline) if inline is not None else None
+    v = c.findtext(f"{NSP}v")
+    if not v:
+        return None
+    if t == "s":
+        try:
+            return strings[int(v)]
+        except (ValueError, IndexError):
+            return None
+    if t == "b":
+        return v.strip() in ("1", "true")
+    if t == "e":
+        return XlError(v)
+    if t in ("str", "d"):
+        return v
+    try:
+        return float(v)
+    except ValueError:
+        return v
+
+
+def load_workbook(path: str) -> Workbook:
+    """Read every worksheet of an xlsx. Raises ValueError if it is not a workbook."""
+    book = Workbook()
+    try:
+        reader = XlsxStreamReader(path)
+    except (zipfile.BadZipFile, KeyError, OSError) as e:
+        raise ValueError(f"Cannot read {path} as a workbook: {e}") from e
+    with reader:
+        strings = reader.shared_strings()
+        book.sheets = reader.sheet_names
+        read_defined_names(book, ET.fromstring(reader.zip.read("xl/workbook.xml")))
+        for sheet, part in reader.sheets.items():
+            with reader.zip.open(part) as ws:
+                read_sheet(book, sheet, iter_cells(ws), strings)
+    return book
+
+
+def read_defined_names(book: Workbook, wb: ET.Element) -> None:
+    """Add the <definedNames> of a parsed workbook.xml (book.sheets must be set)."""
+    for dn in wb.iter(f"{NSP}definedName"):
+        local = dn.get("localSheetId")
+        scope = None
+        if local is not None and local.isdigit() and int(local) < len(book.sheets):
+            scope = book.sheets[int(local)]
+        if dn.get("name") and dn.text:
+            book.names[(scope, dn.get("name").upper())] = dn.text
+
+
+def read_sheet(book: Workbook, sheet: str, cells, strings: list) -> None:
+    """Add one worksheet from its <c> elements (streamed, or a parsed tree's)."""
+    values = book.cells[sheet] = {}
+    shared = {}       # si -> (row, col) of the cell holding the text
+    consumers = []    # (row, col, si) of shared formulas without text
+    max_row = 0
+    for c in cells:
+        pos = cell_position(c.get("r", ""))
+        if pos is None:
+            continue
+        max_row = max(max_row, pos[0])
+        value = _cell_value(c, strings)
+        if value is not None:
+            values[pos] = value
+        f = c.find(f"{NSP}f")
+        if f is None:
+            continue
+        if f.text:
+            book.formulas[(sheet, *pos)] = f.text
+            if f.get("t") == "shared" and f.get("si") is not None:
+                shared[f.get("si")] = pos
+        elif f.get("t") == "shared":
+            consumers.append((*pos, f.get("si")))
+    for row, col, si in consumers:
+        if si in shared:
+            book.shared[(sheet, row, col)] = (sheet, *shared[si])
+    book.max_row[sheet] = max_row
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+#
+# AST nodes are tuples:
+#   ("num", float)  ("str", text)  ("bool", b)  ("err", XlError)  ("missing",)
+#   ("ref", sheet|None, row, col, rel_row, rel_col)
+#   ("range", sheet|None, r1, c1, r2, c2, (rel_r1, rel_c1, rel_r2, rel_c2))
+#   ("name", NAME)  ("neg", x)  ("pct", x)  ("bin", op, a, b)  ("call", FUNC, args)
+#
+# Positions are those written in the formula; rel_* flags mark the parts
+# without "$", which move when the same AST is evaluated from another cell
+# of its shared-formula group (r2 is None for a whole-column range).
+
+_COMPARE = ("=", "<>", "<", ">", "<=", ">=")
+_COLUMN_RE = re.compile(r"[A-Z]{1,3}")
+
+
+def _lex(formula: str) -> list:
+    """formula_tokens tokens, with operator runs split into single operators."""
+    out = []
+    for tok in tokenize(formula):
+        if tok.kind != "op":
+            out.append((tok.kind, tok.value))
+            continue
+        text, i = tok.text, 0
+        while i < len(text):
+            ch = text[i]
+            if ch.isspace():
+                i += 1
+                continue
+            if text[i:i + 2] in ("<=", ">=", "<>"):
+                out.append(("op", text[i:i + 2]))
+                i += 2
+            else:
+                out.append(("op", ch))
+                i += 1
+    return out
+
+
+class _Parser:
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, value=None):
+        if self.i >= len(self.tokens):
+            return None
+        tok = self.tokens[self.i]
+        if value is not None and tok != ("op", value):
+            return None
+        return tok
+
+    def take(self, value=None):
+        tok = self.peek(value)
+        if tok is None:
+            raise Unsupported("unexpected end of formula" if value is None else f"expected '{value}'")
+        self.i += 1
+        return tok
+
+    def parse(self):
+        node = self.comparison()
+        if self.i != len(self.tokens):
+            raise Unsupported(f"cannot parse near {self.tokens[self.i][1]!r}")
+        return node
+
+    def comparison(self):
+        node = self.concat()
+        while self.peek() and self.peek()[0] == "op" and self.peek()[1] in _COMPARE:
+            op = self.take()[1]
+            node = ("bin", op, node, self.concat())
+        return node
+
+    def concat(self):
+        node = self.additive()
+        while self.peek("&"):
+            self.take()
+            node = ("bin", "&", node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.term()
+        while self.peek("+") or self.peek("-"):
+            op = self.take()[1]
+            node = ("bin", op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.power()
+        while self.peek("*") or self.peek("/"):
+            op = self.take()[1]
+            node = ("bin", op, node, self.power())
+        return node
+
+    def power(self):
+        node = self.unary()
+        while self.peek("^"):
+            self.take()
+            node = ("bin", "^", node, self.unary())
+        return node
+
+    def unary(self):
+        # Excel binds unary minus tighter than ^: -2^2 is 4
+        if self.peek("-"):
+            self.take()
+            return ("neg", self.unary())
+        if self.peek("+"):
+            self.take()
+            return self.unary()
+        node = self.primary()
+        while self.peek("%"):
+            self.take()
+            node = ("pct", node)
+        return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return ("num", float(value))
+        if kind == "string":
+            return ("str", value)
+        if kind == "error":
+            # "#REF!A1" is what Excel leaves behind when a referenced sheet is deleted
+            nxt = self.peek()
+            if value == "#REF!" and nxt and (nxt[0] == "ref" or nxt == ("op", "$")):
+                self.reference(None, self.take())
+            return ("err", XlError(value))
+        if kind == "func":
+            return self.call(value)
+        if kind == "sheet":
+            return self.reference(value, self.take())
+        if kind in ("ref", "name") or (kind, value) == ("op", "$"):
+            if kind == "name" and value.upper() in ("TRUE", "FALSE") and not self.peek(":"):
+                return ("bool", value.upper() == "TRUE")
+            return self.reference(None, (kind, value))
+        if (kind, value) == ("op", "("):
+            node = self.comparison()
+            self.take(")")
+            return node
+        if (kind, value) == ("op", "{"):
+            raise Unsupported("array constants")
+        raise Unsupported(f"cannot parse near {value!r}")
+
+    def call(self, name: str):
+        if name.startswith("_XLFN."):
+            name = name[6:]
+        self.take("(")
+        args = []
+        if self.peek(")"):
+            self.take()
+            return ("call", name, args)
+        while True:
+            if self.peek(",") or self.peek(")"):
+                args.append(("missing",))
+            else:
+                args.append(self.comparison())
+            if self.take()[1] == ")":
+                return ("call", name, args)
+
+    def _column(self, tok) -> tuple[int, bool] | None:
+        """(col, relative) of a whole-column bound ("A" or "$A"); None if tok is not one."""
+        relative = True
+        if tok == ("op", "$"):
+            tok, relative = self.take(), False
+        if tok[0] == "name" and _COLUMN_RE.fullmatch(tok[1]):
+            col = col_number(tok[1])
+            return (col, relative) if col <= MAX_COL else None
+        return None
+
+    def reference(self, sheet, tok):
+        kind, value = tok
+        if kind == "error":
+            return ("err", XlError(value))
+        if kind == "ref":
+            dollar_col, col, dollar_row, row = split_ref(value)
+            start = (row, col_number(col), not dollar_row, not dollar_col)
+            if not self.peek(":"):
+                return ("ref", sheet, *start)
+            self.take()
+            end = self.take()
+            if end[0] == "sheet":
+                end = self.take()
+            if end[0] != "ref":
+                raise Unsupported("range end is not a cell")
+            dollar_col, col, dollar_row, row = split_ref(end[1])
+            return ("range", sheet, start[0], start[1], row, col_number(col),
+                    (start[2], start[3], not dollar_row, not dollar_col))
+        first = self._column(tok)
+        if first is not None and self.peek(":"):
+            self.take()
+            last = self._column(self.take())
+            if last is None:
+                raise Unsupported("range end is not a column")
+            return ("range", sheet, 1, first[0], None, last[0], (False, first[1], False, last[1]))
+        if kind == "name" and sheet is None:
+            return ("name", value.upper())
+        raise Unsupported(f"unsupported reference {value!r}")
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def parse(formula: str):
+    """AST of formula text (without the leading "="); raises Unsupported."""
+    return _Parser(_lex(formula)).parse()
+
+
+def _place_ref(node, at, book: Workbook):
+    """(sheet, row, col) a "ref" node points at from at = (sheet, d_row, d_col); None if off the grid."""
+    row = node[2] + at[1] if node[4] else node[2]
+    col = node[3] + at[2] if node[5] else node[3]
+    if not (1 <= row <= MAX_ROW and 1 <= col <= MAX_COL):
+        return None
+    return (book.sheet_name(node[1]) if node[1] else at[0], row, col)
+
+
+def _place_range(node, at, book: Workbook):
+    """(sheet, r1, c1, r2, c2) of a "range" node, normalized; None if off the grid."""
+    sheet = book.sheet_name(node[1]) if node[1] else at[0]
+    rel = node[6]
+    r1 = node[2] + at[1] if rel[0] else node[2]
+    c1 = node[3] + at[2] if rel[1] else node[3]
+    c2 = node[5] + at[2] if rel[3] else node[5]
+    if node[4] is None:
+        r2 = max(book.max_row.get(sheet, 0), 1)
+    else:
+        r2 = node[4] + at[1] if rel[2] else node[4]
+    r1, r2 = min(r1, r2), max(r1, r2)
+    c1, c2 = min(c1, c2), max(c1, c2)
+    if r1 < 1 or c1 < 1 or r2 > MAX_ROW or c2 > MAX_COL:
+        return None
+    return (sheet, r1, c1, r2, c2)
+
+
+# ---------------------------------------------------------------------------
+# Dependency graph
+# ---------------------------------------------------------------------------
+
+class DependencyGraph:
+    """
+    Formula cells and, for each, the formula cells it reads (precedents).
+    Constant cells are left out: they never need ordering. Ranges are
+    resolved against a per-sheet, per-column index of formula rows, so a
+    whole-column reference costs one bisect per column.
+
+    A range holding more than one formula cell becomes a node of its own,
+    keyed (sheet, r1, c1, r2, c2) next to the (sheet, row, col) cell keys:
+    a lookup table read by 10,000 formulas then costs 10,000 + table-size
+    edges instead of their product.
+
+    asts maps each formula cell to (ast, d_row, d_col): the AST of its
+    shared-formula group and the cell's offset from the group's anchor.
+
+    For edits, the reverse direction is kept too: cell_readers maps every
+    referenced cell (constants included) to the formulas naming it, and
+    range_readers does the same for every range; downstream() walks them.
+    """
+
+    def __init__(self, book: Workbook, asts: dict):
+        self.book = book
+        self.asts = asts
+        # sheet -> col -> sorted formula rows
+        self._index = {}
+        for sheet, row, col in asts:
+            self._index.setdefault(sheet, {}).setdefault(col, []).append(row)
+        for columns in self._index.values():
+            for rows in columns.values():
+                rows.sort()
+        self._index_cols = {sheet: sorted(cols) for sheet, cols in self._index.items()}
+        self._ranges = {}
+        self.cell_readers = {}
+        self.range_readers = {}
+        self.precedents = {}
+        for key, (ast, d_row, d_col) in asts.items():
+            self.precedents[key] = self._precedents(key, (key[0], d_row, d_col), ast)
+        self.precedents.update((block, cells) for block, cells in self._ranges.items()
+                               if len(cells) > 1)
+        self._dependents = None
+
+    def _formula_cells_in(self, sheet, r1, c1, r2, c2):
+        columns = self._index.get(sheet)
+        if not columns:
+            return
+        cols = self._index_cols[sheet]
+        for col in cols[bisect_left(cols, c1):bisect_right(cols, c2)]:
+            rows = columns[col]
+            for row in rows[bisect_left(rows, r1):bisect_right(rows, r2)]:
+                yield (sheet, row, col)
+
+    def _precedents(self, reader, at, ast) -> set:
+        found = set()
+        stack, seen_names = [(ast, at)], set()
+        while stack:
+            node, at = stack.pop()
+            kind = node[0]
+            if kind == "ref":
+                key = _place_ref(node, at, self.book)
+                if key is None:
+                    continue
+                self.cell_readers.setdefault(key, set()).add(reader)
+                if key in self.asts:
+                    found.add(key)
+            elif kind == "range":
+                block = _place_range(node, at, self.book)
+                if block is None:
+                    continue
+                self.range_readers.setdefault(block, set()).add(reader)
+                cells = self._ranges.get(block)
+                if cells is None:
+                    cells = self._ranges[block] = set(self._formula_cells_in(*block))
+                if len(cells) > 1:
+                    found.add(block)
+                else:
+                    found.update(cells)
+            elif kind == "name":
+                if node[1] not in seen_names:
+                    seen_names.add(node[1])
+                    text = _name_formula(self.book, at[0], node[1])
+                    if text is not None:
+                        try:
+                            stack.append((parse(text), (at[0], 0, 0)))
+                        except Unsupported:
+                            pass
+            elif kind in ("neg", "pct"):
+                stack.append((node[1], at))
+            elif kind == "bin":
+                stack.extend((child, at) for child in node[2:])
+            elif kind == "call":
+                stack.extend((child, at) for child in node[2])
+        return found
+
+    def dependents(self) -> dict:
+        """{node: nodes that read it}, the precedents map reversed (built once)."""
+        if self._dependents is None:
+            self._dependents = {key: [] for key in self.precedents}
+            for key, precs in self.precedents.items():
+                for p in precs:
+                    self._dependents[p].append(key)
+        return self._dependents
+
+    def downstream(self, cells) -> set:
+        """
+        Formula cells whose value can change when any of `cells` changes:
+        those among `cells` themselves, the formulas reading them directly
+        or through a range, and everything reading those in turn.
+        """
+        ranges_on = {}
+        for block in self.range_readers:
+            ranges_on.setdefault(block[0], []).append(block)
+        stack = []
+        for key in cells:
+            sheet, row, col = key
+            stack.append(key)
+            stack.extend(self.cell_readers.get(key, ()))
+            for block in ranges_on.get(sheet, ()):
+                if block[1] <= row <= block[3] and block[2] <= col <= block[4]:
+                    stack.extend(self.range_readers[block])
+        dependents = self.dependents()
+        seen = set()
+        while stack:
+            key = stack.pop()
+            if key in seen or key not in self.precedents:
+                continue
+            seen.add(key)
+            stack.extend(dependents[key])
+        return {key for key in seen if len(key) == 3}
+
+    def order(self) -> tuple[list, list, set]:
+        """
+        (topological order, nodes downstream of a cycle in evaluation order,
+        nodes on or between cycles). Kahn's algorithm; what it cannot place
+        is split by peeling off nodes nothing in the remainder reads.
+        """
+        dependents = self.dependents()
+        waiting = {key: len(precs) for key, precs in self.precedents.items()}
+        ready = [key for key, n in waiting.items() if n == 0]
+        order = []
+        while ready:
+            key = ready.pop()
+            order.append(key)
+            for d in dependents[key]:
+                waiting[d] -= 1
+                if waiting[d] == 0:
+                    ready.append(d)
+        if len(order) == len(self.precedents):
+            return order, [], set()
+
+        rest = {key for key, n in waiting.items() if n > 0}
+        readers = {key: sum(1 for d in dependents[key] if d in rest) for key in rest}
+        sinks = [key for key, n in readers.items() if n == 0]
+        peeled = []
+        while sinks:
+            key = sinks.pop()
+            peeled.append(key)
+            for p in self.precedents[key]:
+                if p in rest:
+                    readers[p] -= 1
+                    if readers[p] == 0:
+                        sinks.append(p)
+        cyclic = rest - set(peeled)
+        return order, peeled[::-1], cyclic
+
+
+def _name_formula(book: Workbook, sheet: str, name: str) -> str | None:
+    """Text of a defined name, sheet-scoped definitions first."""
+    text = book.names.get((sheet, name))
+    return text if text is not None else book.names.get((None, name))
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+class _Range:
+    """A rectangular block of one sheet; its values are read once and cached."""
+
+    __slots__ = ("ev", "sheet", "r1", "c1", "r2", "c2")
+
+    def __init__(self, ev, sheet, r1, c1, r2, c2):
+        self.ev, self.sheet = ev, sheet
+        self.r1, self.c1, self.r2, self.c2 = r1, c1, r2, c2
+
+    @property
+    def height(self) -> int:
+        return self.r2 - self.r1 + 1
+
+    @property
+    def width(self) -> int:
+        return self.c2 - self.c1 + 1
+
+    def cell(self, i: int, j: int):
+        """Value at 0-based (row, col) offsets."""
+        return self.ev.cell(self.sheet, self.r1 + i, self.c1 + j)
+
+    def values(self) -> list:
+        """All values, row by row."""
+        return self.ev.block(self.sheet, self.r1, self.c1, self.r2, self.c2)
+
+    def column(self, j: int) -> list:
+        return self.values()[j::self.width]
+
+    def row(self, i: int) -> list:
+        return self.values()[i * self.width:(i + 1) * self.width]
+
+    def line(self):
+        """Values of a single row or column; None if the block is 2-D."""
+        return self.values() if self.height == 1 or self.width == 1 else None
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, float) and not isinstance(v, bool)
+
+
+# Text Excel coerces to a number: optional sign, digits with thousands
+# separators, decimals, exponent, trailing percent (not "nan" / "inf")
+_NUMBER_TEXT_RE = re.compile(r"[+-]?(?:\d[\d,]*(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?%?", re.ASCII)
+
+
+def _to_number(v):
+    """Coerce a scalar for arithmetic: a float or an XlError."""
+    if v is None:
+        return 0.0
+    if isinstance(v, XlError):
+        return v
+    if isinstance(v, bool):
+        return float(v)
+    if isinstance(v, float):
+        return v
+    text = str(v).strip()
+    if _NUMBER_TEXT_RE.fullmatch(text) is None:
+        return VALUE
+    if text.endswith("%"):
+        return float(text[:-1].replace(",", "")) / 100
+    return float(text.replace(",", ""))
+
+
+def _to_text(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, bool):
+        return "TRUE" if v else "FALSE"
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() and abs(v) < 1e15 else f"{v:.15g}"
+    return str(v)
+
+
+def _to_bool(v):
+    if v is None:
+        return False
+    if isinstance(v, XlError):
+        return v
+    if isinstance(v, (bool, float)):
+        return bool(v)
+    upper = str(v).upper()
+    if upper in ("TRUE", "FALSE"):
+        return upper == "TRUE"
+    return VALUE
+
+
+def _rank(v) -> int:
+    """Excel's cross-type order: numbers < text < logicals."""
+    return 2 if isinstance(v, bool) else 1 if isinstance(v, str) else 0
+
+
+def _significant(x: float) -> float:
+    """x rounded to the 15 significant digits Excel compares numbers at."""
+    return float(f"{x:.15g}")
+
+
+def _compare(a, b) -> int:
+    """
+    -1 / 0 / 1 like Excel's comparison operators (text case-insensitive,
+    numbers at 15 significant digits, so 0.1+0.2=0.3 is TRUE).
+    """
+    if a is None:
+        a = "" if isinstance(b, str) else False if isinstance(b, bool) else 0.0
+    if b is None:
+        b = "" if isinstance(a, str) else False if isinstance(a, bool) else 0.0
+    ra, rb = _rank(a), _rank(b)
+    if ra != rb:
+        return -1 if ra < rb else 1
+    if isinstance(a, str):
+        a, b = a.lower(), b.lower()
+    elif not isinstance(a, bool) and a != b and abs(a - b) <= 1e-13 * max(abs(a), abs(b)):
+        # Rounding is monotonic and only numbers this close can round together
+        a, b = _significant(a), _significant(b)
+    return (a > b) - (a < b)
+
+
+def _round_half_away(x: float, digits: int) -> float:
+    try:
+        return float(Decimal(repr(x)).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+    except InvalidOperation:
+        # More digits than Decimal's precision: nothing left to round
+        return x
+
+
+def _wildcard(pattern: str):
+    """Regex for a MATCH / VLOOKUP text pattern (* ? and ~ escapes)."""
+    out, i = [], 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "~" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        out.append(".*" if ch == "*" else "." if ch == "?" else re.escape(ch))
+        i += 1
+    return re.compile("".join(out), re.IGNORECASE | re.DOTALL)
+
+
+def _exact_position(values: list, x):
+    """Index of the first value equal to x (text: case-insensitive, wildcards); None if absent."""
+    if isinstance(x, str) and any(ch in x for ch in "*?~"):
+        rx = _wildcard(x)
+        return next((i for i, v in enumerate(values)
+                     if isinstance(v, str) and not isinstance(v, XlError)
+                     and rx.fullmatch(v) is not None), None)
+    if isinstance(x, str):
+        x = x.lower()
+        return next((i for i, v in enumerate(values)
+                     if isinstance(v, str) and not isinstance(v, XlError) and v.lower() == x), None)
+    rank = _rank(x)
+    return next((i for i, v in enumerate(values)
+                 if v is not None and _rank(v) == rank and _compare(v, x) == 0), None)
+
+
+def _approximate_position(values: list, x, descending: bool = False):
+    """
+    Position of the last value <= x in ascending data (the last value
+    >= x in descending data), skipping other types: what Excel's binary
+    search returns on sorted input. None if there is none.
+    """
+    found = None
+    for i, v in enumerate(values):
+        if v is None or isinstance(v, XlError) or _rank(v) != _rank(x):
+            continue
+        c = _compare(v, x)
+        if (c >= 0) if descending else (c <= 0):
+            found = i
+        else:
+            break
+    return found
+
+
+class Evaluator:
+    """
+    Evaluates every formula cell of a Workbook in dependency order.
+
+    After run():
+        values    {(sheet, row, col): computed value} for formula cells
+        status    {(sheet, row, col): "ok" | "cached" | "unknown" | "circular"}
+        reasons   {(sheet, row, col): why a cell was not evaluated}
+        inherited error cells that read a cell already holding an error
+
+    Formulas are parsed once per R1C1 form (formula_tokens.relative_key),
+    so a column filled with the same formula shares one AST. Range values
+    are cached: every formula cell inside a range is a precedent of the
+    reader, so it is final by the time the range is read.
+    """
+
+    def __init__(self, book: Workbook):
+        self.book = book
+        self.values = {}
+        self.status = {}
+        self.reasons = {}
+        self.inherited = set()
+        self.asts = {}
+        groups = {}  # relative key -> (ast, anchor row, anchor col), or the parse error
+        for key, formula in book.formulas.items():
+            sheet, row, col = key
+            rk = relative_key(formula, row, col)
+            group = groups.get(rk)
+            if group is None:
+                try:
+                    group = (parse(formula), row, col)
+                except Unsupported as e:
+                    group = str(e)
+                groups[rk] = group
+            if isinstance(group, str):
+                self.reasons[key] = group
+            else:
+                self.asts[key] = (group[0], row - group[1], col - group[2])
+        for key, primary in book.shared.items():
+            if primary in self.asts:
+                ast, d_row, d_col = self.asts[primary]
+                self.asts[key] = (ast, d_row + key[1] - primary[1], d_col + key[2] - primary[2])
+            else:
+                self.reasons[key] = self.reasons[primary]
+        self.graph = DependencyGraph(book, self.asts)
+        self._blocks = {}
+        self._read_error = False
+
+    def run(self, targets=None) -> None:
+        """
+        Evaluate every formula cell, or only `targets` plus the formulas
+        they read that have no cached value; other formula cells keep their
+        cached <v> (status "cached").
+        """
+        for key in self.reasons:
+            self._fall_back(key, self.reasons[key])
+        order, downstream, cyclic = self.graph.order()
+        needed = None
+        if targets is not None:
+            needed = self._needed(targets)
+            for key in self.asts.keys() - needed:
+                self._fall_back(key, "not recalculated")
+        for key in cyclic:
+            if len(key) == 3 and (needed is None or key in needed):
+                self.values[key] = self._cached(key)
+                self.status[key] = "circular"
+        for key in order + downstream:
+            if len(key) == 3 and (needed is None or key in needed):
+                self._evaluate(key)
+
+    def _needed(self, targets) -> set:
+        """targets, and upstream formula cells without a cached value."""
+        needed, seen = set(), set()
+        stack = [key for key in targets if key in self.asts]
+        precedents = self.graph.precedents
+        while stack:
+            key = stack.pop()
+            if key in seen:
+                continue
+            seen.add(key)
+            if len(key) == 3:
+                needed.add(key)
+            for p in precedents[key]:
+                if len(p) != 3 or self._cached(p) is None:
+                    stack.append(p)
+        return needed
+
+    def _cached(self, key):
+        sheet, row, col = key
+        return self.book.cells.get(sheet, {}).get((row, col))
+
+    def _fall_back(self, key, reason: str) -> None:
+        cached = self._cached(key)
+        self.values[key] = cached
+        self.status[key] = "cached" if cached is not None else "unknown"
+        self.reasons[key] = reason
+
+    def _evaluate(self, key) -> None:
+        self._read_error = False
+        ast, d_row, d_col = self.asts[key]
+        try:
+            value = self.scalar(self.eval(ast, (key[0], d_row, d_col)))
+        except (Unsupported, _Unknown) as e:
+            self._fall_back(key, str(e))
+            return
+        except RecursionError:
+            self._fall_back(key, "formula nested too deeply")
+            return
+        if value is None:
+            value = 0.0  # =A1 of an empty cell shows 0
+        elif isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+            value = NUM
+        self.values[key] = value
+        self.status[key] = "ok"
+        if isinstance(value, XlError) and self._read_error:
+            self.inherited.add(key)
+
+    # -- cells and references ------------------------------------------------
+
+    def value(self, sheet: str, row: int, col: int):
+        """Current value of a cell; raises _Unknown for a formula without one."""
+        key = (sheet, row, col)
+        if key in self.asts or key in self.reasons:
+            status = self.status.get(key)
+            if status is None or status == "unknown" or (
+                    status == "circular" and self.values[key] is None):
+                raise _Unknown(f"reads {sheet}!{col_letter(col)}{row}, which has no known value")
+            return self.values[key]
+        return self.book.cells[sheet].get((row, col))
+
+    def cell(self, sheet: str, row: int, col: int):
+        """value(), noting when the formula reads an error."""
+        v = self.value(sheet, row, col)
+        if isinstance(v, XlError):
+            self._read_error = True
+        return v
+
+    def block(self, sheet: str, r1: int, c1: int, r2: int, c2: int) -> list:
+        """Values of a range, row by row, read once per evaluation run."""
+        key = (sheet, r1, c1, r2, c2)
+        values = self._blocks.get(key)
+        if values is None:
+            values = [self.value(sheet, row, col)
+                      for row in range(r1, r2 + 1) for col in range(c1, c2 + 1)]
+            self._blocks[key] = values
+        return values
+
+    def scalar(self, v):
+        """A single value: a 1x1 range is read, larger ones are not supported."""
+        if isinstance(v, _Range):
+            if v.height == 1 and v.width == 1:
+                return v.cell(0, 0)
+            raise Unsupported("implicit intersection of a multi-cell range")
+        return v
+
+    def eval(self, node, at):
+        """
+        Value of an AST node evaluated at at = (sheet, d_row, d_col): the
+        sheet holding the formula and the cell's offset from the AST anchor.
+        """
+        kind = node[0]
+        if kind in ("num", "str", "bool", "err"):
+            return node[1]
+        if kind == "ref":
+            place = _place_ref(node, at, self.book)
+            if place is None or place[0] not in self.book.cells:
+                return REF
+            return self.cell(*place)
+        if kind == "range":
+            place = _place_range(node, at, self.book)
+            if place is None or place[0] not in self.book.cells:
+                return REF
+            return _Range(self, *place)
+        if kind == "missing":
+            return None
+        if kind == "neg":
+            v = _to_number(self.scalar(self.eval(node[1], at)))
+            return v if isinstance(v, XlError) else -v
+        if kind == "pct":
+            v = _to_number(self.scalar(self.eval(node[1], at)))
+            return v if isinstance(v, XlError) else v / 100
+        if kind == "bin":
+            return self._binary(node[1], self.scalar(self.eval(node[2], at)),
+                                self.scalar(self.eval(node[3], at)))
+        if kind == "name":
+            text = _name_formula(self.book, at[0], node[1])
+            if text is None:
+                return NAME
+            return self.eval(parse(text), (at[0], 0, 0))
+        if kind == "call":
+            fn = FUNCTIONS.get(node[1])
+            if fn is None:
+                raise Unsupported(f"function {node[1]}")
+            return fn(self, node[2], at)
+        raise Unsupported(f"node {kind}")
+
+    def _binary(self, op: str, a, b):
+        if isinstance(a, XlError):
+            return a
+        if isinstance(b, XlError):
+            return b
+        if op in _COMPARE:
+            c = _compare(a, b)
+            return {"=": c == 0, "<>": c != 0, "<": c < 0,
+                    ">": c > 0, "<=": c <= 0, ">=": c >= 0}[op]
+        if op == "&":
+            return _to_text(a) + _to_text(b)
+        x, y = _to_number(a), _to_number(b)
+        if isinstance(x, XlError):
+            return x
+        if isinstance(y, XlError):
+            return y
+        if op == "+":
+            return x + y
+        if op == "-":
+            return x - y
+        if op == "*":
+            return x * y
+        if op == "/":
+            return DIV0 if y == 0 else x / y
+        if op == "^":
+            if x == 0 and y < 0:
+                return DIV0
+            if x == 0 and y == 0:
+                return NUM
+            try:
+                result = x ** y
+            except (OverflowError, ZeroDivisionError):
+                return NUM
+            return NUM if isinstance(result, complex) else float(result)
+        raise Unsupported(f"operator {op}")
+
+    # -- helpers for functions ---------------------------------------------
+
+    def arg(self, args: list, i: int, at, default=None):
+        """Scalar value of argument i (default when omitted)."""
+        if i >= len(args) or args[i][0] == "missing":
+            return default
+        return self.scalar(self.eval(args[i], at))
+
+    def range_error(self, v):
+        """An error value met inside a range: it came from a cell, so note the read."""
+        self._read_error = True
+        return v
+
+    def numbers(self, args: list, at):
+        """
+        Numbers of aggregate arguments the way SUM sees them: inside ranges
+        only numbers count; typed-in arguments are coerced. Returns a list,
+        or the first XlError met.
+        """
+        out = []
+        for node in args:
+            v = self.eval(node, at)
+            if isinstance(v, _Range):
+                for item in v.values():
+                    if isinstance(item, XlError):
+                        return self.range_error(item)
+                    if _is_number(item):
+                        out.append(item)
+                continue
+            if node[0] == "missing":
+                continue
+            if node[0] == "ref":
+                # A referenced cell behaves like a one-cell range
+                if isinstance(v, XlError):
+                    return v
+                if _is_number(v):
+                    out.append(v)
+                continue
+            n = _to_number(v)
+            if isinstance(n, XlError):
+                return n
+            out.append(n)
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Functions: fn(evaluator, argument nodes, at) -> value
+# ---------------------------------------------------------------------------
+
+def _fn_sum(ev, args, at):
+    nums = ev.numbers(args, at)
+    return nums if isinstance(nums, XlError) else math.fsum(nums)
+
+
+def _fn_average(ev, args, at):
+    nums = ev.numbers(args, at)
+    if isinstance(nums, XlError):
+        return nums
+    return math.fsum(nums) / len(nums) if nums else DIV0
+
+
+def _fn_min(ev, args, at):
+    nums = ev.numbers(args, at)
+    return nums if isinstance(nums, XlError) else min(nums, default=0.0)
+
+
+def _fn_max(ev, args, at):
+    nums = ev.numbers(args, at)
+    return nums if isinstance(nums, XlError) else max(nums, default=0.0)
+
+
+def _fn_count(ev, args, at):
+    count = 0
+    for node in args:
+        v = ev.eval(node, at)
+        items = v.values() if isinstance(v, _Range) else [v]
+        count += sum(1 for item in items if _is_number(item))
+    return float(count)
+
+
+def _fn_counta(ev, args, at):
+    count = 0
+    for node in args:
+        if node[0] == "missing":
+            continue
+        v = ev.eval(node, at)
+        items = v.values() if isinstance(v, _Range) else [v]
+        count += sum(1 for item in items if item is not None)
+    return float(count)
+
+
+def _fn_if(ev, args, at):
+    if not args or len(args) > 3:
+        return VALUE
+    cond = _to_bool(ev.arg(args, 0, at))
+    if isinstance(cond, XlError):
+        return cond
+    if cond:
+        return ev.arg(args, 1, at, 0.0)
+    if len(args) < 3:
+        return False
+    return ev.arg(args, 2, at, 0.0)
+
+
+def _fn_iferror(ev, args, at):
+    if len(args) != 2:
+        return VALUE
+    v = ev.arg(args, 0, at, 0.0)
+    return ev.arg(args, 1, at, 0.0) if isinstance(v, XlError) else v
+
+
+def _fn_ifna(ev, args, at):
+    if len(args) != 2:
+        return VALUE
+    v = ev.arg(args, 0, at, 0.0)
+    return ev.arg(args, 1, at, 0.0) if isinstance(v, XlError) and v == NA else v
+
+
+def _logical(ev, args, at):
+    """Truth values of AND / OR arguments (ranges skip text and blanks)."""
+    out = []
+    for node in args:
+        v = ev.eval(node, at)
+        if isinstance(v, _Range):
+            for item in v.values():
+                if isinstance(item, XlError):
+                    return ev.range_error(item)
+                if isinstance(item, (bool, float)):
+                    out.append(bool(item))
+            continue
+        b = _to_bool(v)
+        if isinstance(b, XlError):
+            return b
+        out.append(b)
+    return out if out else VALUE
+
+
+def _fn_and(ev, args, at):
+    values = _logical(ev, args, at)
+    return values if isinstance(values, XlError) else all(values)
+
+
+def _fn_or(ev, args, at):
+    values = _logical(ev, args, at)
+    return values if isinstance(values, XlError) else any(values)
+
+
+def _fn_not(ev, args, at):
+    if len(args) != 1:
+        return VALUE
+    b = _to_bool(ev.arg(args, 0, at))
+    return b if isinstance(b, XlError) else not b
+
+
+def _fn_abs(ev, args, at):
+    if len(args) != 1:
+        return VALUE
+    x = _to_number(ev.arg(args, 0, at))
+    return x if isinstance(x, XlError) else abs(x)
+
+
+def _fn_round(ev, args, at):
+    if len(args) != 2:
+        return VALUE
+    x = _to_number(ev.arg(args, 0, at))
+    digits = _to_number(ev.arg(args, 1, at))
+    if isinstance(x, XlError):
+        return x
+    if isinstance(digits, XlError):
+        return digits
+    return _round_half_away(x, int(digits))
+
+
+def _lookup_table(ev, args, at, horizontal: bool):
+    """Shared body of VLOOKUP / HLOOKUP."""
+    if len(args) not in (3, 4):
+        return VALUE
+    x = ev.arg(args, 0, at)
+    if isinstance(x, XlError):
+        return x
+    table = ev.eval(args[1], at)
+    if isinstance(table, XlError):
+        return table
+    if not isinstance(table, _Range):
+        raise Unsupported("lookup in an array")
+    index = _to_number(ev.arg(args, 2, at))
+    if isinstance(index, XlError):
+        return index
+    index = int(index)
+    approximate = _to_bool(ev.arg(args, 3, at, True))
+    if isinstance(approximate, XlError):
+        return approximate
+    if index < 1:
+        return VALUE
+    if index > (table.height if horizontal else table.width):
+        return REF
+    keys = table.row(0) if horizontal else table.column(0)
+    if x is None:
+        x = 0.0
+    if approximate:
+        pos = _approximate_position(keys, x)
+    else:
+        pos = _exact_position(keys, x)
+    if pos is None:
+        return NA
+    return table.cell(index - 1, pos) if horizontal else table.cell(pos, index - 1)
+
+
+def _fn_vlookup(ev, args, at):
+    return _lookup_table(ev, args, at, horizontal=False)
+
+
+def _fn_hlookup(ev, args, at):
+    return _lookup_table(ev, args, at, horizontal=True)
+
+
+def _fn_index(ev, args, at):
+    if len(args) not in (2, 3):
+        return VALUE
+    block = ev.eval(args[0], at)
+    if isinstance(block, XlError):
+        return block
+    if not isinstance(block, _Range):
+        raise Unsupported("INDEX of an array")
+    row = _to_number(ev.arg(args, 1, at, 0.0))
+    col = _to_number(ev.arg(args, 2, at, 0.0))
+    if isinstance(row, XlError):
+        return row
+    if isinstance(col, XlError):
+        return col
+    row, col = int(row), int(col)
+    if len(args) == 2 and block.height == 1:
+        # INDEX(A1:E1, 3): a single row is indexed by column
+        row, col = 1, row
+    if row < 0 or col < 0:
+        return VALUE
+    if row > block.height or col > block.width:
+        return REF
+    if row == 0 and col == 0:
+        return block
+    if row == 0:
+        return _Range(ev, block.sheet, block.r1, block.c1 + col - 1, block.r2, block.c1 + col - 1)
+    if col == 0:
+        if block.width == 1:
+            return block.cell(row - 1, 0)
+        return _Range(ev, block.sheet, block.r1 + row - 1, block.c1, block.r1 + row - 1, block.c2)
+    return block.cell(row - 1, col - 1)
+
+
+def _fn_match(ev, args, at):
+    if len(args) not in (2, 3):
+        return VALUE
+    x = ev.arg(args, 0, at)
+    if isinstance(x, XlError):
+        return x
+    block = ev.eval(args[1], at)
+    if isinstance(block, XlError):
+        return block
+    if not isinstance(block, _Range):
+        raise Unsupported("MATCH in an array")
+    kind = _to_number(ev.arg(args, 2, at, 1.0))
+    if isinstance(kind, XlError):
+        return kind
+    values = block.line()
+    if values is None:
+        return NA
+    if x is None:
+        x = 0.0
+    if kind == 0:
+        pos = _exact_position(values, x)
+    else:
+        pos = _approximate_position(values, x, descending=kind < 0)
+    return NA if pos is None else float(pos + 1)
+
+
+FUNCTIONS = {
+    "SUM": _fn_sum,
+    "AVERAGE": _fn_average,
+    "MIN": _fn_min,
+    "MAX": _fn_max,
+    "COUNT": _fn_count,
+    "COUNTA": _fn_counta,
+    "IF": _fn_if,
+    "IFERROR": _fn_iferror,
+    "IFNA": _fn_ifna,
+    "AND": _fn_and,
+    "OR": _fn_or,
+    "NOT": _fn_not,
+    "ABS": _fn_abs,
+    "ROUND": _fn_round,
+    "VLOOKUP": _fn_vlookup,
+    "HLOOKUP": _fn_hlookup,
+    "INDEX": _fn_index,
+    "MATCH": _fn_match,
+}
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def _entry(book: Workbook, key) -> dict:
+    return {"sheet": key[0], "cell": f"{col_letter(key[2])}{key[1]}", "formula": book.formula(key)}
+
+
+def evaluate(xlsx_path: str, sheet_filter: str | None = None) -> dict:
+    """
+    Evaluate every formula and return a formula_check-style result dict:
+    file, sheets_checked, formula_count, evaluated, cached, unknown,
+    unsupported ({reason: cells}), error_count, errors, seconds.
+    Errors are runtime_error (with "inherited": true when the formula reads
+    a cell that already holds an error) and circular_ref.
+    """
+    t0 = time.perf_counter()
+    results = {
+        "file": xlsx_path,
+        "sheets_checked": [],
+        "formula_count": 0,
+        "evaluated": 0,
+        "cached": 0,
+        "unknown": 0,
+        "unsupported": {},
+        "error_count": 0,
+        "errors": [],
+    }
+    try:
+        book = load_workbook(xlsx_path)
+    except (ValueError, ET.ParseError) as e:
+        results["errors"].append({"type": "file_error", "message": str(e)})
+        results["error_count"] = 1
+        return results
+    if sheet_filter and sheet_filter not in book.sheets:
+        results["errors"].append({"type": "file_error",
+                                  "message": f"Worksheet named '{sheet_filter}' not found"})
+        results["error_count"] = 1
+        return results
+
+    ev = Evaluator(book)
+    ev.run()
+
+    sheet_order = {name: i for i, name in enumerate(book.sheets)}
+    keys = sorted((k for k in book.formula_keys() if not sheet_filter or k[0] == sheet_filter),
+                  key=lambda k: (sheet_order[k[0]], k[1], k[2]))
+    results["sheets_checked"] = [s for s in book.sheets if not sheet_filter or s == sheet_filter]
+    results["formula_count"] = len(keys)
+    unsupported = Counter()
+    for key in keys:
+        status = ev.status[key]
+        if status == "ok":
+            results["evaluated"] += 1
+        elif status in ("cached", "unknown"):
+            results[status] += 1
+            if not ev.reasons[key].startswith("reads "):
+                unsupported[ev.reasons[key]] += 1
+        value = ev.values[key]
+        if status == "circular":
+            results["errors"].append({"type": "circular_ref", **_entry(book, key),
+                                      "detail": "Formula is part of a circular reference"})
+        elif status == "ok" and isinstance(value, XlError) and value in EXCEL_ERRORS:
+            results["errors"].append({"type": "runtime_error", "error": str(value),
+                                      **_entry(book, key), "inherited": key in ev.inherited})
+    results["unsupported"] = dict(unsupported.most_common())
+    results["error_count"] = len(results["errors"])
+    results["seconds"] = round(time.perf_counter() - t0, 3)
+    return results
+
+
+def print_results(results: dict, all_errors: bool = False) -> int:
+    """Print the human-readable evaluate() output. Returns the exit code."""
+    print(f"File   : {results['file']}")
+    print(f"Sheets : {', '.join(results['sheets_checked']) or '(none)'}")
+    print(f"Formulas              : {results['formula_count']}")
+    print(f"Evaluated natively    : {results['evaluated']}")
+    print(f"Kept cached value     : {results['cached']}")
+    print(f"Not evaluated         : {results['unknown']}")
+    print(f"Errors found          : {results['error_count']}")
+    print(f"Time                  : {results.get('seconds', 0):.2f}s")
+
+    errors = results["errors"]
+    inherited = sum(1 for e in errors if e.get("inherited"))
+    if errors:
+        print("\n── Error Details ──")
+        for e in errors:
+            if e["type"] == "runtime_error":
+                if e["inherited"] and not all_errors:
+                    continue
+                how = " (inherited)" if e["inherited"] else ""
+                print(f"  [FAIL] [{e['sheet']}!{e['cell']}] evaluates to {e['error']}{how} "
+                      f"(formula: {e['formula']})")
+            elif e["type"] == "circular_ref":
+                print(f"  [FAIL] [{e['sheet']}!{e['cell']}] circular reference "
+                      f"(formula: {e['formula']})")
+            elif e["type"] == "file_error":
+                print(f"  [FAIL] File error: {e['message']}")
+        if inherited and not all_errors:
+            print(f"  ... and {inherited} cell(s) that read one of these errors "
+                  "(--all-errors to list them)")
+    if results["unsupported"]:
+        print("\n── Not Evaluated Natively ──")
+        for reason, count in results["unsupported"].items():
+            print(f"  {reason}: {count} cell(s)")
+    print()
+
+    if results["error_count"] == 0:
+        print("PASS — No formula evaluates to an error")
+        return 0
+    print(f"FAIL — {results['error_count']} formula error(s) must be fixed before delivery")
+    return 1
+
+
+def main() -> None:
+    use_json = "--json" in sys.argv
+    all_errors = "--all-errors" in sys.argv
+    sheet_filter = None
+    args_clean = []
+
+    i = 1
+    while i < len(sys.argv):
+        arg = sys.argv[i]
+        if arg == "--sheet" and i + 1 < len(sys.argv):
+            sheet_filter = sys.argv[i + 1]
+            i += 2
+        elif arg.startswith("--"):
+            i += 1  # skip flags already handled
+        else:
+            args_clean.append(arg)
+            i += 1
+
+    if not args_clean:
+        print("Usage: formula_eval.py <input.xlsx> [--json] [--sheet NAME] [--all-errors]")
+        sys.exit(1)
+
+    results = evaluate(args_clean[0], sheet_filter=sheet_filter)
+    if use_json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        sys.exit(1 if results["error_count"] > 0 else 0)
+    sys.exit(print_results(results, all_errors))
+
+
+if __name__ == "__main__":
+    main()
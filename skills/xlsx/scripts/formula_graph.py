@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+"""
+formula_graph.py — Incremental recalculation through the formula dependency graph.
+
+After an edit (xlsx_insert_row.py, xlsx_add_column.py, xlsx_batch_edit.py),
+the cached <v> values of the formulas that read the edited cells are stale.
+Instead of a full libreoffice_recalc.py run, this module:
+
+    1. Builds the dependency graph of the edited workbook from its parsed
+       worksheet trees (formula_eval.DependencyGraph: which cells — constants
+       included — feed which formulas, directly or through ranges).
+    2. Takes the edited cells and collects the formulas downstream of them.
+    3. Evaluates only those cells natively (formula_eval.Evaluator), reading
+       every other cell's cached <v>; an upstream formula without a cached
+       value is evaluated as well.
+    4. Rewrites the <v> (and t=) of each recomputed cell in place.
+
+Cells that cannot be evaluated natively (unsupported function, circular
+reference, or an input with no known value) have their stale <v> removed
+and are listed, so a follow-up libreoffice_recalc.py run is only needed
+when that list is not empty.
+
+Used from the edit scripts with --recalc:
+    python3 xlsx_insert_row.py /tmp/work/ --at 6 --values B=3000 --recalc
+    python3 xlsx_add_column.py /tmp/work/ --col G --formula '=F{row}/$F$10' \\
+        --formula-rows 2:9 --recalc
+    python3 xlsx_batch_edit.py /tmp/work/ ops.json --recalc
+
+Python API:
+    result = recalculate({"Sheet1": root}, workbook_root, strings, {("Sheet1", 6, 2)})
+    result["recalculated"]   # [(sheet, row, col, value)] written to <v>
+    result["cleared"]        # [(sheet, row, col, reason)] whose <v> was removed
+"""
+
+import os
+import xml.etree.ElementTree as ET
+
+from formula_check import NSP
+from formula_eval import (
+    Evaluator,
+    Workbook,
+    XlError,
+    read_defined_names,
+    read_sheet,
+)
+from formula_tokens import cell_position, col_letter
+from xlsx_stream_reader import element_text
+
+
+def read_strings(path: str, pending: list | None = None) -> list:
+    """
+    Shared string table of an unpacked workbook (xl/sharedStrings.xml), with
+    strings queued but not yet written appended in index order.
+    """
+    strings = []
+    if os.path.exists(path):
+        for _, elem in ET.iterparse(path):
+            if elem.tag == f"{NSP}si":
+                strings.append(element_text(elem))
+                elem.clear()
+    return strings + list(pending or ())
+
+
+def _number_text(x: float) -> str:
+    return str(int(x)) if x.is_integer() and abs(x) < 1e15 else repr(x)
+
+
+def clear_value(c: ET.Element) -> None:
+    """Drop the cached result of a formula cell."""
+    for tag in ("v", "is"):
+        for child in c.findall(f"{NSP}{tag}"):
+            c.remove(child)
+    c.attrib.pop("t", None)
+
+
+def write_value(c: ET.Element, value) -> None:
+    """Store a computed result in a formula cell: <v> after <f>, with the matching t=."""
+    clear_value(c)
+    if isinstance(value, XlError):
+        c.set("t", "e")
+        text = str(value)
+    elif isinstance(value, bool):
+        c.set("t", "b")
+        text = "1" if value else "0"
+    elif isinstance(value, str):
+        c.set("t", "str")
+        text = value
+    else:
+        text = _number_text(value)
+    v = ET.Element(f"{NSP}v")
+    v.text = text
+    f = c.find(f"{NSP}f")
+    c.insert(list(c).index(f) + 1 if f is not None else 0, v)
+
+
+def load_book(sheets: dict, workbook: ET.Element, strings: list) -> Workbook:
+    """Workbook from parsed worksheet roots ({sheet name: root}, in workbook order)."""
+    book = Workbook()
+    book.sheets = list(sheets)
+    read_defined_names(book, workbook)
+    for name, root in sheets.items():
+        read_sheet(book, name, root.iter(f"{NSP}c"), strings)
+    return book
+
+
+def recalculate(sheets: dict, workbook: ET.Element, strings: list, changed=None) -> dict:
+    """
+    Recompute the formulas downstream of `changed` ({(sheet, row, col)}, the
+    cells an edit wrote) and rewrite their <v> in the trees of `sheets`.
+    changed=None recomputes every formula. Sheet names are matched
+    case-insensitively, in `changed` and in formula references alike.
+
+    Returns {"formula_count", "changed", "recalculated": [(sheet, row, col,
+    value)], "cleared": [(sheet, row, col, reason)], "sheets": names of the
+    sheets whose tree was modified}.
+    """
+    book = load_book(sheets, workbook, strings)
+    ev = Evaluator(book)
+    if changed is None:
+        targets = set(ev.asts)
+    else:
+        # Sheet names match case-insensitively, as in formula references
+        changed = {(book.sheet_name(sheet), row, col) for sheet, row, col in changed}
+        targets = ev.graph.downstream(key for key in changed if key[0] in book.cells)
+    ev.run(targets)
+
+    # Edited formulas the parser rejected keep no stale value either
+    if changed is not None:
+        targets |= {key for key in changed if key in ev.reasons}
+
+    result = {"formula_count": len(book.formula_keys()),
+              "changed": None if changed is None else len(changed),
+              "recalculated": [], "cleared": [], "sheets": []}
+    for sheet in book.sheets:
+        keys = {(key[1], key[2]): key for key in targets if key[0] == sheet}
+        if not keys:
+            continue
+        for c in sheets[sheet].iter(f"{NSP}c"):
+            pos = cell_position(c.get("r", ""))
+            key = keys.get(pos)
+            if key is None:
+                continue
+            if ev.status.get(key) == "ok":
+                write_value(c, ev.values[key])
+                result["recalculated"].append((*key, ev.values[key]))
+            else:
+                reason = "circular reference" if ev.status.get(key) == "circular" \
+                    else ev.reasons.get(key, "not evaluated")
+                clear_value(c)
+                result["cleared"].append((*key, reason))
+        result["sheets"].append(sheet)
+    order = {name: i for i, name in enumerate(book.sheets)}
+    for name in ("recalculated", "cleared"):
+        result[name].sort(key=lambda item: (order[item[0]], item[1], item[2]))
+    return result
+
+
+def report_lines(result: dict, limit: int = 20) -> list[str]:
+    """Progress lines for an edit script's log."""
+    recalculated, cleared = result["recalculated"], result["cleared"]
+    scope = ("every formula" if result["changed"] is None
+             else f"formulas downstream of {result['changed']} edited cell(s)")
+    lines = [f"Recalculated {len(recalculated)} of {result['formula_count']} formula cell(s) "
+             f"({scope})"]
+    for sheet, row, col, value in recalculated[:limit]:
+        shown = _number_text(value) if isinstance(value, float) else value
+        lines.append(f"  {sheet}!{col_letter(col)}{row} = {shown}")
+    if len(recalculated) > limit:
+        lines.append(f"  ... {len(recalculated) - limit} more")
+    errors = [item for item in recalculated if isinstance(item[3], XlError)]
+    if errors:
+        lines.append(f"  {len(errors)} recalculated cell(s) evaluate to an error — "
+                     "run formula_eval.py for details")
+    if cleared:
+        lines.append(f"  {len(cleared)} cell(s) could not be evaluated natively; their cached "
+                     "values were removed (run libreoffice_recalc.py to refill them):")
+        for sheet, row, col, reason in cleared[:limit]:
+            lines.append(f"    {sheet}!{col_letter(col)}{row}: {reason}")
+        if len(cleared) > limit:
+            lines.append(f"    ... {len(cleared) - limit} more")
+    return lines
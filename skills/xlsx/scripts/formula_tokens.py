@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+"""
+formula_tokens.py — Shared, cached tokenizer for Excel formula text.
+
+Used by formula_check.py (sheet / name reference extraction) and
+xlsx_shift_rows.py (row shifting), so both scripts agree on what is a cell
+reference, a sheet prefix, a string literal or a function call.
+
+Token kinds:
+    string   "text literal"             value: literal text, "" unescaped
+    sheet    'Sheet Name'!  or  Sheet1!  value: sheet name, '' unescaped
+    error    #REF!  #DIV/0!  #N/A  ...
+    ref      A1  $B$7  AB$12
+    func     SUM  IFERROR  _xlfn.XLOOKUP (identifier followed by "(")
+                                        value: upper-cased name
+    name     defined names, TRUE/FALSE, structured-reference parts
+    number   12  3.5  1E-3
+    op       operators, punctuation and whitespace
+
+Joining the text of every token reproduces the formula exactly, so callers
+can rewrite selected tokens and re-join the rest untouched.
+
+Tokenization is memoised on the formula text: shared and copy-pasted
+formulas repeat thousands of times in real workbooks and are only
+tokenized once per process.
+
+Usage (debugging):
+    python3 formula_tokens.py "SUM('Q1 Data'!B2:B9)/Total"
+"""
+
+import re
+import sys
+from functools import lru_cache
+from typing import NamedTuple
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    value: str
+
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ref>\$?[A-Z]{1,3}\$?[0-9]+)(?![A-Za-z0-9_.(!])
+    | (?P<op>[^"'\#$A-Za-z_0-9.\\\u4e00-\u9fff]+)
+    | (?P<func>[A-Za-z_][A-Za-z0-9_.]*)(?=\s*\()
+    | (?P<sheet>[A-Za-z_\u4e00-\u9fff][A-Za-z0-9_.·\u4e00-\u9fff]*!)
+    | (?P<qsheet>'(?:[^']|'')*'!)
+    | (?P<string>"(?:[^"]|"")*"?)
+    | (?P<error>\#(?:NULL!|DIV/0!|VALUE!|REF!|NAME\?|NUM!|N/A|GETTING_DATA))
+    | (?P<name>[A-Za-z_\\][A-Za-z0-9_.]*)
+    | (?P<number>(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[Ee][+-]?[0-9]+)?)
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Splits a single "ref" token into ($col, col, $row, row)
+REF_PARTS_RE = re.compile(r"(\$?)([A-Z]{1,3})(\$?)([0-9]+)")
+
+TOKEN_CACHE_SIZE = 1 << 16
+
+# Worksheet grid limits (XFD1048576)
+MAX_ROW = 1048576
+MAX_COL = 16384
+
+# Kinds whose value is the token text itself (the common case on hot paths)
+_PLAIN_KINDS = frozenset({"ref", "op", "name", "number", "error"})
+
+# Builds Token instances without going through the Python-level __new__
+_new_token = tuple.__new__
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def tokenize(formula: str) -> tuple[Token, ...]:
+    """Split formula text (without the leading "=") into a tuple of Tokens."""
+    tokens = []
+    append = tokens.append
+    for m in _TOKEN_RE.finditer(formula):
+        kind = m.lastgroup
+        text = m.group()
+        if kind in _PLAIN_KINDS:
+            append(_new_token(Token, (kind, text, text)))
+        elif kind == "qsheet":
+            append(_new_token(Token, ("sheet", text, text[1:-2].replace("''", "'"))))
+        elif kind == "sheet":
+            append(_new_token(Token, ("sheet", text, text[:-1])))
+        elif kind == "string":
+            append(_new_token(Token, ("string", text, text[1:-1].replace('""', '"'))))
+        elif kind == "func":
+            append(_new_token(Token, ("func", text, text.upper())))
+        else:
+            append(_new_token(Token, ("op", text, text)))
+    return tuple(tokens)
+
+
+def split_ref(text: str) -> tuple[str, str, str, int] | None:
+    """Split "$B$7" into ("$", "B", "$", 7); None if text is not a cell ref."""
+    m = REF_PARTS_RE.fullmatch(text)
+    if m is None:
+        return None
+    return m.group(1), m.group(2), m.group(3), int(m.group(4))
+
+
+def col_number(s: str) -> int:
+    """Convert Excel column letter(s) to 1-based column number."""
+    n = 0
+    for c in s.upper():
+        n = n * 26 + (ord(c) - 64)
+    return n
+
+
+def col_letter(n: int) -> str:
+    """Convert 1-based column number to Excel column letter(s)."""
+    r = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        r = chr(65 + rem) + r
+    return r
+
+
+def cell_position(cell_ref: str) -> tuple[int, int] | None:
+    """Return (row, col) for an address like "B7" or "$B$7"; None if invalid."""
+    parts = split_ref(cell_ref)
+    if parts is None:
+        return None
+    return parts[3], col_number(parts[1])
+
+
+def relative_key(formula: str, row: int, col: int) -> tuple[str, ...]:
+    """
+    R1C1-style canonical form of a formula as seen from cell (row, col).
+
+    Relative references become offsets (R[1]C[-2]) and absolute ones stay
+    fixed (R7C2), so B2*C2 in D2 and B3*C3 in D3 share a key — exactly the
+    formulas Excel stores as one shared-formula group.
+    """
+    key = []
+    for tok in tokenize(formula):
+        if tok.kind == "ref":
+            dollar_col, col_part, dollar_row, r = split_ref(tok.text)
+            c = col_number(col_part)
+            key.append(
+                (f"R{r}" if dollar_row else f"R[{r - row}]")
+                + (f"C{c}" if dollar_col else f"C[{c - col}]")
+            )
+        else:
+            key.append(tok.text)
+    return tuple(key)
+
+
+def translate_formula(formula: str, d_row: int, d_col: int) -> str:
+    """
+    Re-anchor the relative references of a formula by (d_row, d_col).
+
+    This is what Excel does when it fills a shared formula into a consumer
+    cell: $-anchored parts stay, the rest move. References pushed off the
+    grid become #REF!.
+    """
+    if d_row == 0 and d_col == 0:
+        return formula
+    out = []
+    for tok in tokenize(formula):
+        if tok.kind != "ref":
+            out.append(tok.text)
+            continue
+        dollar_col, col_part, dollar_row, r = split_ref(tok.text)
+        c = col_number(col_part)
+        if not dollar_row:
+            r += d_row
+        if not dollar_col:
+            c += d_col
+        if not (1 <= r <= MAX_ROW and 1 <= c <= MAX_COL):
+            out.append("#REF!")
+        else:
+            out.append(f"{dollar_col}{col_letter(c)}{dollar_row}{r}")
+    return "".join(out)
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print('Usage: formula_tokens.py "<formula>"')
+        sys.exit(1)
+    formula = sys.argv[1].lstrip("=")
+    for tok in tokenize(formula):
+        if tok.kind == "op" and tok.text.isspace():
+            continue
+        extra = f"  -> {tok.value!r}" if tok.value != tok.text else ""
+        print(f"  {tok.kind:<7} {tok.text!r}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,8 +13,31 @@ After recalculation, run formula_check.py on the output file to detect runtime e
 Usage:
     python3 libreoffice_recalc.py input.xlsx output.xlsx
     python3 libreoffice_recalc.py input.xlsx output.xlsx --timeout 90
+    python3 libreoffice_recalc.py a.xlsx a_out.xlsx b.xlsx b_out.xlsx --workers 2
+    python3 libreoffice_recalc.py --batch models/ --outdir /tmp/recalc --workers 4
+    python3 libreoffice_recalc.py --batch files.txt --outdir /tmp/recalc --no-cache
     python3 libreoffice_recalc.py --check          # check LibreOffice availability only
 
+Several input/output pairs (or --workers N) go through a RecalcPool: N
+long-lived soffice instances, each with its own user profile, fed from one
+job queue, so the several seconds of LibreOffice start-up are paid once per
+instance instead of once per file. When the UNO Python bridge is importable
+(`import uno`, e.g. the python3-uno package) each instance is a headless
+soffice server on a private pipe and a job is load → calculateAll() → store;
+otherwise each job is a --convert-to run that reuses the worker's warm
+profile. A file that exceeds --timeout has its instance killed; the instance
+is restarted before the next file, and the other workers carry on.
+
+--batch takes a directory (every .xlsx / .xlsm below it, mirrored under
+--outdir) or a manifest file ("input" or "input<TAB>output" per line).
+Whenever several files are recalculated, each input's SHA-256 (together
+with the LibreOffice version) is looked up in a cache of earlier outputs
+(--cache, default ~/.cache/xlsx_recalc; --no-cache to bypass), and only
+misses reach LibreOffice. In --convert-to mode the misses are split into
+batches of up to --batch-size files, each converted by one soffice run, and
+the batches run concurrently on the --workers instances. Every file is
+reported with its status (OK / CACHED / ERROR) and seconds.
+
 Exit codes:
     0 — recalculation succeeded, output file written
     2 — LibreOffice not found (Tier 2 unavailable — not a hard failure, note in report)
@@ -25,8 +48,24 @@ import subprocess
 import sys
 import shutil
 import os
+import queue
+import signal
 import tempfile
+import threading
+import time
 import argparse
+import hashlib
+from concurrent.futures import Future
+from functools import lru_cache
+
+try:
+    import uno
+except ImportError:  # UNO bridge not installed: the pool uses --convert-to runs
+    uno = None
+
+INFILTER = "Calc MS Excel 2007 XML"
+STARTUP_TIMEOUT = 60           # seconds for a pooled soffice to accept connections
+MAX_JOBS_PER_INSTANCE = 200    # recycle long-lived instances (LibreOffice leaks)
 
 
 # ── LibreOffice discovery ───────────────────────────────────────────────────
@@ -55,8 +94,9 @@ def find_soffice() -> str | None:
     return None
 
 
+@lru_cache(maxsize=None)
 def get_libreoffice_version(soffice: str) -> str:
-    """Return LibreOffice version string, or 'unknown' on failure."""
+    """Return LibreOffice version string, or 'unknown' on failure (asked once per binary)."""
     try:
         result = subprocess.run(
             [soffice, "--version"],
@@ -70,6 +110,22 @@ def get_libreoffice_version(soffice: str) -> str:
 
 # ── Recalculation ───────────────────────────────────────────────────────────
 
+NOT_FOUND_MESSAGE = (
+    "LibreOffice not found. Tier 2 validation is unavailable in this environment. "
+    "Install LibreOffice to enable dynamic formula recalculation.\n"
+    "  macOS:  brew install --cask libreoffice\n"
+    "  Linux:  sudo apt-get install -y libreoffice"
+)
+
+
+def _timeout_message(timeout: int) -> str:
+    return (
+        f"LibreOffice timed out after {timeout}s. "
+        "The file may be too large or contain constructs that cause LibreOffice to hang. "
+        "Try increasing --timeout or simplify the file."
+    )
+
+
 def recalculate(
     input_path: str,
     output_path: str,
@@ -85,12 +141,7 @@ def recalculate(
     """
     soffice = find_soffice()
     if not soffice:
-        return False, (
-            "LibreOffice not found. Tier 2 validation is unavailable in this environment. "
-            "Install LibreOffice to enable dynamic formula recalculation.\n"
-            "  macOS:  brew install --cask libreoffice\n"
-            "  Linux:  sudo apt-get install -y libreoffice"
-        )
+        return False, NOT_FOUND_MESSAGE
 
     version = get_libreoffice_version(soffice)
 
@@ -104,7 +155,7 @@ def recalculate(
             soffice,
             "--headless",
             "--norestore",           # do not attempt to restore crashed sessions
-            "--infilter=Calc MS Excel 2007 XML",
+            f"--infilter={INFILTER}",
             "--convert-to", "xlsx",
             "--outdir", tmpdir,
             tmp_input,
@@ -117,11 +168,7 @@ def recalculate(
                 timeout=timeout,
             )
         except subprocess.TimeoutExpired:
-            return False, (
-                f"LibreOffice timed out after {timeout}s. "
-                "The file may be too large or contain constructs that cause LibreOffice to hang. "
-                "Try increasing --timeout or simplify the file."
-            )
+            return False, _timeout_message(timeout)
         except FileNotFoundError:
             return False, f"LibreOffice binary not executable: {soffice}"
 
@@ -158,6 +205,536 @@ def recalculate(
     return True, f"Recalculation complete. LibreOffice {version}. Output: {output_path}"
 
 
+# ── Persistent worker pool ──────────────────────────────────────────────────
+
+def _kill_tree(proc: subprocess.Popen) -> None:
+    """Kill soffice and its soffice.bin child (started in their own session)."""
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+def _converted_path(src: str, out_dir: str) -> str:
+    """Where LibreOffice writes the xlsx converted from src."""
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(src))[0] + ".xlsx")
+
+
+def _file_url(path: str) -> str:
+    if uno is not None:
+        return uno.systemPathToFileUrl(os.path.abspath(path))
+    return "file://" + os.path.abspath(path).replace(os.sep, "/")
+
+
+class _SofficeWorker:
+    """
+    One pooled LibreOffice instance with a private user profile under
+    workdir. Without UNO there is no server to keep: each batch is one
+    --convert-to process, but the profile (created on the first, slowest
+    start) is reused. kill() may be called from the watchdog thread while
+    recalculate() is blocked in the worker thread; the blocked call then
+    fails and the instance is restarted before the next file.
+    """
+
+    def __init__(self, soffice: str, workdir: str, name: str, use_uno: bool):
+        self.soffice = soffice
+        self.workdir = workdir
+        self.name = name
+        self.use_uno = use_uno
+        self.profile_url = _file_url(os.path.join(workdir, "profile"))
+        self.proc = None
+        self.desktop = None
+        self.jobs = 0
+        self.killed = True        # not started yet
+        self.generation = 0
+
+    def _base_cmd(self) -> list:
+        return [
+            self.soffice,
+            "--headless",
+            "--norestore",
+            "--nologo",
+            "--nodefault",
+            "--nolockcheck",
+            f"-env:UserInstallation={self.profile_url}",
+        ]
+
+    @property
+    def alive(self) -> bool:
+        if not self.use_uno:
+            return True
+        return self.desktop is not None and self.proc is not None and self.proc.poll() is None
+
+    def start(self) -> None:
+        """Start (or restart) the soffice server and connect to it over UNO."""
+        self.close()
+        self.killed = False
+        self.jobs = 0
+        if not self.use_uno:
+            return
+        self.generation += 1
+        pipe = f"xlsx_recalc_{os.getpid()}_{self.name}_{self.generation}"
+        cmd = self._base_cmd() + [f"--accept=pipe,name={pipe};urp;StarOffice.ComponentContext"]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                     start_new_session=True)
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(f"uno:pipe,name={pipe};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                # NoConnectException until soffice is listening
+                if self.proc.poll() is not None:
+                    raise RuntimeError(f"soffice exited with code {self.proc.returncode} during start-up")
+                if time.monotonic() > deadline:
+                    _kill_tree(self.proc)
+                    raise RuntimeError(f"soffice did not accept connections within {STARTUP_TIMEOUT}s")
+                time.sleep(0.25)
+        self.desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+
+    def recalculate(self, src: str, out_dir: str) -> str:
+        """UNO mode: recalculate src into out_dir; return the output path."""
+        self.jobs += 1
+        dst = _converted_path(src, out_dir)
+        doc = self.desktop.loadComponentFromURL(
+            _file_url(src), "_blank", 0, _props(Hidden=True, FilterName=INFILTER))
+        if doc is None:
+            raise RuntimeError("LibreOffice could not open the file")
+        try:
+            doc.calculateAll()
+            doc.storeToURL(_file_url(dst), _props(FilterName=INFILTER, Overwrite=True))
+        finally:
+            doc.close(True)
+        return dst
+
+    def convert(self, srcs: list, out_dir: str, timeout: int) -> str | None:
+        """
+        --convert-to mode: one soffice run over all of srcs, writing
+        <stem>.xlsx files into out_dir in order. The run is killed when no
+        new output appears for timeout seconds, so the timeout stays per
+        file. Returns None, or an error message when the run failed.
+        """
+        self.jobs += len(srcs)
+        cmd = self._base_cmd() + [
+            f"--infilter={INFILTER}",
+            "--convert-to", "xlsx",
+            "--outdir", out_dir,
+        ] + srcs
+        log_path = os.path.join(self.workdir, "soffice.log")
+        with open(log_path, "wb") as log:
+            self.proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT,
+                                         start_new_session=True)
+            done, deadline = 0, time.monotonic() + timeout
+            while self.proc.poll() is None:
+                time.sleep(0.2)
+                now_done = len(os.listdir(out_dir))
+                if now_done > done:
+                    done, deadline = now_done, time.monotonic() + timeout
+                elif time.monotonic() > deadline:
+                    self.kill()
+                    return _timeout_message(timeout)
+        if self.proc.returncode != 0:
+            with open(log_path, "rb") as log:
+                output = log.read().decode(errors="replace").strip()
+            return f"LibreOffice exited with code {self.proc.returncode}.\noutput: {output}"
+        return None
+
+    def kill(self) -> None:
+        """Watchdog: kill a hung instance; the next job restarts it."""
+        self.killed = True
+        self.desktop = None
+        if self.proc is not None:
+            _kill_tree(self.proc)
+
+    def close(self) -> None:
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass  # bridge already gone
+            self.desktop = None
+        if self.proc is not None:
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+            _kill_tree(self.proc)
+            self.proc = None
+
+
+def _props(**values) -> tuple:
+    from com.sun.star.beans import PropertyValue
+    props = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name, prop.Value = name, value
+        props.append(prop)
+    return tuple(props)
+
+
+class RecalcPool:
+    """
+    N long-lived LibreOffice workers behind one queue of file batches.
+
+        with RecalcPool(soffice, workers=4, timeout=60) as pool:
+            futures = pool.submit_batch(pairs)        # one future per pair
+            for f in futures:
+                ok, message, seconds = f.result()
+
+    A batch goes to one worker: in --convert-to mode it is a single soffice
+    run over all of its files, so batches (not files) are what run in
+    parallel. submit(src, dst) is a batch of one. Each future resolves to
+    (success, message, seconds); message reads like recalculate()'s.
+    use_uno defaults to whether the UNO bridge imports.
+    """
+
+    def __init__(self, soffice: str, workers: int = 1, timeout: int = 60,
+                 use_uno: bool | None = None):
+        self.soffice = soffice
+        self.timeout = timeout
+        self.use_uno = (uno is not None) if use_uno is None else use_uno
+        self.version = get_libreoffice_version(soffice)
+        self._jobs = queue.Queue()
+        self._tmp = tempfile.mkdtemp(prefix="xlsx_recalc_pool_")
+        self._threads = []
+        for i in range(max(1, workers)):
+            workdir = os.path.join(self._tmp, f"worker{i}")
+            os.makedirs(workdir)
+            worker = _SofficeWorker(soffice, workdir, str(i), self.use_uno)
+            thread = threading.Thread(target=self._serve, args=(worker,),
+                                      name=f"recalc-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, input_path: str, output_path: str) -> Future:
+        """Queue one recalculation; the future resolves to (success, message, seconds)."""
+        return self.submit_batch([(input_path, output_path)])[0]
+
+    def submit_batch(self, pairs: list) -> list:
+        """Queue (input, output) pairs as one batch; return one future per pair."""
+        futures = [Future() for _ in pairs]
+        self._jobs.put((futures, list(pairs)))
+        return futures
+
+    def close(self) -> None:
+        """Finish queued jobs, stop every instance and remove the profiles."""
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _serve(self, worker: _SofficeWorker) -> None:
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                futures, pairs = job
+                live = [i for i, f in enumerate(futures) if f.set_running_or_notify_cancel()]
+                if not live:
+                    continue
+                try:
+                    results = self._run(worker, [pairs[i] for i in live])
+                except Exception as e:
+                    # Keep serving: a dead thread would leave these futures
+                    # (and every later batch) waiting forever
+                    worker.kill()
+                    results = [(False, f"LibreOffice recalculation failed: {e}", 0.0)] * len(live)
+                for i, result in zip(live, results):
+                    futures[i].set_result(result)
+        finally:
+            worker.close()
+
+    def _ensure_started(self, worker: _SofficeWorker) -> str | None:
+        if worker.killed or not worker.alive or worker.jobs >= MAX_JOBS_PER_INSTANCE:
+            try:
+                worker.start()
+            except Exception as e:
+                return f"Could not start LibreOffice: {e}"
+        return None
+
+    def _run(self, worker: _SofficeWorker, pairs: list) -> list:
+        results = [None] * len(pairs)
+        # Separate in/out directories (--convert-to writes <stem>.xlsx, the
+        # input's own name); an index prefix keeps equal basenames apart
+        job_dir = tempfile.mkdtemp(dir=worker.workdir)
+        try:
+            in_dir, out_dir = os.path.join(job_dir, "in"), os.path.join(job_dir, "out")
+            os.makedirs(in_dir)
+            os.makedirs(out_dir)
+            srcs, pending = [], []
+            for i, (input_path, _) in enumerate(pairs):
+                src = os.path.join(in_dir, f"{i:04d}_{os.path.basename(input_path)}")
+                srcs.append(src)
+                try:
+                    shutil.copy(input_path, src)
+                    pending.append(i)
+                except OSError as e:
+                    results[i] = (False, f"Could not copy {input_path}: {e}", 0.0)
+
+            run = self._run_uno if worker.use_uno else self._run_convert
+            while pending:
+                error = self._ensure_started(worker)
+                if error:
+                    for i in pending:
+                        results[i] = (False, error, 0.0)
+                    break
+                pending = run(worker, srcs, pending, out_dir, results)
+
+            for i, (_, output_path) in enumerate(pairs):
+                if results[i][0]:
+                    try:
+                        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+                        shutil.copy(_converted_path(srcs[i], out_dir), output_path)
+                    except OSError as e:
+                        results[i] = (False, f"Could not write {output_path}: {e}", results[i][2])
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        return [
+            (True, f"Recalculation complete. LibreOffice {self.version}. Output: {output_path}",
+             seconds) if ok else (ok, message, seconds)
+            for (ok, message, seconds), (_, output_path) in zip(results, pairs)
+        ]
+
+    def _run_uno(self, worker, srcs, pending, out_dir, results) -> list:
+        """Recalculate the first pending file over UNO; return the files still pending."""
+        i = pending[0]
+        watchdog = threading.Timer(self.timeout, worker.kill)
+        t0 = time.monotonic()
+        watchdog.start()
+        try:
+            worker.recalculate(srcs[i], out_dir)
+            error = None
+        except Exception as e:
+            error = f"LibreOffice recalculation failed: {e}"
+        finally:
+            watchdog.cancel()
+        seconds = time.monotonic() - t0
+        if worker.killed:
+            results[i] = (False, _timeout_message(self.timeout), seconds)
+        elif error:
+            # Bridge errors leave the instance unusable: restart it
+            worker.kill()
+            results[i] = (False, error, seconds)
+        else:
+            results[i] = (True, "", seconds)
+        return pending[1:]
+
+    def _run_convert(self, worker, srcs, pending, out_dir, results) -> list:
+        """
+        One --convert-to run over all pending files. Per-file seconds are
+        the gaps between output modification times. When the run fails,
+        the first file without output is charged with the error and the
+        files after it are returned to be retried.
+        """
+        start = time.time()
+        error = worker.convert([srcs[i] for i in pending], out_dir, self.timeout)
+        previous = start
+        missing = []
+        for i in pending:
+            dst = _converted_path(srcs[i], out_dir)
+            if os.path.isfile(dst):
+                finished = os.path.getmtime(dst)
+                results[i] = (True, "", max(0.0, finished - previous))
+                previous = max(previous, finished)
+            else:
+                missing.append(i)
+        if not missing:
+            return []
+        results[missing[0]] = (False, error or "LibreOffice produced no output for this file.",
+                               max(0.0, time.time() - previous))
+        return missing[1:]
+
+
+# ── Batch mode ──────────────────────────────────────────────────────────────
+
+BATCH_EXTENSIONS = (".xlsx", ".xlsm")
+BATCH_SIZE = 10                # files per soffice run in --convert-to mode
+
+
+def collect_batch(source: str, outdir: str | None) -> list:
+    """
+    (input, output) pairs for --batch. source is either a directory (every
+    .xlsx / .xlsm below it, outputs mirroring the tree under outdir) or a
+    manifest: one "input" or "input<TAB>output" per line, paths relative to
+    the manifest, blank lines and "#" comments ignored. Raises ValueError.
+    """
+    pairs = []
+    if os.path.isdir(source):
+        if not outdir:
+            raise ValueError("--batch with a directory needs --outdir")
+        out_root = os.path.abspath(outdir)
+        for root, dirs, files in os.walk(source):
+            dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != out_root)
+            for name in sorted(files):
+                # Skip Excel (~$) and LibreOffice (.~lock) lock files
+                if name.lower().endswith(BATCH_EXTENSIONS) and not name.startswith(("~$", ".~lock")):
+                    path = os.path.join(root, name)
+                    rel = os.path.relpath(path, source)
+                    pairs.append((path, os.path.join(outdir, os.path.splitext(rel)[0] + ".xlsx")))
+        return pairs
+    if not os.path.isfile(source):
+        raise ValueError(f"Batch source not found: {source}")
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [f.strip() for f in line.split("\t") if f.strip()]
+            input_path = os.path.join(base, fields[0])
+            if len(fields) > 1:
+                output_path = os.path.join(base, fields[1])
+            elif outdir:
+                output_path = os.path.join(outdir, os.path.splitext(os.path.basename(fields[0]))[0] + ".xlsx")
+            else:
+                raise ValueError(f"{source}:{line_no}: no output path and no --outdir")
+            pairs.append((input_path, output_path))
+    return pairs
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "xlsx_recalc")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RecalcCache:
+    """
+    Recalculated outputs keyed by the SHA-256 of the input's bytes plus the
+    LibreOffice version and pool mode. Each output is stored under its own
+    digest as well, so feeding a recalculated file back in is also a hit.
+    """
+
+    def __init__(self, directory: str, version: str, use_uno: bool):
+        self.directory = directory
+        self.tag = hashlib.sha256(f"{version}|{'uno' if use_uno else 'convert'}".encode()).hexdigest()[:12]
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}-{self.tag}.xlsx")
+
+    def fetch(self, digest: str, output_path: str) -> bool:
+        """Copy the cached output for digest to output_path; False on a miss."""
+        cached = self._path(digest)
+        if not os.path.isfile(cached):
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        shutil.copy(cached, output_path)
+        return True
+
+    def store(self, digest: str, output_path: str) -> None:
+        for key in (digest, file_digest(output_path)):
+            # Copy then rename, so concurrent runs never read a partial entry
+            tmp = self._path(key) + f".{os.getpid()}.tmp"
+            shutil.copy(output_path, tmp)
+            os.replace(tmp, self._path(key))
+
+
+def recalculate_batch(pairs: list, workers: int, timeout: int,
+                      batch_size: int = BATCH_SIZE, cache_dir: str | None = None) -> None:
+    """
+    Recalculate (input, output) pairs through a RecalcPool, taking cache
+    hits first and sending the rest in batches of up to batch_size files.
+    Prints one line per file with its status and seconds; exits like main().
+    """
+    soffice = find_soffice()
+    if not soffice:
+        print(f"SKIP (Tier 2 unavailable): {NOT_FOUND_MESSAGE}")
+        sys.exit(2)
+
+    use_uno = uno is not None
+    version = get_libreoffice_version(soffice)
+    cache = RecalcCache(cache_dir, version, use_uno) if cache_dir else None
+    started = time.monotonic()
+
+    results = [None] * len(pairs)   # (status, seconds, message)
+    digests = [None] * len(pairs)
+    todo = []
+    for i, (input_path, output_path) in enumerate(pairs):
+        if not os.path.isfile(input_path):
+            results[i] = ("ERROR", 0.0, f"Input file not found: {input_path}")
+            continue
+        if cache:
+            t0 = time.monotonic()
+            digests[i] = file_digest(input_path)
+            if cache.fetch(digests[i], output_path):
+                results[i] = ("CACHED", time.monotonic() - t0, "")
+                continue
+        todo.append(i)
+
+    workers = max(1, min(workers, len(todo)))
+    mode = "UNO server" if use_uno else "--convert-to"
+    print(f"Files  : {len(pairs)} ({len(pairs) - len(todo)} cached or missing)")
+    print(f"Workers: {workers} ({mode} mode)")
+    print(f"Timeout: {timeout}s per file")
+    print()
+
+    def report(i):
+        status, seconds, message = results[i]
+        src, dst = pairs[i]
+        print(f"{status:<7} {seconds:>7.2f}s  {src} -> {dst}")
+        if message:
+            print(f"        {message}")
+
+    for i in range(len(pairs)):
+        if results[i]:
+            report(i)
+    if todo:
+        # At least one batch per worker, so every worker has something to do
+        size = max(1, min(batch_size, -(-len(todo) // workers)))
+        with RecalcPool(soffice, workers=workers, timeout=timeout, use_uno=use_uno) as pool:
+            jobs = []
+            for k in range(0, len(todo), size):
+                chunk = todo[k:k + size]
+                jobs += zip(chunk, pool.submit_batch([pairs[i] for i in chunk]))
+            for i, future in jobs:
+                success, message, seconds = future.result()
+                note = ""
+                if success and cache:
+                    try:
+                        cache.store(digests[i], pairs[i][1])
+                    except OSError as e:
+                        note = f"Not cached: {e}"
+                results[i] = ("OK", seconds, note) if success else ("ERROR", seconds, message)
+                report(i)
+
+    counts = {status: sum(1 for r in results if r[0] == status) for status in ("OK", "CACHED", "ERROR")}
+    print()
+    print(f"{counts['OK']} recalculated, {counts['CACHED']} from cache, {counts['ERROR']} failed "
+          f"in {time.monotonic() - started:.1f}s.")
+    if counts["ERROR"]:
+        sys.exit(1)
+    print("Next step: run formula_check.py on the recalculated files to detect runtime errors.")
+    sys.exit(0)
+
+
 # ── CLI ─────────────────────────────────────────────────────────────────────
 
 def main() -> None:
@@ -175,13 +752,34 @@ Examples:
   # Check if LibreOffice is available (useful in CI)
   python3 libreoffice_recalc.py --check
 
+  # Many files through 4 persistent LibreOffice instances
+  python3 libreoffice_recalc.py a.xlsx /tmp/a.xlsx b.xlsx /tmp/b.xlsx c.xlsx /tmp/c.xlsx --workers 4
+
+  # Every workbook under models/ into /tmp/recalc/, 4 LibreOffice runs at a time;
+  # unchanged files come from the cache on the next run
+  python3 libreoffice_recalc.py --batch models/ --outdir /tmp/recalc --workers 4
+
+  # Files listed in a manifest ("input" or "input<TAB>output" per line)
+  python3 libreoffice_recalc.py --batch files.txt --outdir /tmp/recalc
+
   # Full validation pipeline
   python3 libreoffice_recalc.py input.xlsx /tmp/recalc.xlsx && \\
     python3 formula_check.py /tmp/recalc.xlsx
 """,
     )
-    parser.add_argument("input", nargs="?", help="Input xlsx file path")
-    parser.add_argument("output", nargs="?", help="Output xlsx file path (recalculated)")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        metavar="INPUT OUTPUT",
+        help="Input xlsx path and output path (recalculated); several pairs may be given",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Persistent LibreOffice instances for several files (default: 1)",
+    )
     parser.add_argument(
         "--timeout",
         type=int,
@@ -189,6 +787,34 @@ Examples:
         metavar="SECONDS",
         help="Maximum time to wait for LibreOffice (default: 60)",
     )
+    parser.add_argument(
+        "--batch",
+        metavar="PATH",
+        help="Recalculate every .xlsx/.xlsm under a directory, or the files listed in a manifest",
+    )
+    parser.add_argument(
+        "--outdir",
+        metavar="DIR",
+        help="Output directory for --batch (required for a directory)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        metavar="N",
+        help=f"Files per LibreOffice run in --convert-to mode (default: {BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="DIR",
+        default=default_cache_dir(),
+        help="Cache of recalculated outputs for several files (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Recalculate every file even if an identical one was done before",
+    )
     parser.add_argument(
         "--check",
         action="store_true",
@@ -213,10 +839,27 @@ Examples:
             sys.exit(2)
 
     # ── Recalculation mode ────────────────────────────────────────────────────
-    if not args.input or not args.output:
+    cache_dir = None if args.no_cache else args.cache
+    if args.batch:
+        try:
+            pairs = collect_batch(args.batch, args.outdir)
+        except (ValueError, OSError) as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        if not pairs:
+            print(f"ERROR: No .xlsx/.xlsm files found in {args.batch}")
+            sys.exit(1)
+        recalculate_batch(pairs, args.workers, args.timeout, max(1, args.batch_size), cache_dir)
+
+    if not args.files or len(args.files) % 2:
         parser.print_help()
         sys.exit(1)
 
+    if len(args.files) > 2 or args.workers > 1:
+        recalculate_batch(list(zip(args.files[::2], args.files[1::2])), args.workers,
+                          args.timeout, max(1, args.batch_size), cache_dir)
+    args.input, args.output = args.files
+
     if not os.path.isfile(args.input):
         print(f"ERROR: Input file not found: {args.input}")
         sys.exit(1)
@@ -13,6 +13,20 @@ Usage (print index table instead of XML, for reference):
     python3 shared_strings_builder.py --index "Revenue" "Cost" "Gross Profit"
     python3 shared_strings_builder.py --index --file strings.txt
 
+Usage (streaming, for very large string sets):
+    python3 shared_strings_builder.py --stream --file strings.txt -o /tmp/xlsx_work/xl/sharedStrings.xml
+    generate_labels | python3 shared_strings_builder.py --stream --file - > sharedStrings.xml
+    python3 shared_strings_builder.py --stream --file strings.txt -o sst.xml --index-out sst.tsv
+    python3 shared_strings_builder.py --stream --comments --file strings.txt > sharedStrings.xml
+
+    Strings are read, de-duplicated and written one at a time; only a 16-byte
+    digest per unique string is kept for de-duplication, so memory does not
+    depend on string length and no copy of the table is built in memory.
+    --comments adds the <!-- index N --> markers (off by default in this mode),
+    --index-out writes a compact "index<TAB>string" sidecar.
+    When the output is a regular file the count/uniqueCount attributes are
+    filled in at the end; on a pipe they are omitted (both are optional).
+
 Output format:
     Valid xl/sharedStrings.xml written to stdout.
     Redirect to the correct path:
@@ -27,9 +41,12 @@ Notes:
     - Leading/trailing spaces are preserved with xml:space="preserve".
 """
 
+import os
 import sys
 import html
 import argparse
+import hashlib
+from typing import IO, Iterable, Iterator
 
 
 HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
@@ -97,6 +114,139 @@ def load_from_file(path: str) -> list[str]:
         return [line.rstrip("\n") for line in f if line.strip()]
 
 
+def iter_lines(stream: IO[str]) -> Iterator[str]:
+    """Yield one string per non-empty line (same rule as load_from_file)."""
+    for line in stream:
+        if line.strip():
+            yield line.rstrip("\n")
+
+
+def iter_unique(strings: Iterable[str], stats: dict) -> Iterator[str]:
+    """
+    Yield first occurrences only, remembering a 128-bit digest per unique
+    string instead of the string itself. stats["total"] / stats["unique"]
+    are filled in once the input is exhausted.
+    """
+    seen: set[bytes] = set()
+    add = seen.add
+    blake2b = hashlib.blake2b
+    total = 0
+    try:
+        for s in strings:
+            total += 1
+            key = blake2b(s.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+            if key not in seen:
+                add(key)
+                yield s
+    finally:
+        stats["total"] = total
+        stats["unique"] = len(seen)
+
+
+# Reserved space in the <sst> start tag for the count attributes, which are
+# only known once the whole input has been read
+_COUNT_SLOT = len(' count="4294967295" uniqueCount="4294967295"')
+
+
+def write_xml_stream(
+    strings: Iterable[str],
+    out: IO[bytes],
+    comments: bool = False,
+    index_out: IO[str] | None = None,
+    patch_counts: bool = False,
+) -> int:
+    """
+    Write sharedStrings.xml for already-unique strings incrementally.
+
+    With patch_counts the count/uniqueCount attributes are patched into a
+    space-padded slot in the <sst> tag afterwards, which needs a file the
+    caller opened for writing from the start ("wb"): on stdout or an
+    append-mode handle the patch would land at the end of the file.
+    Otherwise they are left out. Returns the number of <si> entries written.
+    """
+    out.write(f'{HEADER}\n<sst xmlns="{SST_NS}"'.encode("utf-8"))
+    slot = out.tell() if patch_counts else None
+    if slot is not None:
+        out.write(b" " * _COUNT_SLOT)
+    out.write(b">\n")
+
+    n = 0
+    for s in strings:
+        escaped, preserve = escape_text(s)
+        t_open = '<t xml:space="preserve">' if preserve else "<t>"
+        line = f"  <si>{t_open}{escaped}</t></si>"
+        if comments:
+            line += f"  <!-- index {n} -->"
+        out.write((line + "\n").encode("utf-8"))
+        if index_out is not None:
+            index_out.write(f"{n}\t{s}\n")
+        n += 1
+    out.write(b"</sst>\n")
+
+    if slot is not None:
+        out.flush()
+        end = out.tell()
+        out.seek(slot)
+        out.write(f' count="{n}" uniqueCount="{n}"'.ljust(_COUNT_SLOT).encode("ascii"))
+        out.seek(end)
+    return n
+
+
+def stream_main(args: argparse.Namespace) -> None:
+    """--stream: file/stdin -> bounded-memory dedupe -> incremental XML."""
+    if args.strings:
+        source = None
+        lines: Iterable[str] = iter(args.strings)
+    elif args.file and args.file != "-":
+        try:
+            source = open(args.file, encoding="utf-8")
+        except OSError as e:
+            print(f"ERROR: Cannot read file: {e}", file=sys.stderr)
+            sys.exit(1)
+        lines = iter_lines(source)
+    else:
+        source = None
+        lines = iter_lines(sys.stdin)
+
+    stats = {"total": 0, "unique": 0}
+    unique = iter_unique(lines, stats)
+    try:
+        if args.index:
+            for i, s in enumerate(unique):
+                print(f"{i:<6}  {s!r}")
+        else:
+            out = open(args.output, "wb") if args.output else sys.stdout.buffer
+            index_out = open(args.index_out, "w", encoding="utf-8") if args.index_out else None
+            try:
+                write_xml_stream(unique, out, comments=args.comments, index_out=index_out,
+                                 patch_counts=bool(args.output))
+            finally:
+                if index_out is not None:
+                    index_out.close()
+                if args.output:
+                    out.close()
+                else:
+                    out.flush()
+    finally:
+        if source is not None:
+            source.close()
+
+    if stats["total"] == 0:
+        # Don't leave an empty table behind for a later pack to pick up
+        for path in (args.output, args.index_out):
+            if path and not args.index and os.path.exists(path):
+                os.remove(path)
+        print("ERROR: No strings provided.", file=sys.stderr)
+        sys.exit(1)
+    removed = stats["total"] - stats["unique"]
+    if removed:
+        print(
+            f"Note: {removed} duplicate(s) removed. "
+            f"{stats['unique']} unique strings in table.",
+            file=sys.stderr,
+        )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Generate xl/sharedStrings.xml from a list of strings.",
@@ -120,8 +270,34 @@ def main() -> None:
         action="store_true",
         help="Print a human-readable index table instead of XML output.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream strings from --file (or stdin / '-') to the output without "
+             "holding the table in memory.",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        metavar="PATH",
+        help="--stream: write the XML here instead of stdout.",
+    )
+    parser.add_argument(
+        "--comments",
+        action="store_true",
+        help="--stream: add <!-- index N --> comments after each entry.",
+    )
+    parser.add_argument(
+        "--index-out",
+        metavar="PATH",
+        help="--stream: also write an 'index<TAB>string' sidecar file.",
+    )
     args = parser.parse_args()
 
+    if args.stream:
+        stream_main(args)
+        return
+
     if args.file:
         try:
             raw = load_from_file(args.file)
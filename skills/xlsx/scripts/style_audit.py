@@ -16,6 +16,12 @@ Usage:
     python3 style_audit.py /tmp/xlsx_work/             # audit an unpacked directory
     python3 style_audit.py input.xlsx --json           # machine-readable output
     python3 style_audit.py input.xlsx --summary        # counts only, no detail
+    python3 style_audit.py input.xlsx --stream         # print each finding as soon as it is found
+
+Worksheets are streamed one at a time with iterparse and cells are dropped as
+soon as they are checked, so memory does not grow with workbook size. With
+--stream the findings are not collected either (with --json they are written
+as one JSON object per line followed by the summary).
 
 Exit code:
     0 — no violations found
@@ -30,6 +36,10 @@ import json
 import re
 import tempfile
 import shutil
+from typing import IO, Callable, Iterable, Iterator
+
+from formula_check import iter_cells
+from xlsx_unpack import materialize
 
 NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
 NSP = f"{{{NS}}}"
@@ -65,6 +75,15 @@ PERCENT_FMT_IDS = {9, 10, 165, 170}
 # numFmtIds that use comma separator (would corrupt year display)
 COMMA_FMT_IDS = {3, 4, 167, 168}  # #,##0 style — 4-digit years would show as 2,024
 
+# Per-xf classification bits, see _classify_xfs()
+XF_FONT_OOR = 0x01   # fontId points past the end of <fonts>
+XF_BLUE     = 0x02   # font is blue (input color)
+XF_BLACK    = 0x04   # font is explicit black or theme color
+XF_BOLD     = 0x08
+XF_GENERAL  = 0x10   # numFmtId == 0
+XF_PERCENT  = 0x20   # number format is a percentage
+XF_COMMA    = 0x40   # number format uses a thousands separator
+
 
 def _parse_styles(styles_xml: bytes) -> dict:
     """Parse styles.xml and return structured data."""
@@ -132,7 +151,7 @@ def _parse_styles(styles_xml: bytes) -> dict:
                 "borderId": int(xf.get("borderId", "0")),
             })
 
-    return {
+    styles = {
         "num_fmts": num_fmts,
         "num_fmts_declared": declared_count,
         "num_fmts_actual": actual_count,
@@ -146,6 +165,8 @@ def _parse_styles(styles_xml: bytes) -> dict:
         "xfs_declared": xfs_declared,
         "xfs_actual": len(xfs),
     }
+    styles["xf_flags"] = _classify_xfs(styles)
+    return styles
 
 
 def _is_blue_font(font: dict) -> bool:
@@ -175,6 +196,40 @@ def _fmt_is_comma(num_fmt_id: int, num_fmts: dict) -> bool:
     return "#,##" in fmt_code and not fmt_code.endswith(",") and not fmt_code.endswith(",\"M\"") and not fmt_code.endswith(",\"K\"")
 
 
+def _classify_xfs(styles: dict) -> bytearray:
+    """
+    Resolve every cellXfs entry through fonts / numFmts once.
+
+    Returns one byte of XF_* flags per xf, so the per-cell checks are a single
+    index into this array instead of walking the style dicts for each cell.
+    """
+    fonts = styles["fonts"]
+    num_fmts = styles["num_fmts"]
+    flags = bytearray(len(styles["xfs"]))
+    for i, xf in enumerate(styles["xfs"]):
+        font_id = xf["fontId"]
+        num_fmt_id = xf["numFmtId"]
+        if font_id >= len(fonts):
+            flags[i] = XF_FONT_OOR
+            continue
+        font = fonts[font_id]
+        f = 0
+        if _is_blue_font(font):
+            f |= XF_BLUE
+        if _is_black_font(font):
+            f |= XF_BLACK
+        if font.get("bold"):
+            f |= XF_BOLD
+        if num_fmt_id == 0:
+            f |= XF_GENERAL
+        if _fmt_is_percent(num_fmt_id, num_fmts):
+            f |= XF_PERCENT
+        if _fmt_is_comma(num_fmt_id, num_fmts):
+            f |= XF_COMMA
+        flags[i] = f
+    return flags
+
+
 def _looks_like_year(value_text: str) -> bool:
     """True if value is a 4-digit year between 1900 and 2100."""
     try:
@@ -184,29 +239,21 @@ def _looks_like_year(value_text: str) -> bool:
         return False
 
 
-def _audit(styles_xml: bytes, sheet_xmls: list[tuple[str, bytes]]) -> dict:
+def _audit_styles(styles: dict) -> dict:
     """
-    Run all formatting compliance checks.
-
-    Args:
-        styles_xml: content of xl/styles.xml
-        sheet_xmls: list of (sheet_name, xml_bytes) for each worksheet
-
-    Returns:
-        dict with violations and summary
+    Run the workbook-level style checks (A: count integrity, B: required fills)
+    and return a fresh results dict ready for per-cell checks.
     """
     results = {
         "violations": [],
         "warnings": [],
-        "summary": {},
+        "summary": {
+            "total_cells_inspected": 0,
+            "formula_cells": 0,
+            "input_cells": 0,
+        },
     }
     v = results["violations"]
-    w = results["warnings"]
-
-    styles = _parse_styles(styles_xml)
-    fonts  = styles["fonts"]
-    xfs    = styles["xfs"]
-    num_fmts = styles["num_fmts"]
 
     # ── Check A: count attribute integrity ──────────────────────────────────
     if styles["fonts_declared"] != styles["fonts_actual"]:
@@ -256,231 +303,375 @@ def _audit(styles_xml: bytes, sheet_xmls: list[tuple[str, bytes]]) -> dict:
                 "fix": "Set fills[1] patternFill patternType to 'gray125'",
             })
 
-    # ── Check C: per-cell style violations ───────────────────────────────────
-    total_cells = 0
-    formula_cells = 0
-    input_cells = 0
-
-    for sheet_name, sheet_xml in sheet_xmls:
-        ws = ET.fromstring(sheet_xml)
-
-        for cell in ws.findall(f".//{NSP}c"):
-            cell_ref = cell.get("r", "?")
-            s_attr = cell.get("s")
-            has_formula = cell.find(f"{NSP}f") is not None
-            v_elem = cell.find(f"{NSP}v")
-            value_text = v_elem.text if v_elem is not None else None
-            total_cells += 1
-
-            # Skip cells with no style
-            if s_attr is None:
-                continue
-
-            try:
-                s_idx = int(s_attr)
-            except ValueError:
-                continue
-
-            # Check C1: s index out of range
-            if s_idx >= len(xfs):
-                v.append({
-                    "type": "style_index_out_of_range",
-                    "sheet": sheet_name,
-                    "cell": cell_ref,
-                    "s": s_idx,
-                    "cellXfs_count": len(xfs),
-                    "fix": f"s={s_idx} exceeds cellXfs count={len(xfs)}; add missing <xf> entries or lower s value",
-                })
-                continue
+    return results
 
-            xf = xfs[s_idx]
-            font_id = xf["fontId"]
-            num_fmt_id = xf["numFmtId"]
 
-            if font_id >= len(fonts):
-                v.append({
-                    "type": "font_index_out_of_range",
-                    "sheet": sheet_name,
-                    "cell": cell_ref,
-                    "fontId": font_id,
-                    "fonts_count": len(fonts),
-                    "fix": f"fontId={font_id} exceeds fonts count={len(fonts)}; add missing <font> entries",
-                })
-                continue
+def _audit_cell(cell: ET.Element, sheet_name: str, styles: dict, results: dict) -> None:
+    """Check C: per-cell style violations for a single <c> element."""
+    v = results["violations"]
+    w = results["warnings"]
+    summary = results["summary"]
+    xf_flags = styles["xf_flags"]
 
-            font = fonts[font_id]
+    cell_ref = cell.get("r", "?")
+    s_attr = cell.get("s")
+    has_formula = cell.find(f"{NSP}f") is not None
+    v_elem = cell.find(f"{NSP}v")
+    value_text = v_elem.text if v_elem is not None else None
+    summary["total_cells_inspected"] += 1
 
-            # Check C2: color-role violation — formula cell with blue font
-            if has_formula and _is_blue_font(font):
-                formula_cells += 1
-                f_elem = cell.find(f"{NSP}f")
-                formula_text = f_elem.text if f_elem is not None else ""
-                v.append({
-                    "type": "formula_cell_blue_font",
-                    "sheet": sheet_name,
-                    "cell": cell_ref,
-                    "s": s_idx,
-                    "formula": formula_text,
-                    "fix": "Formula cells must use black font (formula) or green font (cross-sheet ref). "
-                           "Use style index 2/6/8/10 (black) or 3/13 (green) instead.",
-                })
+    # Skip cells with no style
+    if s_attr is None:
+        return
+
+    try:
+        s_idx = int(s_attr)
+    except ValueError:
+        return
+
+    # Check C1: s index out of range
+    if s_idx >= len(xf_flags):
+        v.append({
+            "type": "style_index_out_of_range",
+            "sheet": sheet_name,
+            "cell": cell_ref,
+            "s": s_idx,
+            "cellXfs_count": len(xf_flags),
+            "fix": f"s={s_idx} exceeds cellXfs count={len(xf_flags)}; add missing <xf> entries or lower s value",
+        })
+        return
+
+    flags = xf_flags[s_idx]
 
-            # Check C3: color-role violation — non-formula cell with explicit black
-            # (only flag if it looks like it should be an input — has a numeric value)
-            if (not has_formula and _is_black_font(font)
-                    and value_text is not None
-                    and not font.get("bold")
-                    and num_fmt_id not in (0,)   # skip general-format black (could be label)
-            ):
-                try:
-                    float(value_text)
-                    # It's a numeric value with black font — possible missing blue input marker
-                    w.append({
-                        "type": "numeric_input_may_lack_blue",
-                        "sheet": sheet_name,
-                        "cell": cell_ref,
-                        "s": s_idx,
-                        "value": value_text,
-                        "note": "Hardcoded numeric value has black font — if this is a user-editable "
-                                "assumption, change to blue-font input style (e.g. s=1/5/7/9/11/12).",
-                    })
-                except (ValueError, TypeError):
-                    pass
-
-            # Check C4: year value with comma-formatted numFmt
-            if value_text and _looks_like_year(value_text) and _fmt_is_comma(num_fmt_id, num_fmts):
-                v.append({
-                    "type": "year_with_comma_format",
+    if flags & XF_FONT_OOR:
+        fonts = styles["fonts"]
+        font_id = styles["xfs"][s_idx]["fontId"]
+        v.append({
+            "type": "font_index_out_of_range",
+            "sheet": sheet_name,
+            "cell": cell_ref,
+            "fontId": font_id,
+            "fonts_count": len(fonts),
+            "fix": f"fontId={font_id} exceeds fonts count={len(fonts)}; add missing <font> entries",
+        })
+        return
+
+    # Check C2: color-role violation — formula cell with blue font
+    if has_formula and flags & XF_BLUE:
+        summary["formula_cells"] += 1
+        f_elem = cell.find(f"{NSP}f")
+        formula_text = f_elem.text if f_elem is not None else ""
+        v.append({
+            "type": "formula_cell_blue_font",
+            "sheet": sheet_name,
+            "cell": cell_ref,
+            "s": s_idx,
+            "formula": formula_text,
+            "fix": "Formula cells must use black font (formula) or green font (cross-sheet ref). "
+                   "Use style index 2/6/8/10 (black) or 3/13 (green) instead.",
+        })
+
+    # Check C3: color-role violation — non-formula cell with explicit black
+    # (only flag if it looks like it should be an input — has a numeric value)
+    if (not has_formula and flags & XF_BLACK
+            and value_text is not None
+            and not flags & XF_BOLD
+            and not flags & XF_GENERAL   # skip general-format black (could be label)
+    ):
+        try:
+            float(value_text)
+            # It's a numeric value with black font — possible missing blue input marker
+            w.append({
+                "type": "numeric_input_may_lack_blue",
+                "sheet": sheet_name,
+                "cell": cell_ref,
+                "s": s_idx,
+                "value": value_text,
+                "note": "Hardcoded numeric value has black font — if this is a user-editable "
+                        "assumption, change to blue-font input style (e.g. s=1/5/7/9/11/12).",
+            })
+        except (ValueError, TypeError):
+            pass
+
+    # Check C4: year value with comma-formatted numFmt
+    if value_text and flags & XF_COMMA and _looks_like_year(value_text):
+        v.append({
+            "type": "year_with_comma_format",
+            "sheet": sheet_name,
+            "cell": cell_ref,
+            "s": s_idx,
+            "value": value_text,
+            "numFmtId": styles["xfs"][s_idx]["numFmtId"],
+            "fix": "Year values must use numFmtId=1 (format '0') to display as 2024 not 2,024. "
+                   "Use style index 11 or a custom xf with numFmtId=1.",
+        })
+
+    # Check C5: percentage format with value > 1 (likely 8 instead of 0.08)
+    if value_text and flags & XF_PERCENT:
+        try:
+            pct_val = float(value_text)
+            if pct_val > 1.0:
+                w.append({
+                    "type": "percent_value_gt_1",
                     "sheet": sheet_name,
                     "cell": cell_ref,
                     "s": s_idx,
                     "value": value_text,
-                    "numFmtId": num_fmt_id,
-                    "fix": "Year values must use numFmtId=1 (format '0') to display as 2024 not 2,024. "
-                           "Use style index 11 or a custom xf with numFmtId=1.",
+                    "displayed_as": f"{pct_val * 100:.0f}%",
+                    "note": f"Value {value_text} with percentage format displays as {pct_val*100:.0f}%. "
+                            "If intended rate is ~{:.0f}%, store as {:.4f} instead.".format(
+                                pct_val, pct_val / 100
+                            ),
                 })
+        except (ValueError, TypeError):
+            pass
+
+    if has_formula:
+        summary["formula_cells"] += 1
+    elif value_text is not None:
+        summary["input_cells"] += 1
 
-            # Check C5: percentage format with value > 1 (likely 8 instead of 0.08)
-            if value_text and _fmt_is_percent(num_fmt_id, num_fmts):
-                try:
-                    pct_val = float(value_text)
-                    if pct_val > 1.0:
-                        w.append({
-                            "type": "percent_value_gt_1",
-                            "sheet": sheet_name,
-                            "cell": cell_ref,
-                            "s": s_idx,
-                            "value": value_text,
-                            "displayed_as": f"{pct_val * 100:.0f}%",
-                            "note": f"Value {value_text} with percentage format displays as {pct_val*100:.0f}%. "
-                                    "If intended rate is ~{:.0f}%, store as {:.4f} instead.".format(
-                                        pct_val, pct_val / 100
-                                    ),
-                        })
-                except (ValueError, TypeError):
-                    pass
-
-            if has_formula:
-                formula_cells += 1
-            elif value_text is not None:
-                input_cells += 1
-
-    results["summary"] = {
-        "total_cells_inspected": total_cells,
-        "formula_cells": formula_cells,
-        "input_cells": input_cells,
-        "violations": len(v),
-        "warnings": len(w),
-    }
 
+def _finish_audit(results: dict) -> dict:
+    """Fill in the violation/warning totals once every cell has been seen."""
+    results["summary"]["violations"] = len(results["violations"])
+    results["summary"]["warnings"] = len(results["warnings"])
     return results
 
 
-def _load_from_xlsx(xlsx_path: str) -> tuple[bytes, list[tuple[str, bytes]]]:
-    """Load styles.xml and all sheet XMLs from a packed xlsx file."""
-    with zipfile.ZipFile(xlsx_path, "r") as z:
+class _ItemSink:
+    """
+    Stand-in for the violations/warnings lists in streaming mode: every
+    appended item is handed to a callback and only counted, not kept.
+    """
+
+    def __init__(self, callback: Callable[[dict], None]):
+        self.callback = callback
+        self.count = 0
+
+    def append(self, item: dict) -> None:
+        self.count += 1
+        self.callback(item)
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def _audit(
+    styles_xml: bytes,
+    sheets: Iterable[tuple[str, IO[bytes]]],
+    on_violation: Callable[[dict], None] | None = None,
+    on_warning: Callable[[dict], None] | None = None,
+) -> dict:
+    """
+    Run all formatting compliance checks.
+
+    Args:
+        styles_xml:   content of xl/styles.xml
+        sheets:       (sheet_name, stream) for each worksheet; streams are
+                      consumed in order, so a generator that opens each one
+                      lazily keeps a single sheet open at a time
+        on_violation: if given, each violation is passed to it as soon as it
+                      is found instead of being collected in the results
+        on_warning:   same for warnings
+
+    Returns:
+        dict with violations and summary
+    """
+    styles = _parse_styles(styles_xml)
+    results = _audit_styles(styles)
+
+    for key, callback in (("violations", on_violation), ("warnings", on_warning)):
+        if callback is not None:
+            sink = _ItemSink(callback)
+            for item in results[key]:
+                sink.append(item)
+            results[key] = sink
+
+    for sheet_name, ws_stream in sheets:
+        for cell in iter_cells(ws_stream):
+            _audit_cell(cell, sheet_name, styles, results)
+
+    _finish_audit(results)
+    for key in ("violations", "warnings"):
+        if isinstance(results[key], _ItemSink):
+            results[key] = []
+    return results
+
+
+def _sheet_targets(wb: ET.Element, rels: ET.Element) -> list[tuple[str, str]]:
+    """Return (sheet_name, rels Target) for each worksheet, in workbook order."""
+    rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    rid_to_path = {}
+    for rel in rels:
+        target = rel.get("Target", "")
+        if "worksheets" in target:
+            rid_to_path[rel.get("Id", "")] = target
+
+    targets = []
+    for sheet in wb.findall(f".//{{{NS}}}sheet"):
+        rid = sheet.get(f"{{{rel_ns}}}id", "")
+        targets.append((sheet.get("name", ""), rid_to_path.get(rid, "")))
+    return targets
+
+
+def _iter_zip_sheets(z: zipfile.ZipFile, paths: list[tuple[str, str]]) -> Iterator[tuple[str, IO[bytes]]]:
+    """Open each worksheet member only when it is reached; closes the zip at the end."""
+    with z:
+        for name, path in paths:
+            with z.open(path) as f:
+                yield name, f
+
+
+def _load_from_xlsx(xlsx_path: str) -> tuple[bytes, Iterator[tuple[str, IO[bytes]]]]:
+    """Load styles.xml and a lazy iterator of worksheet streams from a packed xlsx file."""
+    z = zipfile.ZipFile(xlsx_path, "r")
+    try:
         styles_xml = z.read("xl/styles.xml")
+        wb = ET.fromstring(z.read("xl/workbook.xml"))
+        rels = ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+    except Exception:
+        z.close()
+        raise
+
+    members = set(z.namelist())
+    paths = []
+    for name, target in _sheet_targets(wb, rels):
+        if target and not target.startswith("xl/"):
+            target = "xl/" + target
+        if target and target in members:
+            paths.append((name, target))
+
+    return styles_xml, _iter_zip_sheets(z, paths)
+
+
+def _iter_dir_sheets(paths: list[tuple[str, str]]) -> Iterator[tuple[str, IO[bytes]]]:
+    for name, full in paths:
+        with open(full, "rb") as f:
+            yield name, f
 
-        # Get sheet name mapping
-        wb_xml = z.read("xl/workbook.xml")
-        wb = ET.fromstring(wb_xml)
-        rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
-        rels_xml = z.read("xl/_rels/workbook.xml.rels")
-        rels = ET.fromstring(rels_xml)
-
-        rid_to_name = {}
-        for sheet in wb.findall(f".//{{{NS}}}sheet"):
-            rid = sheet.get(f"{{{rel_ns}}}id", "")
-            name = sheet.get("name", "")
-            rid_to_name[rid] = name
-
-        rid_to_path = {}
-        for rel in rels:
-            rid = rel.get("Id", "")
-            target = rel.get("Target", "")
-            if "worksheets" in target:
-                if not target.startswith("xl/"):
-                    target = "xl/" + target
-                rid_to_path[rid] = target
-
-        sheet_xmls = []
-        for rid, name in rid_to_name.items():
-            path = rid_to_path.get(rid)
-            if path and path in z.namelist():
-                sheet_xmls.append((name, z.read(path)))
-
-    return styles_xml, sheet_xmls
-
-
-def _load_from_dir(unpacked_dir: str) -> tuple[bytes, list[tuple[str, bytes]]]:
-    """Load styles.xml and all sheet XMLs from an unpacked directory."""
+
+def _load_from_dir(unpacked_dir: str) -> tuple[bytes, Iterator[tuple[str, IO[bytes]]]]:
+    """Load styles.xml and a lazy iterator of worksheet streams from an unpacked directory."""
+    materialize(unpacked_dir, ["xl/styles.xml", "xl/workbook.xml",
+                               "xl/_rels/workbook.xml.rels", "xl/worksheets/*.xml"])
     styles_path = os.path.join(unpacked_dir, "xl", "styles.xml")
     with open(styles_path, "rb") as f:
         styles_xml = f.read()
 
     # Get sheet names from workbook.xml
     wb_path = os.path.join(unpacked_dir, "xl", "workbook.xml")
-    wb = ET.fromstring(open(wb_path, "rb").read())
+    wb = ET.parse(wb_path).getroot()
     rels_path = os.path.join(unpacked_dir, "xl", "_rels", "workbook.xml.rels")
-    rels = ET.fromstring(open(rels_path, "rb").read())
-
-    rel_ns = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
-    rid_to_name = {}
-    for sheet in wb.findall(f".//{{{NS}}}sheet"):
-        rid = sheet.get(f"{{{rel_ns}}}id", "")
-        name = sheet.get("name", "")
-        rid_to_name[rid] = name
-
-    rid_to_path = {}
-    for rel in rels:
-        rid = rel.get("Id", "")
-        target = rel.get("Target", "")
-        if "worksheets" in target:
-            rid_to_path[rid] = target
+    rels = ET.parse(rels_path).getroot()
 
-    sheet_xmls = []
-    ws_dir = os.path.join(unpacked_dir, "xl", "worksheets")
-    for rid, name in rid_to_name.items():
-        rel_path = rid_to_path.get(rid, "")
+    paths = []
+    for name, rel_path in _sheet_targets(wb, rels):
         # rel_path may be "worksheets/sheet1.xml" or absolute path
         if rel_path.startswith("worksheets/"):
             full = os.path.join(unpacked_dir, "xl", rel_path)
         else:
             full = os.path.join(unpacked_dir, "xl", "worksheets", os.path.basename(rel_path))
         if os.path.exists(full):
-            with open(full, "rb") as f:
-                sheet_xmls.append((name, f.read()))
+            paths.append((name, full))
+
+    return styles_xml, _iter_dir_sheets(paths)
+
+
+def _print_violation(item: dict) -> None:
+    t = item["type"]
+    if t == "count_mismatch":
+        print(f"  [FAIL] {item['element']} count mismatch: declared={item['declared']}, "
+              f"actual={item['actual']}")
+        print(f"         Fix: {item['fix']}")
+    elif t == "missing_required_fills":
+        print(f"  [FAIL] {item['detail']}")
+        print(f"         Fix: {item['fix']}")
+    elif t in ("fills_0_corrupted", "fills_1_corrupted"):
+        print(f"  [FAIL] {item['detail']}")
+        print(f"         Fix: {item['fix']}")
+    elif t == "formula_cell_blue_font":
+        print(f"  [FAIL] [{item['sheet']}!{item['cell']}] formula cell has blue font "
+              f"(role=input, but cell contains formula: {item.get('formula', '')})")
+        print(f"         Fix: {item['fix']}")
+    elif t == "style_index_out_of_range":
+        print(f"  [FAIL] [{item['sheet']}!{item['cell']}] s={item['s']} but "
+              f"cellXfs count={item['cellXfs_count']}")
+        print(f"         Fix: {item['fix']}")
+    elif t == "font_index_out_of_range":
+        print(f"  [FAIL] [{item['sheet']}!{item['cell']}] fontId={item['fontId']} but "
+              f"fonts count={item['fonts_count']}")
+        print(f"         Fix: {item['fix']}")
+    elif t == "year_with_comma_format":
+        print(f"  [FAIL] [{item['sheet']}!{item['cell']}] year value {item['value']} "
+              f"uses comma-format (numFmtId={item['numFmtId']}) — will display as "
+              f"{int(float(item['value'])):,}")
+        print(f"         Fix: {item['fix']}")
+    else:
+        print(f"  [FAIL] {item}")
+
+
+def _print_warning(item: dict) -> None:
+    t = item["type"]
+    if t == "numeric_input_may_lack_blue":
+        print(f"  [WARN] [{item['sheet']}!{item['cell']}] numeric value={item['value']} "
+              f"has black font — if user-editable assumption, use blue-font input style")
+    elif t == "percent_value_gt_1":
+        print(f"  [WARN] [{item['sheet']}!{item['cell']}] percent-format cell has "
+              f"value={item['value']} (displays as {item['displayed_as']}) — "
+              f"likely should be stored as decimal (e.g. 0.08 for 8%)")
+    else:
+        print(f"  [WARN] {item}")
+
+
+def _print_summary(target: str, s: dict) -> None:
+    print(f"Target  : {target}")
+    print(f"Cells   : {s['total_cells_inspected']} inspected  "
+          f"({s['formula_cells']} formula, {s['input_cells']} input)")
+    print(f"Violations : {s['violations']}")
+    print(f"Warnings   : {s['warnings']}")
+
+
+def _print_verdict(s: dict) -> int:
+    print()
+    if s["violations"] == 0:
+        if s["warnings"] == 0:
+            print("PASS — Financial formatting is compliant")
+        else:
+            print(f"PASS with WARN — {s['warnings']} warning(s) need review")
+    else:
+        print(f"FAIL — {s['violations']} violation(s) must be fixed before delivery")
+        return 1
+    return 0
 
-    return styles_xml, sheet_xmls
+
+def print_results(target: str, results: dict, summary_only: bool = False) -> int:
+    """Print the human-readable audit report. Returns the exit code (0 pass, 1 fail)."""
+    s = results["summary"]
+    _print_summary(target, s)
+
+    if not summary_only:
+        if results["violations"]:
+            print("\n── Violations (must fix) ──")
+            for item in results["violations"]:
+                _print_violation(item)
+
+        if results["warnings"] and not summary_only:
+            print("\n── Warnings (review recommended) ──")
+            for item in results["warnings"]:
+                _print_warning(item)
+
+    return _print_verdict(s)
 
 
 def main() -> None:
     use_json = "--json" in sys.argv
     summary_only = "--summary" in sys.argv
+    stream = "--stream" in sys.argv
 
     args_clean = [a for a in sys.argv[1:] if not a.startswith("--")]
     if not args_clean:
-        print("Usage: style_audit.py <input.xlsx | unpacked_dir/> [--json] [--summary]")
+        print("Usage: style_audit.py <input.xlsx | unpacked_dir/> [--json] [--summary] [--stream]")
         sys.exit(1)
 
     target = args_clean[0]
@@ -497,78 +688,31 @@ def main() -> None:
         print(f"ERROR loading file: {e}")
         sys.exit(1)
 
+    if stream:
+        if use_json:
+            def emit_json(item: dict) -> None:
+                print(json.dumps(item, ensure_ascii=False), flush=True)
+            on_violation = on_warning = emit_json
+        elif summary_only:
+            on_violation = on_warning = lambda item: None
+        else:
+            on_violation, on_warning = _print_violation, _print_warning
+        results = _audit(styles_xml, sheet_xmls, on_violation, on_warning)
+        if use_json:
+            print(json.dumps({"summary": results["summary"]}, ensure_ascii=False))
+            sys.exit(1 if results["summary"]["violations"] > 0 else 0)
+        if not summary_only:
+            print()
+        _print_summary(target, results["summary"])
+        sys.exit(_print_verdict(results["summary"]))
+
     results = _audit(styles_xml, sheet_xmls)
 
     if use_json:
         print(json.dumps(results, indent=2, ensure_ascii=False))
         sys.exit(1 if results["summary"]["violations"] > 0 else 0)
 
-    # Human-readable output
-    s = results["summary"]
-    print(f"Target  : {target}")
-    print(f"Cells   : {s['total_cells_inspected']} inspected  "
-          f"({s['formula_cells']} formula, {s['input_cells']} input)")
-    print(f"Violations : {s['violations']}")
-    print(f"Warnings   : {s['warnings']}")
-
-    if not summary_only:
-        if results["violations"]:
-            print("\n── Violations (must fix) ──")
-            for item in results["violations"]:
-                t = item["type"]
-                if t == "count_mismatch":
-                    print(f"  [FAIL] {item['element']} count mismatch: declared={item['declared']}, "
-                          f"actual={item['actual']}")
-                    print(f"         Fix: {item['fix']}")
-                elif t == "missing_required_fills":
-                    print(f"  [FAIL] {item['detail']}")
-                    print(f"         Fix: {item['fix']}")
-                elif t in ("fills_0_corrupted", "fills_1_corrupted"):
-                    print(f"  [FAIL] {item['detail']}")
-                    print(f"         Fix: {item['fix']}")
-                elif t == "formula_cell_blue_font":
-                    print(f"  [FAIL] [{item['sheet']}!{item['cell']}] formula cell has blue font "
-                          f"(role=input, but cell contains formula: {item.get('formula', '')})")
-                    print(f"         Fix: {item['fix']}")
-                elif t == "style_index_out_of_range":
-                    print(f"  [FAIL] [{item['sheet']}!{item['cell']}] s={item['s']} but "
-                          f"cellXfs count={item['cellXfs_count']}")
-                    print(f"         Fix: {item['fix']}")
-                elif t == "font_index_out_of_range":
-                    print(f"  [FAIL] [{item['sheet']}!{item['cell']}] fontId={item['fontId']} but "
-                          f"fonts count={item['fonts_count']}")
-                    print(f"         Fix: {item['fix']}")
-                elif t == "year_with_comma_format":
-                    print(f"  [FAIL] [{item['sheet']}!{item['cell']}] year value {item['value']} "
-                          f"uses comma-format (numFmtId={item['numFmtId']}) — will display as "
-                          f"{int(float(item['value'])):,}")
-                    print(f"         Fix: {item['fix']}")
-                else:
-                    print(f"  [FAIL] {item}")
-
-        if results["warnings"] and not summary_only:
-            print("\n── Warnings (review recommended) ──")
-            for item in results["warnings"]:
-                t = item["type"]
-                if t == "numeric_input_may_lack_blue":
-                    print(f"  [WARN] [{item['sheet']}!{item['cell']}] numeric value={item['value']} "
-                          f"has black font — if user-editable assumption, use blue-font input style")
-                elif t == "percent_value_gt_1":
-                    print(f"  [WARN] [{item['sheet']}!{item['cell']}] percent-format cell has "
-                          f"value={item['value']} (displays as {item['displayed_as']}) — "
-                          f"likely should be stored as decimal (e.g. 0.08 for 8%)")
-                else:
-                    print(f"  [WARN] {item}")
-
-    print()
-    if s["violations"] == 0:
-        if s["warnings"] == 0:
-            print("PASS — Financial formatting is compliant")
-        else:
-            print(f"PASS with WARN — {s['warnings']} warning(s) need review")
-    else:
-        print(f"FAIL — {s['violations']} violation(s) must be fixed before delivery")
-        sys.exit(1)
+    sys.exit(print_results(target, results, summary_only))
 
 
 if __name__ == "__main__":
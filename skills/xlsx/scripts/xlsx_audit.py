@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+"""
+xlsx_audit.py — Combined formula + formatting audit over a single read of the xlsx.
+
+Runs the checks of formula_check.py and style_audit.py together. workbook.xml,
+its rels and styles.xml are parsed once, and every worksheet is streamed from
+the ZIP exactly once: each <c> event is fed to both the style checks and the
+formula checks before it is discarded. Use this instead of running the two
+scripts back to back when validating many generated workbooks.
+
+Usage:
+    python3 xlsx_audit.py <input.xlsx>                   # both reports, human-readable
+    python3 xlsx_audit.py <input.xlsx> --json            # {"formula_check": ..., "style_audit": ...}
+    python3 xlsx_audit.py <input.xlsx> --summary         # counts only, no details
+    python3 xlsx_audit.py <input.xlsx> --sheet Sales     # limit to one sheet
+    python3 xlsx_audit.py <input.xlsx> --expand-shared   # also check shared-formula consumers
+    python3 xlsx_audit.py a.xlsx b.xlsx c.xlsx --json    # several files, one process
+
+The "formula_check" part of the JSON output uses the build_report() schema
+(same as formula_check.py --report); the "style_audit" part is identical to
+style_audit.py --json.
+
+Exit code:
+    0 — no hard formula errors and no style violations
+    1 — errors/violations detected (or a file cannot be opened)
+"""
+
+import json
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator
+
+from formula_check import (
+    _check_cells,
+    build_report,
+    get_defined_names,
+    get_sheet_files,
+    get_sheet_names,
+    iter_cells,
+)
+from formula_check import print_results as print_formula_results
+from style_audit import _audit_cell, _audit_styles, _finish_audit, _parse_styles
+from style_audit import print_results as print_style_results
+
+
+def _style_tap(
+    cells: Iterable[ET.Element],
+    sheet_name: str,
+    styles: dict,
+    style_results: dict,
+) -> Iterator[ET.Element]:
+    """Run the per-cell style checks on each cell, then pass it on to the formula checks."""
+    for cell in cells:
+        _audit_cell(cell, sheet_name, styles, style_results)
+        yield cell
+
+
+def audit(xlsx_path: str, sheet_filter: str | None = None, expand_shared: bool = False) -> dict:
+    """
+    Run formula and style checks on one xlsx file in a single pass.
+
+    Returns:
+        {"file": path,
+         "formula_check": <formula_check.check() results>,
+         "style_audit": <style_audit results, or None if xl/styles.xml is missing>}
+    """
+    fc_results = {
+        "file": xlsx_path,
+        "sheets_checked": [],
+        "formula_count": 0,
+        "shared_formula_ranges": 0,
+        "error_count": 0,
+        "errors": [],
+    }
+    combined = {"file": xlsx_path, "formula_check": fc_results, "style_audit": None}
+
+    try:
+        z = zipfile.ZipFile(xlsx_path, "r")
+    except (zipfile.BadZipFile, FileNotFoundError) as e:
+        fc_results["errors"].append({"type": "file_error", "message": str(e)})
+        fc_results["error_count"] = 1
+        return combined
+
+    with z:
+        members = set(z.namelist())
+        wb = ET.fromstring(z.read("xl/workbook.xml"))
+        sheet_names = get_sheet_names(z, wb)
+        sheet_files = get_sheet_files(z)
+        valid_sheet_names = set(sheet_names.values())
+        defined_names = get_defined_names(z, wb)
+
+        styles = None
+        style_results = None
+        if "xl/styles.xml" in members:
+            styles = _parse_styles(z.read("xl/styles.xml"))
+            style_results = _audit_styles(styles)
+
+        for rid, sheet_name in sheet_names.items():
+            if sheet_filter and sheet_name != sheet_filter:
+                continue
+            ws_file = sheet_files.get(rid)
+            if not ws_file or ws_file not in members:
+                continue
+
+            fc_results["sheets_checked"].append(sheet_name)
+            with z.open(ws_file) as ws_stream:
+                cells = iter_cells(ws_stream)
+                if style_results is not None:
+                    cells = _style_tap(cells, sheet_name, styles, style_results)
+                _check_cells(sheet_name, cells, valid_sheet_names, defined_names,
+                             fc_results, expand_shared)
+
+    if style_results is not None:
+        combined["style_audit"] = _finish_audit(style_results)
+    return combined
+
+
+def _failed(combined: dict) -> bool:
+    style = combined["style_audit"]
+    return (combined["formula_check"]["error_count"] > 0
+            or (style is not None and style["summary"]["violations"] > 0))
+
+
+def main() -> None:
+    use_json = "--json" in sys.argv
+    summary_only = "--summary" in sys.argv
+    expand_shared = "--expand-shared" in sys.argv
+    sheet_filter = None
+    paths = []
+
+    i = 1
+    while i < len(sys.argv):
+        arg = sys.argv[i]
+        if arg == "--sheet" and i + 1 < len(sys.argv):
+            sheet_filter = sys.argv[i + 1]
+            i += 2
+        elif arg.startswith("--"):
+            i += 1  # flags handled above
+        else:
+            paths.append(arg)
+            i += 1
+
+    if not paths:
+        print("Usage: xlsx_audit.py <input.xlsx> [more.xlsx ...] [--json] [--summary] "
+              "[--sheet NAME] [--expand-shared]")
+        sys.exit(1)
+
+    exit_code = 0
+    reports = []
+    for n, path in enumerate(paths):
+        try:
+            combined = audit(path, sheet_filter=sheet_filter, expand_shared=expand_shared)
+        except (KeyError, ET.ParseError) as e:
+            # Missing or corrupt workbook parts — report and keep going with the batch
+            print(f"ERROR loading {path}: {e}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        if use_json:
+            reports.append({
+                "file": path,
+                "formula_check": build_report(combined["formula_check"]),
+                "style_audit": combined["style_audit"],
+            })
+            if _failed(combined):
+                exit_code = 1
+            continue
+
+        if n:
+            print("\n" + "=" * 60 + "\n")
+        print("── Formula check ──")
+        code = print_formula_results(combined["formula_check"], sheet_filter, summary_only)
+        print("\n── Style audit ──")
+        if combined["style_audit"] is None:
+            opened = not any(e["type"] == "file_error" for e in combined["formula_check"]["errors"])
+            print("Skipped — xl/styles.xml not found" if opened else "Skipped — file could not be opened")
+        else:
+            code = max(code, print_style_results(path, combined["style_audit"], summary_only))
+        exit_code = max(exit_code, code)
+
+    if use_json:
+        output = reports[0] if len(paths) == 1 and reports else reports
+        print(json.dumps(output, indent=2, ensure_ascii=False))
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
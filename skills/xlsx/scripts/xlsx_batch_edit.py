@@ -0,0 +1,908 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+"""
+xlsx_batch_edit.py — Apply many row/column edits to an unpacked xlsx in one process.
+
+Loads each workbook part (worksheets, sharedStrings.xml, styles.xml, charts,
+tables, pivot caches) at most once, applies every operation to the in-memory
+trees, and writes each touched part exactly once at the end. Use this instead
+of calling xlsx_insert_row.py / xlsx_add_column.py / xlsx_shift_rows.py in a
+loop when a report needs dozens or hundreds of edits.
+
+Usage:
+    python3 xlsx_batch_edit.py /tmp/work/ ops.json
+    python3 xlsx_batch_edit.py /tmp/work/ - < ops.json
+    python3 xlsx_batch_edit.py /tmp/work/ ops.json --verbose   # per-step detail
+    python3 xlsx_batch_edit.py /tmp/work/ ops.json --sst-cache # keep the shared
+                                          # string index in /tmp/work.sst-index.json
+    python3 xlsx_batch_edit.py /tmp/work/ ops.json --compact   # write parts without
+                                          # re-indenting them (see xlsx_unpack.py --compact)
+    python3 xlsx_batch_edit.py /tmp/work/ ops.json --recalc    # refresh the <v> of formulas
+                                          # downstream of the edited cells (formula_graph.py)
+
+ops.json is a list of operations applied in order. Keys mirror the CLI
+flags of the single-edit scripts:
+
+    [
+      {"op": "insert_row", "at": 6, "sheet": "Budget FY2025",
+       "text": {"A": "Utilities"}, "values": {"B": 3000, "C": 3000},
+       "formula": {"F": "SUM(B{row}:E{row})"}, "copy_style_from": 5},
+
+      {"op": "add_column", "col": "G", "sheet": "Budget FY2025",
+       "header": "% of Total", "formula": "=F{row}/$F$10",
+       "formula_rows": "2:9", "total_row": 10, "total_formula": "=SUM(G2:G9)",
+       "numfmt": "0.0%", "border_row": 10, "border_style": "medium"},
+
+      {"op": "shift_rows", "operation": "delete", "at": 8, "count": 1},
+
+      {"op": "shift_rows", "operation": "insert", "at": 4, "count": 2,
+       "sheet": "Budget FY2025"}
+    ]
+
+A shift_rows with "sheet" moves rows on that sheet only and rewrites just
+the references into it elsewhere (formulas on other sheets, defined names,
+charts, pivot caches), as xlsx_shift_rows.py --sheet does. The session keeps
+the cross-sheet reference index in memory and re-scans only the sheets an
+operation changed.
+
+Row numbers in each operation refer to the workbook as left by the previous
+operations, exactly as if the scripts had been run one after another.
+
+With --recalc, the session remembers every cell the operations wrote
+(following later row shifts) and, before saving, recomputes only the
+formulas downstream of them and rewrites their cached <v> values. A
+shift_rows delete invalidates references workbook-wide, so after one every
+formula is recomputed (still natively, without LibreOffice).
+
+Python API:
+    session = EditSession("/tmp/work")
+    session.insert_row(6, sheet="Budget FY2025", text={"A": "Utilities"})
+    session.add_column("G", header="% of Total", ...)
+    session.recalculate()   # optional: refresh downstream <v> values
+    session.save()
+
+IMPORTANT: Run on an UNPACKED directory (from xlsx_unpack.py).
+After running, repack with xlsx_pack.py.
+"""
+
+import copy
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+
+from formula_graph import read_strings, recalculate, report_lines
+from formula_tokens import col_letter, col_number
+from xlsx_shift_rows import (
+    _write_tree,
+    defined_name_sheets,
+    sheet_refs,
+    sheet_table_parts,
+    shift_chart,
+    shift_defined_names,
+    shift_pivot_cache,
+    shift_table,
+    shift_targets,
+    shift_worksheet,
+)
+from xlsx_unpack import materialize, read_manifest
+
+NS_SS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+ET.register_namespace('', NS_SS)
+ET.register_namespace('r', NS_REL)
+ET.register_namespace('xdr', 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing')
+ET.register_namespace('x14', 'http://schemas.microsoft.com/office/spreadsheetml/2009/9/main')
+ET.register_namespace('xr2', 'http://schemas.microsoft.com/office/spreadsheetml/2015/revision2')
+ET.register_namespace('mc', 'http://schemas.openxmlformats.org/markup-compatibility/2006')
+
+
+def _tag(local: str) -> str:
+    return f"{{{NS_SS}}}{local}"
+
+
+# ---------------------------------------------------------------------------
+# In-memory part helpers (operate on already-parsed roots)
+# ---------------------------------------------------------------------------
+
+class SharedStringTable:
+    """
+    Hash-indexed view of xl/sharedStrings.xml.
+
+    The text -> index map is built once (one iterparse pass, or loaded from
+    the optional cache file) so each lookup is O(1). New strings are queued
+    and flush() appends them all to the file in a single write, without
+    re-serializing the existing entries.
+
+    The cache is a JSON file *beside* the unpacked directory (never inside
+    it, so xlsx_pack.py does not ship it), keyed on the size and mtime of
+    sharedStrings.xml; any other writer invalidates it.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, path: str, cache_path: str | None = None):
+        self.path = path
+        self.cache_path = cache_path
+        self.index: dict[str, int] = {}
+        self.unique_count = 0          # number of <si> entries in the file
+        self.pending: list[str] = []   # new strings, in index order
+        if not self._load_cache():
+            self._build_index()
+
+    def _stat_key(self) -> list[int]:
+        st = os.stat(self.path)
+        return [st.st_size, st.st_mtime_ns]
+
+    def _load_cache(self) -> bool:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as fh:
+                cached = json.load(fh)
+        except (OSError, ValueError):
+            return False
+        if cached.get("version") != self.CACHE_VERSION or cached.get("stat") != self._stat_key():
+            return False
+        self.index = cached["index"]
+        self.unique_count = cached["unique_count"]
+        return True
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        with open(self.cache_path, "w", encoding="utf-8") as fh:
+            json.dump({
+                "version": self.CACHE_VERSION,
+                "stat": self._stat_key(),
+                "unique_count": self.unique_count,
+                "index": self.index,
+            }, fh, ensure_ascii=False, separators=(",", ":"))
+
+    def _build_index(self) -> None:
+        # Same matching rule as the old linear scan: an <si> whose direct <t>
+        # child equals the text; rich-text (<r>) entries only take up an index.
+        idx = 0
+        index = self.index
+        si_tag, t_tag = _tag("si"), _tag("t")
+        for _, elem in ET.iterparse(self.path, events=("end",)):
+            if elem.tag != si_tag:
+                continue
+            t_el = elem.find(t_tag)
+            if t_el is not None and t_el.text is not None:
+                index.setdefault(t_el.text, idx)
+            idx += 1
+            elem.clear()
+        self.unique_count = idx
+        self._save_cache()
+
+    def add(self, text: str) -> int:
+        """Return the index of text, queueing a new entry if it is not present."""
+        idx = self.index.get(text)
+        if idx is None:
+            idx = self.index[text] = self.unique_count + len(self.pending)
+            self.pending.append(text)
+        return idx
+
+    def flush(self) -> bool:
+        """Append queued strings to sharedStrings.xml in one write. Returns True if written."""
+        if not self.pending:
+            return False
+        with open(self.path, "r", encoding="utf-8") as fh:
+            content = fh.read()
+
+        root_m = re.search(r"<((?:[\w.-]+:)?)sst\b[^>]*?(/?)>", content)
+        if root_m is None:
+            raise ValueError(f"No <sst> root element in {self.path}")
+        prefix = root_m.group(1)
+        added = len(self.pending)
+        entries = "".join(
+            f'<{prefix}si><{prefix}t xml:space="preserve">{_xml_escape(text)}</{prefix}t></{prefix}si>\n'
+            for text in self.pending
+        )
+
+        start_tag = root_m.group(0)
+        new_start = start_tag
+        for attr in ("count", "uniqueCount"):
+            m = re.search(rf'\s{attr}="(\d*)"', new_start)
+            old = int(m.group(1) or 0) if m else 0
+            if m:
+                new_start = new_start[:m.start(1)] + str(old + added) + new_start[m.end(1):]
+            else:
+                new_start = new_start.replace(f"<{prefix}sst", f'<{prefix}sst {attr}="{added}"', 1)
+
+        if root_m.group(2):   # empty <sst ... /> — open it up
+            new_start = new_start[:-2].rstrip() + ">"
+            content = (content[:root_m.start()] + new_start + "\n" + entries
+                       + f"</{prefix}sst>" + content[root_m.end():])
+        else:
+            end = content.rindex(f"</{prefix}sst>")
+            content = (content[:root_m.start()] + new_start + content[root_m.end():end]
+                       + entries + content[end:])
+
+        with open(self.path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        self.unique_count += added
+        self.pending = []
+        self._save_cache()
+        return True
+
+
+def _xml_escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def sst_cache_path(work_dir: str) -> str:
+    """Default index cache location: a sibling of the unpacked directory."""
+    return os.path.normpath(os.path.abspath(work_dir)) + ".sst-index.json"
+
+
+def get_cell_style(ws: ET.Element, col: str, row: int) -> int:
+    ref = f"{col}{row}"
+    for row_el in ws.iter(_tag("row")):
+        if row_el.get("r") == str(row):
+            for c in row_el:
+                if c.get("r") == ref:
+                    return int(c.get("s", "0"))
+    return 0
+
+
+def get_row_styles(ws: ET.Element, row_num: int) -> dict[str, int]:
+    """Get {col_letter: style_index} for all cells in a row."""
+    styles = {}
+    for row_el in ws.iter(_tag("row")):
+        if row_el.get("r") == str(row_num):
+            for c in row_el:
+                ref = c.get("r", "")
+                col_str = re.match(r"([A-Z]+)", ref)
+                if col_str:
+                    styles[col_str.group(1)] = int(c.get("s", "0"))
+            break
+    return styles
+
+
+def ensure_numfmt_style(styles: ET.Element, ref_style_idx: int, numfmt_code: str) -> int:
+    """Clone a cellXfs entry with the given numfmt. Returns the style index."""
+    # Find or add numFmt
+    numfmts = styles.find(_tag("numFmts"))
+    numfmt_id = None
+    if numfmts is not None:
+        for nf in numfmts:
+            if nf.get("formatCode") == numfmt_code:
+                numfmt_id = int(nf.get("numFmtId"))
+                break
+
+    if numfmt_id is None:
+        max_id = 163
+        if numfmts is not None:
+            for nf in numfmts:
+                max_id = max(max_id, int(nf.get("numFmtId", "0")))
+        else:
+            numfmts = ET.Element(_tag("numFmts"))
+            numfmts.set("count", "0")
+            styles.insert(0, numfmts)
+
+        numfmt_id = max_id + 1
+        nf = ET.SubElement(numfmts, _tag("numFmt"))
+        nf.set("numFmtId", str(numfmt_id))
+        nf.set("formatCode", numfmt_code)
+        numfmts.set("count", str(len(numfmts)))
+
+    # Find or create cellXfs entry
+    cellxfs = styles.find(_tag("cellXfs"))
+    xf_list = list(cellxfs)
+    ref_xf = xf_list[min(ref_style_idx, len(xf_list) - 1)]
+
+    for i, xf in enumerate(xf_list):
+        if (xf.get("numFmtId") == str(numfmt_id) and
+                xf.get("fontId") == ref_xf.get("fontId") and
+                xf.get("fillId") == ref_xf.get("fillId") and
+                xf.get("borderId") == ref_xf.get("borderId")):
+            return i
+
+    new_xf = copy.deepcopy(ref_xf)
+    new_xf.set("numFmtId", str(numfmt_id))
+    new_xf.set("applyNumberFormat", "true")
+    cellxfs.append(new_xf)
+    cellxfs.set("count", str(len(cellxfs)))
+    return len(cellxfs) - 1
+
+
+def apply_top_border(styles: ET.Element, row_el: ET.Element, border_style: str) -> int:
+    """
+    Give every cell in row_el a top border of border_style by cloning the
+    cellXfs entries it uses. Returns the number of styles cloned.
+    """
+    # 1. Create a new border entry with the specified top style
+    borders = styles.find(_tag("borders"))
+    new_border = ET.SubElement(borders, _tag("border"))
+    for side in ("left", "right"):
+        ET.SubElement(new_border, _tag(side))
+    top_el = ET.SubElement(new_border, _tag("top"))
+    top_el.set("style", border_style)
+    ET.SubElement(new_border, _tag("bottom"))
+    ET.SubElement(new_border, _tag("diagonal"))
+    borders.set("count", str(len(borders)))
+    new_border_id = len(borders) - 1
+
+    # 2. For each existing style used in the row, create a clone with the new borderId
+    cellxfs = styles.find(_tag("cellXfs"))
+    style_remap = {}  # old_style_idx -> new_style_idx
+    for c in row_el:
+        old_s = int(c.get("s", "0"))
+        if old_s not in style_remap:
+            xf_list = list(cellxfs)
+            ref_xf = xf_list[min(old_s, len(xf_list) - 1)]
+            new_xf = copy.deepcopy(ref_xf)
+            new_xf.set("borderId", str(new_border_id))
+            new_xf.set("applyBorder", "true")
+            cellxfs.append(new_xf)
+            cellxfs.set("count", str(len(cellxfs)))
+            style_remap[old_s] = len(cellxfs) - 1
+
+    # 3. Apply remapped styles to all cells in the row
+    for c in row_el:
+        old_s = int(c.get("s", "0"))
+        if old_s in style_remap:
+            c.set("s", str(style_remap[old_s]))
+
+    return len(style_remap)
+
+
+# ---------------------------------------------------------------------------
+# Edit session
+# ---------------------------------------------------------------------------
+
+class EditSession:
+    """
+    In-memory view of an unpacked xlsx directory.
+
+    Parts are parsed on first use and kept; operations mark the parts they
+    change, and save() writes each of those once.
+    """
+
+    def __init__(self, work_dir: str, sst_cache: bool = False, pretty: bool = True):
+        if not os.path.isdir(work_dir):
+            raise ValueError(f"Directory not found: {work_dir}")
+        self.work_dir = work_dir
+        self.sst_cache = sst_cache
+        self.pretty = pretty
+        self._lazy = read_manifest(work_dir) is not None   # xlsx_unpack.py --lazy
+        self._sst: SharedStringTable | None = None
+        self._trees: dict[str, ET.ElementTree] = {}   # part -> parsed tree
+        self._texts: dict[str, str] = {}              # part -> raw text (charts)
+        self._dirty: set[str] = set()
+        self._sheet_parts: dict[str, str] | None = None
+        self._refs: dict[str, dict[str, list[str]]] = {}  # part -> cross-sheet refs
+        self._edited: set[tuple[str, int, int]] = set()   # (sheet, row, col) written
+        self._edited_all = False                           # a delete moved references
+
+    # ── part access ─────────────────────────────────────────────────────────
+
+    def _path(self, part: str) -> str:
+        if self._lazy:
+            materialize(self.work_dir, [part])
+        return os.path.join(self.work_dir, *part.split("/"))
+
+    def tree(self, part: str) -> ET.ElementTree:
+        """Parsed tree for a part path like "xl/styles.xml" (parsed once)."""
+        tree = self._trees.get(part)
+        if tree is None:
+            tree = self._trees[part] = ET.parse(self._path(part))
+        return tree
+
+    def root(self, part: str) -> ET.Element:
+        return self.tree(part).getroot()
+
+    def text(self, part: str) -> str:
+        """Raw text of a part that is edited as text (charts)."""
+        if part not in self._texts:
+            with open(self._path(part), "r", encoding="utf-8") as fh:
+                self._texts[part] = fh.read()
+        return self._texts[part]
+
+    def shared_strings(self) -> SharedStringTable:
+        """Indexed shared string table (built once per session)."""
+        if self._sst is None:
+            cache = sst_cache_path(self.work_dir) if self.sst_cache else None
+            self._sst = SharedStringTable(self._path("xl/sharedStrings.xml"), cache)
+        return self._sst
+
+    def mark(self, part: str) -> None:
+        self._dirty.add(part)
+        self._refs.pop(part, None)
+
+    def sheet_part(self, sheet_name: str | None = None) -> str:
+        """Part path of a worksheet by name (first sheet if None)."""
+        if self._sheet_parts is None:
+            rels = {
+                rel.get("Id"): rel.get("Target", "")
+                for rel in self.root("xl/_rels/workbook.xml.rels")
+            }
+            self._sheet_parts = {}
+            for sheet in self.root("xl/workbook.xml").iter(_tag("sheet")):
+                rid = sheet.get(f"{{{NS_REL}}}id")
+                if rid in rels:
+                    target = rels[rid].lstrip("/")
+                    if not target.startswith("xl/"):
+                        target = "xl/" + target
+                    self._sheet_parts[sheet.get("name")] = target
+                else:
+                    self._sheet_parts[sheet.get("name")] = None
+
+        if sheet_name is None:
+            if not self._sheet_parts:
+                raise ValueError("Workbook has no sheets")
+            sheet_name = next(iter(self._sheet_parts))
+        if sheet_name not in self._sheet_parts:
+            raise ValueError(f"Sheet not found: {sheet_name}")
+        part = self._sheet_parts[sheet_name]
+        if part is None:
+            raise ValueError(f"Relationship not found for sheet: {sheet_name}")
+        return part
+
+    def _sheet_name(self, sheet_name: str | None) -> str:
+        """Name of the sheet an operation targets (first sheet if None)."""
+        self.sheet_part(sheet_name)
+        return sheet_name if sheet_name is not None else next(iter(self._sheet_parts))
+
+    def _track_shift(self, at: int, delta: int, sheet: str | None) -> None:
+        """Keep the edited-cell positions in step with a row shift."""
+        if delta < 0:
+            self._edited_all = True
+        key = sheet.casefold() if sheet is not None else None
+        moved = set()
+        for name, row, col in self._edited:
+            if key is None or name.casefold() == key:
+                if delta < 0 and at <= row < at - delta:
+                    continue
+                if row >= at:
+                    row += delta
+            moved.add((name, row, col))
+        self._edited = moved
+
+    # ── operations ──────────────────────────────────────────────────────────
+
+    def ref_index(self) -> dict[str, dict[str, list[str]]]:
+        """
+        Cross-sheet reference index: part -> {case-folded sheet name: cells
+        (or defined names, for workbook.xml) referencing it}. Parts changed
+        since the last call are re-scanned.
+        """
+        self.sheet_part()
+        for part in [p for p in self._sheet_parts.values() if p] + ["xl/workbook.xml"]:
+            if part not in self._refs:
+                if part == "xl/workbook.xml":
+                    self._refs[part] = defined_name_sheets(self.text(part))
+                else:
+                    self._refs[part] = sheet_refs(self.root(part).iter(_tag("c")))
+        return self._refs
+
+    def shift_rows(self, at: int, delta: int, sheet: str | None = None) -> list[str]:
+        """
+        Shift rows >= at by delta in every worksheet, chart, table and pivot
+        cache (same scope as xlsx_shift_rows.py). With `sheet`, only rows of
+        that sheet move and only references into it are rewritten elsewhere
+        (xlsx_shift_rows.py --sheet). Returns progress lines.
+        """
+        self._track_shift(at, delta, sheet)
+        if sheet is not None:
+            return self._shift_sheet_rows(at, delta, sheet)
+        log = []
+        for kind, part in shift_targets(self.work_dir):
+            if kind == "chart":
+                old = self.text(part)
+                new = shift_chart(old, at, delta)
+                n = int(new != old)
+                self._texts[part] = new
+            elif kind == "worksheet":
+                n = shift_worksheet(self.root(part), at, delta)
+            elif kind == "table":
+                n = shift_table(self.root(part), at, delta)
+            else:
+                n = shift_pivot_cache(self.root(part), at, delta)
+            if n:
+                self.mark(part)
+                log.append(f"  Updated {n:3d} references in {part}")
+        return log
+
+    def _shift_sheet_rows(self, at: int, delta: int, sheet: str) -> list[str]:
+        self.sheet_part()
+        key = sheet.casefold()
+        sheet = next((n for n in self._sheet_parts if n.casefold() == key), sheet)
+        own = self.sheet_part(sheet)
+        home_of = {part: name for name, part in self._sheet_parts.items()}
+
+        counts = {own: shift_worksheet(self.root(own), at, delta, sheet, sheet)}
+        for part, deps in self.ref_index().items():
+            if part == own or key not in deps:
+                continue
+            if part == "xl/workbook.xml":
+                self._texts[part], counts[part] = shift_defined_names(
+                    self.text(part), at, delta, sheet)
+            else:
+                counts[part] = shift_worksheet(self.root(part), at, delta, sheet,
+                                               home_of[part], set(deps[key]))
+        for kind, part in shift_targets(self.work_dir):
+            if kind == "chart":
+                old = self.text(part)
+                self._texts[part] = shift_chart(old, at, delta, sheet)
+                counts[part] = int(self._texts[part] != old)
+            elif kind == "pivotCache":
+                counts[part] = shift_pivot_cache(self.root(part), at, delta, sheet)
+        for part in sheet_table_parts(self.work_dir, own):
+            counts[part] = shift_table(self.root(part), at, delta)
+
+        log = []
+        for part, n in counts.items():
+            if n:
+                self.mark(part)
+                log.append(f"  Updated {n:3d} references in {part}")
+        return log
+
+    def insert_row(
+        self,
+        at: int,
+        sheet: str | None = None,
+        text: dict[str, str] | None = None,
+        values: dict[str, object] | None = None,
+        formula: dict[str, str] | None = None,
+        copy_style_from: int | None = None,
+    ) -> list[str]:
+        """
+        Shift rows >= at down by one, then fill the new row `at` with text,
+        numeric and formula cells ({row} in a formula becomes `at`). Styles are
+        copied per column from row copy_style_from (as numbered after the shift).
+        Returns progress lines.
+        """
+        text_cells = {k.upper(): v for k, v in (text or {}).items()}
+        num_cells = {k.upper(): v for k, v in (values or {}).items()}
+        formula_cells = {k.upper(): v for k, v in (formula or {}).items()}
+
+        part = self.sheet_part(sheet)
+        log = [f"Step 1: Shifting rows >= {at} down by 1..."]
+        log += self.shift_rows(at, 1)
+
+        root = self.root(part)
+        ref_styles = {}
+        if copy_style_from is not None:
+            ref_styles = get_row_styles(root, copy_style_from)
+            log.append(f"Step 2: Copied styles from row {copy_style_from}: {ref_styles}")
+
+        text_indices = {}
+        if text_cells:
+            sst = self.shared_strings()
+            for col, value in text_cells.items():
+                text_indices[col] = sst.add(value)
+                log.append(f"  Added shared string: \"{value}\" → index {text_indices[col]}")
+
+        sheet_data = root.find(_tag("sheetData"))
+        new_row = ET.Element(_tag("row"))
+        new_row.set("r", str(at))
+
+        all_cols = sorted(
+            set(list(text_cells) + list(num_cells) + list(formula_cells)),
+            key=col_number,
+        )
+
+        for col in all_cols:
+            cell = ET.SubElement(new_row, _tag("c"))
+            cell.set("r", f"{col}{at}")
+
+            if col in ref_styles:
+                cell.set("s", str(ref_styles[col]))
+
+            if col in text_cells:
+                cell.set("t", "s")
+                v = ET.SubElement(cell, _tag("v"))
+                v.text = str(text_indices[col])
+            elif col in num_cells:
+                # Omit t attribute for numbers — "n" is the default per OOXML spec
+                v = ET.SubElement(cell, _tag("v"))
+                v.text = str(num_cells[col])
+            elif col in formula_cells:
+                f_el = ET.SubElement(cell, _tag("f"))
+                f_el.text = formula_cells[col].replace("{row}", str(at)).lstrip("=")
+
+        # Insert new row at the correct position in sheetData (sorted by row number)
+        insert_idx = 0
+        for i, row_el in enumerate(list(sheet_data)):
+            r = row_el.get("r")
+            if r and int(r) > at:
+                insert_idx = i
+                break
+            insert_idx = i + 1
+        sheet_data.insert(insert_idx, new_row)
+        name = self._sheet_name(sheet)
+        self._edited.update((name, at, col_number(col)) for col in all_cols)
+
+        log.append(f"\nStep 3: Inserted row {at} with {len(all_cols)} cells:")
+        for col in all_cols:
+            if col in text_cells:
+                log.append(f"  {col}{at} = \"{text_cells[col]}\" (text)")
+            elif col in num_cells:
+                log.append(f"  {col}{at} = {num_cells[col]} (number)")
+            elif col in formula_cells:
+                log.append(f"  {col}{at} = {formula_cells[col].replace('{row}', str(at))} (formula)")
+
+        # Widen the dimension if the new row reaches past its last column
+        # (rows were already extended by the shift)
+        for dim in root.iter(_tag("dimension")):
+            old_ref = dim.get("ref", "")
+            if ":" in old_ref and all_cols:
+                start_ref, end_ref = old_ref.split(":")
+                end_row = int(re.search(r"(\d+)", end_ref).group(1))
+                end_col = re.match(r"([A-Z]+)", end_ref).group(1)
+                if col_number(all_cols[-1]) > col_number(end_col):
+                    end_col = all_cols[-1]
+                new_ref = f"{start_ref}:{end_col}{end_row}"
+                if new_ref != old_ref:
+                    dim.set("ref", new_ref)
+                    log.append(f"\n  Dimension: {old_ref} → {new_ref}")
+
+        self.mark(part)
+        return log
+
+    def add_column(
+        self,
+        col: str,
+        sheet: str | None = None,
+        header: str | None = None,
+        formula: str | None = None,
+        formula_rows: str | None = None,
+        total_row: int | None = None,
+        total_formula: str | None = None,
+        numfmt: str | None = None,
+        border_row: int | None = None,
+        border_style: str = "medium",
+    ) -> list[str]:
+        """
+        Add column `col`: a header in row 1, formula cells over formula_rows
+        ("2:9", {row} substituted), an optional total formula, an optional
+        number format and an optional top border across border_row. Styles
+        are taken from the previous column. Returns progress lines.
+        """
+        col = col.upper()
+        prev_col = col_letter(col_number(col) - 1) if col_number(col) > 1 else "A"
+
+        part = self.sheet_part(sheet)
+        root = self.root(part)
+        log = [f"Adding column {col} to {os.path.basename(part)}"]
+        changes = 0
+
+        # Resolve styles from previous column
+        header_style = get_cell_style(root, prev_col, 1) if header else 0
+
+        data_style = None
+        if formula_rows:
+            start_row = int(formula_rows.split(":")[0])
+            ref = get_cell_style(root, prev_col, start_row)
+            if numfmt:
+                data_style = ensure_numfmt_style(self.root("xl/styles.xml"), ref, numfmt)
+                self.mark("xl/styles.xml")
+            else:
+                data_style = ref
+
+        total_style = None
+        if total_row:
+            ref = get_cell_style(root, prev_col, total_row)
+            if numfmt:
+                total_style = ensure_numfmt_style(self.root("xl/styles.xml"), ref, numfmt)
+                self.mark("xl/styles.xml")
+            else:
+                total_style = ref
+
+        header_idx = None
+        if header:
+            header_idx = self.shared_strings().add(header)
+
+        sheet_data = root.find(_tag("sheetData"))
+        row_map = {}
+        for row_el in sheet_data:
+            r = row_el.get("r")
+            if r:
+                row_map[int(r)] = row_el
+
+        name = self._sheet_name(sheet)
+        col_num = col_number(col)
+
+        # Add header cell
+        if header and 1 in row_map:
+            cell = ET.SubElement(row_map[1], _tag("c"))
+            cell.set("r", f"{col}1")
+            cell.set("s", str(header_style))
+            cell.set("t", "s")
+            v = ET.SubElement(cell, _tag("v"))
+            v.text = str(header_idx)
+            changes += 1
+            self._edited.add((name, 1, col_num))
+            log.append(f"  {col}1 = \"{header}\" (header, style={header_style})")
+
+        # Add formula cells
+        if formula and formula_rows:
+            start, end = map(int, formula_rows.split(":"))
+            for row_num in range(start, end + 1):
+                if row_num not in row_map:
+                    row_el = ET.SubElement(sheet_data, _tag("row"))
+                    row_el.set("r", str(row_num))
+                    row_map[row_num] = row_el
+
+                cell = ET.SubElement(row_map[row_num], _tag("c"))
+                cell.set("r", f"{col}{row_num}")
+                if data_style is not None:
+                    cell.set("s", str(data_style))
+                f_el = ET.SubElement(cell, _tag("f"))
+                f_el.text = formula.replace("{row}", str(row_num)).lstrip("=")
+                changes += 1
+                self._edited.add((name, row_num, col_num))
+
+            log.append(f"  {col}{start}:{col}{end} = formulas (style={data_style})")
+
+        # Add total formula
+        if total_row and total_formula:
+            if total_row not in row_map:
+                row_el = ET.SubElement(sheet_data, _tag("row"))
+                row_el.set("r", str(total_row))
+                row_map[total_row] = row_el
+
+            total_f = total_formula.lstrip("=")
+            cell = ET.SubElement(row_map[total_row], _tag("c"))
+            cell.set("r", f"{col}{total_row}")
+            if total_style is not None:
+                cell.set("s", str(total_style))
+            f_el = ET.SubElement(cell, _tag("f"))
+            f_el.text = total_f
+            changes += 1
+            self._edited.add((name, total_row, col_num))
+            log.append(f"  {col}{total_row} = ={total_f} (style={total_style})")
+
+        # Update dimension
+        for dim in root.iter(_tag("dimension")):
+            old_ref = dim.get("ref", "")
+            if ":" in old_ref:
+                start_ref, end_ref = old_ref.split(":")
+                end_col_str = re.match(r"([A-Z]+)", end_ref).group(1)
+                end_row_str = re.search(r"(\d+)", end_ref).group(1)
+                if col_number(col) > col_number(end_col_str):
+                    new_ref = f"{start_ref}:{col}{end_row_str}"
+                    dim.set("ref", new_ref)
+                    log.append(f"  Dimension: {old_ref} → {new_ref}")
+
+        # Extend <cols> to cover new column
+        cols_el = root.find(_tag("cols"))
+        if cols_el is not None:
+            new_col_num = col_number(col)
+            covered = any(
+                int(c.get("min", "0")) <= new_col_num <= int(c.get("max", "0"))
+                for c in cols_el
+            )
+            if not covered:
+                prev_num = col_number(prev_col)
+                for c in cols_el:
+                    if int(c.get("min", "0")) <= prev_num <= int(c.get("max", "0")):
+                        new_col_def = copy.deepcopy(c)
+                        new_col_def.set("min", str(new_col_num))
+                        new_col_def.set("max", str(new_col_num))
+                        cols_el.append(new_col_def)
+                        log.append(f"  Added <col> definition for column {col}")
+                        break
+
+        # Apply border to entire row if requested
+        if border_row and border_row in row_map:
+            cloned = apply_top_border(self.root("xl/styles.xml"), row_map[border_row], border_style)
+            self.mark("xl/styles.xml")
+            log.append(f"  Applied {border_style} top border to all cells in row {border_row} "
+                       f"(A-{col}, {cloned} style(s) cloned)")
+
+        self.mark(part)
+        log.append(f"  {changes} cells added.")
+        return log
+
+    def recalculate(self) -> list[str]:
+        """
+        Recompute the formulas downstream of every cell written since the
+        last call (all formulas after a row delete) and rewrite their <v>
+        values in the worksheet trees (formula_graph.py). Returns progress lines.
+        """
+        if not self._edited and not self._edited_all:
+            return ["Recalculation: no cells were edited"]
+        self.sheet_part()
+        sheets = {name: self.root(part) for name, part in self._sheet_parts.items() if part}
+        pending = self._sst.pending if self._sst is not None else []
+        strings = read_strings(self._path("xl/sharedStrings.xml"), pending)
+        workbook = ET.fromstring(self.text("xl/workbook.xml"))
+        result = recalculate(sheets, workbook, strings,
+                             None if self._edited_all else self._edited)
+        for name in result["sheets"]:
+            self.mark(self._sheet_parts[name])
+        self._edited, self._edited_all = set(), False
+        return report_lines(result)
+
+    def apply(self, op: dict) -> list[str]:
+        """Run one operation dict (see module docstring). Returns progress lines."""
+        kind = op.get("op")
+        args = {k: v for k, v in op.items() if k != "op"}
+        if kind == "insert_row":
+            return self.insert_row(**args)
+        if kind == "add_column":
+            return self.add_column(**args)
+        if kind == "shift_rows":
+            operation = args.get("operation", "insert").lower()
+            if operation not in ("insert", "delete"):
+                raise ValueError(f"operation must be 'insert' or 'delete', got '{operation}'")
+            count = int(args.get("count", 1))
+            return self.shift_rows(int(args["at"]), count if operation == "insert" else -count,
+                                   sheet=args.get("sheet"))
+        raise ValueError(f"Unknown op: {kind!r}")
+
+    def save(self) -> list[str]:
+        """Write every changed part once. Returns the part paths written."""
+        written = []
+        if self._sst is not None and self._sst.flush():
+            written.append("xl/sharedStrings.xml")
+        for part in sorted(self._dirty):
+            path = self._path(part)
+            if part in self._texts:
+                with open(path, "w", encoding="utf-8") as fh:
+                    fh.write(self._texts[part])
+            else:
+                _write_tree(self._trees[part], path, self.pretty)
+            written.append(part)
+        self._dirty.clear()
+        return sorted(written)
+
+
+def main() -> None:
+    verbose = "--verbose" in sys.argv
+    sst_cache = "--sst-cache" in sys.argv
+    compact = "--compact" in sys.argv
+    recalc = "--recalc" in sys.argv
+    args = [a for a in sys.argv[1:]
+            if a not in ("--verbose", "--sst-cache", "--compact", "--recalc")]
+    if len(args) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    work_dir, ops_path = args[0], args[1]
+    try:
+        if ops_path == "-":
+            ops = json.load(sys.stdin)
+        else:
+            with open(ops_path, "r", encoding="utf-8") as fh:
+                ops = json.load(fh)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"ERROR: cannot read operations: {e}")
+        sys.exit(1)
+    if isinstance(ops, dict):
+        ops = [ops]
+
+    n = 0
+    try:
+        session = EditSession(work_dir, sst_cache=sst_cache, pretty=not compact)
+        for n, op in enumerate(ops, 1):
+            lines = session.apply(op)
+            target = op.get("at", op.get("col", ""))
+            print(f"[{n}/{len(ops)}] {op.get('op')} {target}")
+            if verbose:
+                for line in lines:
+                    print(f"    {line}")
+        if recalc:
+            print()
+            print("\n".join(session.recalculate()))
+        written = session.save()
+    except (OSError, ET.ParseError, ValueError, TypeError, KeyError) as e:
+        where = f"operation {n}" if n else "setup"
+        print(f"ERROR: {where}: {e}")
+        print("No files were written.")
+        sys.exit(1)
+
+    print(f"\nApplied {len(ops)} operation(s); wrote {len(written)} part(s):")
+    for part in written:
+        print(f"  {part}")
+    print(f"\nNext: python3 xlsx_pack.py {work_dir} output.xlsx")
+
+
+if __name__ == "__main__":
+    main()
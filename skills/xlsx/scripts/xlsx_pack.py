@@ -5,40 +5,202 @@ xlsx_pack.py — Pack a working directory back into a valid xlsx file.
 
 Usage:
     python3 xlsx_pack.py <source_dir> <output.xlsx>
+    python3 xlsx_pack.py <source_dir> <output.xlsx> --base original.xlsx
+    python3 xlsx_pack.py <source_dir> <output.xlsx> --level 1     # 0 = store, 9 = smallest
+    python3 xlsx_pack.py <source_dir> <output.xlsx> --jobs 4 --timings
 
 Requirements:
     - source_dir must contain [Content_Types].xml at its root
     - All XML files are re-validated for well-formedness before packing
 
+Incremental repack (--base):
+    With the original xlsx as base, every part whose bytes are unchanged
+    (same size and CRC-32 as the base member) is copied into the output as
+    its already-compressed zip entry, without decompressing or
+    recompressing it, and is not re-validated. Only added or modified parts
+    are validated and compressed. Members keep the base order. Editing one
+    sheet of a workbook full of images then costs about as much as
+    compressing that sheet. Parts unpacked with pretty-printing differ from
+    the base bytes, so use xlsx_unpack.py --compact or --lazy to get the
+    most out of this.
+
+For a lazily unpacked directory (xlsx_unpack.py --lazy), the source xlsx
+recorded in its manifest is the base by default, and parts that were never
+extracted are always copied from it. A part deleted after it was extracted
+is left out.
+
+Validation streams each part through expat without building a tree (the
+same well-formedness and namespace checks ET.parse applies), so memory does
+not grow with sheet size. --jobs N checks the parts in N worker processes,
+largest first; --timings prints how long each part took, slowest first.
+
+--level sets the deflate level for the parts that are compressed
+(0 stores them uncompressed; default is zlib's 6).
+
 The resulting xlsx is a valid ZIP archive with correct OOXML structure.
 """
 
 import sys
 import os
+import copy
+import shutil
+import struct
+import tempfile
+import time
 import zipfile
-import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from xml.parsers import expat
 
+from xlsx_unpack import LAZY_MANIFEST, materialize, pending_parts, read_manifest
 
-def validate_xml_files(source_dir: str) -> list[str]:
-    """Return list of XML files that fail to parse."""
-    bad = []
+
+def _source_files(source_dir: str) -> list[str]:
+    """Part names ("xl/workbook.xml") of every file under source_dir."""
+    names = []
     for dirpath, _, filenames in os.walk(source_dir):
         for fname in filenames:
-            if fname.endswith(".xml") or fname.endswith(".rels"):
-                fpath = os.path.join(dirpath, fname)
-                try:
-                    ET.parse(fpath)
-                except ET.ParseError as e:
-                    rel = os.path.relpath(fpath, source_dir)
-                    bad.append(f"{rel}: {e}")
+            arcname = os.path.relpath(os.path.join(dirpath, fname), source_dir).replace(os.sep, "/")
+            if arcname != LAZY_MANIFEST:
+                names.append(arcname)
+    return names
+
+
+def check_well_formed(fpath: str) -> tuple[str | None, float]:
+    """
+    Stream one file through expat, keeping nothing. Returns (error message
+    or None, seconds). Errors read like ET.ParseError ("mismatched tag:
+    line 3, column 2").
+    """
+    t0 = time.perf_counter()
+    parser = expat.ParserCreate(namespace_separator="}")
+    error = None
+    try:
+        with open(fpath, "rb") as f:
+            parser.ParseFile(f)
+    except expat.ExpatError as e:
+        error = f"{expat.ErrorString(e.code)}: line {e.lineno}, column {e.offset}"
+    return error, time.perf_counter() - t0
+
+
+def validate_xml_files(source_dir: str, only: set[str] | None = None, jobs: int = 1,
+                       timings: dict[str, float] | None = None) -> list[str]:
+    """
+    Return list of XML files that fail to parse (limited to part names in
+    `only`). With jobs > 1 files are checked in a process pool, largest
+    first. Seconds per part are stored in `timings` if given.
+    """
+    parts = [name for name in sorted(_source_files(source_dir))
+             if (name.endswith(".xml") or name.endswith(".rels"))
+             and (only is None or name in only)]
+    paths = [os.path.join(source_dir, *name.split("/")) for name in parts]
+
+    if jobs > 1 and len(paths) > 1:
+        order = sorted(range(len(paths)), key=lambda i: os.path.getsize(paths[i]), reverse=True)
+        results = [None] * len(paths)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+            futures = {i: pool.submit(check_well_formed, paths[i]) for i in order}
+            for i, future in futures.items():
+                results[i] = future.result()
+    else:
+        results = [check_well_formed(path) for path in paths]
+
+    bad = []
+    for name, (error, seconds) in zip(parts, results):
+        if timings is not None:
+            timings[name] = seconds
+        if error is not None:
+            bad.append(f"{name}: {error}")
     return bad
 
 
-def pack(source_dir: str, xlsx_path: str) -> None:
+def _file_crc(path: str) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def unchanged_parts(source_dir: str, base: zipfile.ZipFile) -> set[str]:
+    """Parts on disk whose bytes equal the base member (size, then CRC-32)."""
+    same = set()
+    for name in _source_files(source_dir):
+        try:
+            info = base.getinfo(name)
+        except KeyError:
+            continue
+        fpath = os.path.join(source_dir, *name.split("/"))
+        if os.path.getsize(fpath) == info.file_size and _file_crc(fpath) == info.CRC:
+            same.add(name)
+    return same
+
+
+# zipfile.ZipFile writer state that copy_raw_member updates the way
+# ZipFile.write() does; not a public API, so checked before use
+_WRITER_STATE = ("fp", "_lock", "_didModify", "start_dir", "filelist", "NameToInfo")
+
+
+def can_copy_raw(out: zipfile.ZipFile) -> bool:
+    """True if this zipfile version exposes the writer state copy_raw_member needs."""
+    return (all(hasattr(out, attr) for attr in _WRITER_STATE)
+            and hasattr(zipfile.ZipInfo, "FileHeader"))
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """Drop ZIP64 extended-information records (header 0x0001) from an extra field."""
+    kept = bytearray()
+    i = 0
+    while i + 4 <= len(extra):
+        tag, size = struct.unpack("<HH", extra[i:i + 4])
+        if tag != 0x0001:
+            kept += extra[i:i + 4 + size]
+        i += 4 + size
+    return bytes(kept)
+
+
+def copy_raw_member(base: zipfile.ZipFile, base_fp, info: zipfile.ZipInfo,
+                    out: zipfile.ZipFile) -> None:
+    """
+    Append a base member to `out` as-is: local header plus the compressed
+    bytes, no decompression. Uses the writer state of zipfile.ZipFile
+    (fp, filelist, NameToInfo, start_dir) the same way ZipFile.write() does;
+    call only when can_copy_raw(out).
+    """
+    base_fp.seek(info.header_offset)
+    header = base_fp.read(zipfile.sizeFileHeader)
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    base_fp.seek(info.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+
+    zinfo = copy.copy(info)
+    zinfo.flag_bits &= ~0x08        # sizes go in the local header, no data descriptor
+    # FileHeader() appends its own ZIP64 record when one is needed
+    zinfo.extra = _strip_zip64_extra(info.extra)
+    with out._lock:
+        zinfo.header_offset = out.fp.tell()
+        out.fp.write(zinfo.FileHeader(zinfo.file_size > zipfile.ZIP64_LIMIT
+                                      or zinfo.compress_size > zipfile.ZIP64_LIMIT))
+        remaining = info.compress_size
+        while remaining:
+            chunk = base_fp.read(min(remaining, 1 << 20))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member in base: {info.filename}")
+            out.fp.write(chunk)
+            remaining -= len(chunk)
+        out.filelist.append(zinfo)
+        out.NameToInfo[zinfo.filename] = zinfo
+        out.start_dir = out.fp.tell()
+        out._didModify = True
+
+
+def pack(source_dir: str, xlsx_path: str, base_path: str | None = None,
+         level: int | None = None, jobs: int = 1, show_timings: bool = False) -> None:
     if not os.path.isdir(source_dir):
         print(f"ERROR: Directory not found: {source_dir}", file=sys.stderr)
         sys.exit(1)
 
+    manifest = read_manifest(source_dir)
+    materialize(source_dir, ["[Content_Types].xml"])
     content_types = os.path.join(source_dir, "[Content_Types].xml")
     if not os.path.isfile(content_types):
         print(
@@ -48,31 +210,75 @@ def pack(source_dir: str, xlsx_path: str) -> None:
         )
         sys.exit(1)
 
-    # Validate XML well-formedness before packing
-    print("Validating XML files...")
-    bad_files = validate_xml_files(source_dir)
-    if bad_files:
-        print("ERROR: The following files have XML parse errors:", file=sys.stderr)
-        for b in bad_files:
-            print(f"  {b}", file=sys.stderr)
-        print(
-            "\nFix all XML errors before packing. "
-            "A malformed xlsx cannot be opened by Excel or LibreOffice.",
-            file=sys.stderr,
-        )
-        sys.exit(1)
+    if manifest is not None:
+        if base_path is None:
+            base_path = manifest["source"]
+        elif os.path.abspath(base_path) != manifest["source"]:
+            materialize(source_dir)   # everything not extracted yet must come from disk
+    base = None
+    if base_path is not None:
+        try:
+            base = zipfile.ZipFile(base_path, "r")
+        except (OSError, zipfile.BadZipFile) as e:
+            print(f"ERROR: cannot open base xlsx '{base_path}': {e}", file=sys.stderr)
+            sys.exit(1)
+
+    try:
+        on_disk = _source_files(source_dir)
+        same = unchanged_parts(source_dir, base) if base is not None else set()
+
+        # Validate XML well-formedness before packing (only changed parts with a base)
+        print("Validating XML files...")
+        timings: dict[str, float] = {}
+        t0 = time.perf_counter()
+        bad_files = validate_xml_files(source_dir, set(on_disk) - same if base else None,
+                                       jobs=jobs, timings=timings)
+        if show_timings:
+            print(f"  {len(timings)} part(s) checked in {time.perf_counter() - t0:.3f}s")
+            for name, seconds in sorted(timings.items(), key=lambda kv: kv[1], reverse=True):
+                size = os.path.getsize(os.path.join(source_dir, *name.split("/")))
+                print(f"  {seconds:8.3f}s  {name}  ({size:,} bytes)")
+        if bad_files:
+            print("ERROR: The following files have XML parse errors:", file=sys.stderr)
+            for b in bad_files:
+                print(f"  {b}", file=sys.stderr)
+            print(
+                "\nFix all XML errors before packing. "
+                "A malformed xlsx cannot be opened by Excel or LibreOffice.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
 
-    print("✓ All XML files are well-formed")
+        print("✓ All XML files are well-formed")
 
-    # Count files to pack
-    file_count = sum(len(files) for _, _, files in os.walk(source_dir))
+        if level == 0:
+            options = {"compression": zipfile.ZIP_STORED}
+        else:
+            options = {"compression": zipfile.ZIP_DEFLATED, "compresslevel": level}
 
-    with zipfile.ZipFile(xlsx_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        for dirpath, _, filenames in os.walk(source_dir):
-            for fname in filenames:
-                fpath = os.path.join(dirpath, fname)
-                arcname = os.path.relpath(fpath, source_dir)
-                z.write(fpath, arcname)
+        if base is None:
+            file_count = 0
+            with zipfile.ZipFile(xlsx_path, "w", **options) as z:
+                for arcname in on_disk:
+                    z.write(os.path.join(source_dir, *arcname.split("/")), arcname)
+                    file_count += 1
+        else:
+            # Parts never extracted from a lazy unpack are unchanged too
+            if manifest is not None and os.path.abspath(base_path) == manifest["source"]:
+                for name in pending_parts(source_dir, manifest):
+                    info = base.getinfo(name)
+                    if [info.CRC, info.file_size] != manifest["members"][name]:
+                        print(f"ERROR: {base_path} changed since it was unpacked ({name}); "
+                              "unpack it again", file=sys.stderr)
+                        sys.exit(1)
+                    same.add(name)
+            file_count, copied = _pack_incremental(source_dir, xlsx_path, base, on_disk,
+                                                   same, options)
+            print(f"Copied {copied} unchanged part(s) from '{base_path}' without recompressing; "
+                  f"compressed {file_count - copied}")
+    finally:
+        if base is not None:
+            base.close()
 
     size = os.path.getsize(xlsx_path)
     print(f"Packed {file_count} files → '{xlsx_path}' ({size:,} bytes)")
@@ -80,8 +286,84 @@ def pack(source_dir: str, xlsx_path: str) -> None:
     print(f"  python3 formula_check.py {xlsx_path}")
 
 
+def _pack_incremental(source_dir: str, xlsx_path: str, base: zipfile.ZipFile,
+                      on_disk: list[str], same: set[str], options: dict) -> tuple[int, int]:
+    """
+    Write xlsx_path from base + source_dir: base members in base order (raw
+    copy if unchanged, else the file on disk; dropped if deleted), then new
+    files. Written via a temp file so xlsx_path may be the base itself.
+    Returns (members written, members copied raw).
+    """
+    disk = set(on_disk)
+    out_dir = os.path.dirname(os.path.abspath(xlsx_path))
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".xlsx")
+    os.close(fd)
+    written = copied = 0
+    try:
+        with open(base.filename, "rb") as base_fp, \
+                zipfile.ZipFile(tmp_path, "w", **options) as z:
+            raw = can_copy_raw(z)
+            for info in base.infolist():
+                name = info.filename
+                if raw and name in same and not info.flag_bits & 0x01:   # not encrypted
+                    copy_raw_member(base, base_fp, info, z)
+                    copied += 1
+                elif name in disk:
+                    z.write(os.path.join(source_dir, *name.split("/")), name)
+                elif name in same:   # never extracted from a lazy unpack
+                    z.writestr(name, base.read(info))
+                else:
+                    continue
+                written += 1
+            for name in on_disk:
+                if name not in base.NameToInfo:
+                    z.write(os.path.join(source_dir, *name.split("/")), name)
+                    written += 1
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)   # mkstemp creates 0600
+        shutil.move(tmp_path, xlsx_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return written, copied
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: xlsx_pack.py <source_dir> <output.xlsx>")
+    base_path = None
+    level = None
+    jobs = 1
+    show_timings = "--timings" in sys.argv
+    args = []
+    i = 1
+    while i < len(sys.argv):
+        arg = sys.argv[i]
+        if arg in ("--base", "--level", "--jobs") and i + 1 < len(sys.argv):
+            if arg == "--base":
+                base_path = sys.argv[i + 1]
+            elif arg == "--jobs":
+                try:
+                    jobs = max(1, int(sys.argv[i + 1]))
+                except ValueError:
+                    print(f"ERROR: --jobs expects an integer, got '{sys.argv[i + 1]}'")
+                    sys.exit(1)
+            else:
+                try:
+                    level = int(sys.argv[i + 1])
+                except ValueError:
+                    level = -1
+                if not 0 <= level <= 9:
+                    print(f"ERROR: --level expects 0-9, got '{sys.argv[i + 1]}'")
+                    sys.exit(1)
+            i += 2
+            continue
+        if arg != "--timings":
+            args.append(arg)
+        i += 1
+    if len(args) != 2:
+        print("Usage: xlsx_pack.py <source_dir> <output.xlsx> [--base original.xlsx] "
+              "[--level 0-9] [--jobs N] [--timings]")
         sys.exit(1)
-    pack(sys.argv[1], sys.argv[2])
+    pack(args[0], args[1], base_path=base_path, level=level, jobs=jobs,
+         show_timings=show_timings)
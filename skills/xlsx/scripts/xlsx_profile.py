@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+"""
+xlsx_profile.py — Single-pass column profiling used by xlsx_reader.py.
+
+A SheetProfile is fed one sheet as a sequence of DataFrame chunks and keeps
+only running accumulators, so the structure report, the quality audit and
+the describe() statistics all come out of a single scan, and a CSV never has
+to be held in memory as a whole:
+
+    shape / dtypes     row count; each column's dtype resolved across chunks
+                       the way pd.concat would
+    nulls              per-column null counts
+    duplicate rows     one 64-bit hash per row (pd.util.hash_array of each
+                       column, weighted by position and summed), counted
+                       with np.unique at the end
+    mixed types        numeric-convertible vs non-null counts per text column
+    year-as-float      running min / max of numeric columns
+    describe()         count, sum and variance merged chunk by chunk
+                       (Chan et al. pairwise update), min, max, quartiles
+    quartiles / IQR    exact while the sheet's numeric values fit in
+                       EXACT_VALUES; past that, exact (value, count) pairs
+                       for columns with few distinct values and a merging
+                       t-digest for the rest
+
+Each chunk is profiled in batches of whole columns rather than column by
+column, which is what keeps wide sheets (hundreds of columns) fast: a
+numeric batch becomes one float64 block whose nulls, sums and squared
+deviations are reduced per row of the block, and a text batch (object and
+categorical columns) is factorized once, so each distinct value goes
+through pd.to_numeric and the hash a single time.
+
+structure(), findings() and stats() return the same dicts as
+explore_structure / audit_quality / compute_stats in xlsx_reader.py. When a
+t-digest is used, that column's quartiles and IQR outlier count are
+estimates and structure() carries "approximate": true.
+
+Usage (library):
+    from xlsx_profile import SheetProfile
+    profile = SheetProfile()
+    for chunk in chunks:
+        profile.update(chunk)
+    profile.structure(), profile.findings(), profile.stats()
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+EXACT_VALUES = 4_000_000   # numeric values per sheet kept exactly (32 MB)
+COMPRESSION = 1000         # t-digest compression: about COMPRESSION / 2 centroids
+DISTINCT_VALUES = 4096     # columns with at most this many values stay exact
+PREVIEW_ROWS = 5
+BATCH_CELLS = 1 << 21     # values per column batch in SheetProfile.update
+
+
+# ---------------------------------------------------------------------------
+# Quantile sketch
+# ---------------------------------------------------------------------------
+
+class QuantileSketch:
+    """
+    Quantiles of a stream of floats, in one of three modes:
+
+    buffering   values kept as-is until compress() is called; exact
+    histogram   after compress(), while there are at most DISTINCT_VALUES
+                distinct values: (value, count) pairs; still exact
+    digest      beyond that, a merging t-digest: points sorted by value and
+                grouped so each centroid spans one unit of the arcsine
+                scale k(q) = COMPRESSION / (2 pi) * asin(2q - 1), keeping
+                centroids tiny near the tails; estimates
+
+    Interpolation is pandas' default (linear between order statistics), so
+    the exact modes match Series.quantile().
+    """
+
+    def __init__(self, compression: int = COMPRESSION):
+        self.compression = compression
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._raw = []           # float64 arrays while buffering
+        self._means = None       # centroid means / weights once compressed
+        self._weights = None
+        self._lows = None        # smallest / largest value in each centroid
+        self._highs = None
+        self._histogram = False
+
+    @property
+    def buffering(self) -> bool:
+        return self._means is None
+
+    @property
+    def exact(self) -> bool:
+        return self.buffering or self._histogram
+
+    def add(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        if self.buffering:
+            self._raw.append(values)
+        else:
+            self._merge(values, np.ones(len(values)), values, values)
+
+    def compress(self) -> None:
+        """Stop buffering: fold the buffered values into a histogram or digest."""
+        if not self.buffering:
+            return
+        values = self._values()
+        self._raw = []
+        self._means, self._weights = np.empty(0), np.empty(0)
+        self._lows, self._highs = np.empty(0), np.empty(0)
+        self._merge(values, np.ones(len(values)), values, values)
+
+    def _values(self) -> np.ndarray:
+        if len(self._raw) != 1:
+            self._raw = [np.concatenate(self._raw) if self._raw else np.empty(0)]
+        return self._raw[0]
+
+    def _merge(self, means: np.ndarray, weights: np.ndarray,
+               lows: np.ndarray, highs: np.ndarray) -> None:
+        means = np.concatenate([self._means, means])
+        weights = np.concatenate([self._weights, weights])
+        lows = np.concatenate([self._lows, lows])
+        highs = np.concatenate([self._highs, highs])
+        if not len(means):
+            return
+        if np.array_equal(lows, highs):
+            # Single values only: collapse ties, and keep them all while
+            # there are few distinct values (coded, integer, year data)
+            means, inverse = np.unique(means, return_inverse=True)
+            weights = np.bincount(inverse, weights=weights)
+            lows = highs = means
+            self._histogram = len(means) <= DISTINCT_VALUES
+            if self._histogram:
+                self._means, self._weights, self._lows, self._highs = means, weights, lows, highs
+                return
+        else:
+            order = np.argsort(means)
+            means, weights = means[order], weights[order]
+            lows, highs = lows[order], highs[order]
+        cum = np.cumsum(weights)
+        q = (cum - weights / 2) / cum[-1]
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self._weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / self._weights
+        self._lows = np.minimum.reduceat(lows, starts)
+        self._highs = np.maximum.reduceat(highs, starts)
+
+    def _at_rank(self, cum: np.ndarray, rank: int) -> float:
+        j = min(int(np.searchsorted(cum, rank, side="right")), len(cum) - 1)
+        return self._means[j]
+
+    def quantile(self, q: float) -> float:
+        if not self.n:
+            return math.nan
+        if self.buffering:
+            return float(np.quantile(self._values(), q))
+        rank = q * (self.n - 1)
+        cum = np.cumsum(self._weights)
+        if self._histogram:
+            # np.quantile's linear interpolation between order statistics
+            lo = math.floor(rank)
+            t = rank - lo
+            a = self._at_rank(cum, lo)
+            b = self._at_rank(cum, min(lo + 1, self.n - 1))
+            return float(b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t)
+        # A centroid of one repeated value answers exactly instead of being
+        # interpolated across
+        j = min(int(np.searchsorted(cum, rank, side="right")), len(cum) - 1)
+        if self._lows[j] == self._highs[j]:
+            return float(self._lows[j])
+        values, ranks = self._ranks()
+        return float(np.interp(rank, ranks, values))
+
+    def quantiles(self, qs: list) -> list:
+        """Several quantiles at once (one np.quantile partition while buffering)."""
+        if self.buffering and self.n:
+            return [float(v) for v in np.quantile(self._values(), qs)]
+        return [self.quantile(q) for q in qs]
+
+    def _ranks(self) -> tuple[np.ndarray, np.ndarray]:
+        """(values, 0-based ranks) of min, centroid centres and max."""
+        centres = np.cumsum(self._weights) - self._weights / 2 - 0.5
+        return (np.r_[self.min, self._means, self.max],
+                np.r_[0.0, centres, self.n - 1.0])
+
+    def count_outside(self, low: float, high: float) -> int:
+        """Number of values < low or > high (estimated in digest mode)."""
+        if not self.n:
+            return 0
+        if self.buffering:
+            values = self._values()
+            return int((values < low).sum() + (values > high).sum())
+        if self._histogram:
+            outside = (self._means < low) | (self._means > high)
+            return int(self._weights[outside].sum())
+        values, ranks = self._ranks()
+        below = 0 if low <= self.min else math.ceil(np.interp(low, values, ranks))
+        above = 0 if high >= self.max else self.n - 1 - math.floor(np.interp(high, values, ranks))
+        return int(below + above)
+
+
+# ---------------------------------------------------------------------------
+# Sheet profile
+# ---------------------------------------------------------------------------
+
+def _is_categorical(dtype) -> bool:
+    return isinstance(dtype, pd.CategoricalDtype)
+
+
+def _resolve_dtype(seen: dict):
+    """
+    Dtype pd.concat gives a column whose chunks had the dtypes in seen
+    ({str(dtype): (dtype, every chunk of this dtype was all-null)}), with
+    xlsx_reader.concat_chunks' rule that categoricals absorb text and
+    all-null chunks.
+    """
+    entries = list(seen.values())
+    if any(_is_categorical(d) for d, _ in entries):
+        if all(_is_categorical(d) or d.kind == "O" or all_null for d, all_null in entries):
+            return pd.CategoricalDtype()
+        return np.dtype(object)
+    dtypes = [d for d, _ in entries]
+    if len(dtypes) == 1:
+        return dtypes[0]
+    if all(d.kind in "iuf" for d in dtypes):
+        return np.result_type(*dtypes)
+    return np.dtype(object)
+
+
+def _hash_values(values: np.ndarray) -> np.ndarray:
+    """
+    pd.util.hash_array of an object array, with numbers and booleans hashed
+    as float64 so that 1, 1.0 and True hash alike (duplicated() treats them
+    as equal) and match a numeric chunk of the same column.
+    """
+    hashed = np.empty(len(values), dtype=np.uint64)
+    number = np.fromiter((isinstance(v, (int, float, np.number, np.bool_)) for v in values),
+                         dtype=bool, count=len(values))
+    if number.any():
+        hashed[number] = pd.util.hash_array(values[number].astype(np.float64) + 0.0)
+    if not number.all():
+        hashed[~number] = pd.util.hash_array(values[~number])
+    return hashed
+
+
+def _position_keys(positions: list) -> np.ndarray:
+    """Odd 64-bit multipliers for column positions."""
+    return pd.util.hash_array(np.array(positions, dtype=np.int64)) | np.uint64(1)
+
+
+def _is_year_column(col) -> bool:
+    col_lower = str(col).lower()
+    # "年" is the Chinese character for "year" — detect year columns in CJK spreadsheets
+    return "year" in col_lower or "yr" in col_lower or "年" in col_lower
+
+
+class SheetProfile:
+    """Accumulates one sheet's report over DataFrame chunks in a single pass."""
+
+    def __init__(self, exact_values: int = EXACT_VALUES):
+        self.exact_values = exact_values
+        self.rows = 0
+        self.columns = None
+        self._cols = {}          # column -> accumulator dict
+        self._hashes = []        # per-chunk row hash arrays
+        self._preview = []       # leading chunks' head rows
+
+    def _column(self, col) -> dict:
+        acc = self._cols.get(col)
+        if acc is None:
+            acc = self._cols[col] = {
+                "nulls": 0, "non_null": 0, "convertible": 0, "seen": {},
+                "count": 0, "sum": 0.0, "mean": 0.0, "m2": 0.0,
+                "sketch": QuantileSketch(),
+            }
+        return acc
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Fold one chunk (rows continue the previous chunk) into the profile.
+        Columns missing from a chunk, or first seen in a later one, count as
+        null there, as they would after pd.concat.
+        """
+        if self.columns is None:
+            self.columns = []
+        n = len(chunk)
+        for col in chunk.columns:
+            if col not in self._cols:
+                self.columns.append(col)
+                self._missing(self._column(col), self.rows)
+        for col in self.columns:
+            if col not in chunk.columns:
+                self._missing(self._cols[col], n)
+        if self.rows < PREVIEW_ROWS:
+            self._preview.append(chunk.head(PREVIEW_ROWS - self.rows))
+        self.rows += n
+
+        # Numeric and text columns are profiled in batches of whole columns
+        # (about BATCH_CELLS values each) rather than one Series at a time
+        positions = {col: i for i, col in enumerate(self.columns)}
+        dtypes = chunk.dtypes
+        numeric, text, other = [], [], []
+        for col in chunk.columns:
+            dtype = dtypes[col]
+            if _is_categorical(dtype) or dtype.kind == "O":
+                text.append(col)
+            elif dtype.kind in "iuf":
+                numeric.append(col)
+            else:
+                other.append(col)
+        row_hash = np.zeros(n, dtype=np.uint64)
+        step = max(1, BATCH_CELLS // max(n, 1))
+        for group, profile_batch in ((numeric, self._numeric_batch), (text, self._text_batch)):
+            for i in range(0, len(group), step):
+                cols = group[i:i + step]
+                hashes = profile_batch(chunk, cols)
+                keys = _position_keys([positions[col] for col in cols])
+                row_hash += (hashes * keys[:, None]).sum(axis=0)
+        for col in other:
+            row_hash += self._other_column(chunk, col) * _position_keys([positions[col]])[0]
+        if n and len(chunk.columns):
+            self._hashes.append(row_hash)
+
+        buffering = [a["sketch"] for a in self._cols.values() if a["sketch"].buffering]
+        if sum(s.n for s in buffering) > self.exact_values:
+            for sketch in buffering:
+                sketch.compress()
+
+    @staticmethod
+    def _missing(acc: dict, rows: int) -> None:
+        if rows:
+            acc["nulls"] += rows
+            acc["seen"].setdefault("float64", (np.dtype(np.float64), True))
+
+    def _tally(self, col, dtype, rows: int, nulls: int, convertible: int) -> dict:
+        """Add one chunk's null and convertible counts for col; return its accumulator."""
+        acc = self._cols[col]
+        non_null = rows - nulls
+        acc["nulls"] += nulls
+        acc["non_null"] += non_null
+        acc["convertible"] += convertible
+        key = str(dtype)
+        prev = acc["seen"].get(key)
+        acc["seen"][key] = (dtype, non_null == 0 and (prev is None or prev[1]))
+        return acc
+
+    # Each *_batch / _other_column method returns the row hashes of its
+    # columns (nulls hash to 0); update() weights them by column position
+    # and sums them into one 64-bit hash per row, so a column missing from
+    # some chunks does not change the other rows' hashes.
+
+    def _numeric_batch(self, chunk: pd.DataFrame, cols: list) -> np.ndarray:
+        """Nulls, moments and sketch values of numeric columns, as one float64 block."""
+        block = np.ascontiguousarray(chunk[cols].to_numpy(dtype=np.float64, na_value=np.nan).T)
+        missing = np.isnan(block)
+        nulls = missing.sum(axis=1)
+        counts = len(chunk) - nulls
+        # Summing with nulls as 0 (as pandas does) keeps the mean's last digit identical
+        sums = np.where(missing, 0.0, block).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            deviations = np.where(missing, 0.0, block - (sums / counts)[:, None])
+        m2s = (deviations * deviations).sum(axis=1)
+        dtypes = chunk.dtypes
+        for i, col in enumerate(cols):
+            count = int(counts[i])
+            acc = self._tally(col, dtypes[col], len(chunk), int(nulls[i]), count)
+            if count:
+                self._add_moments(acc, count, float(sums[i]), float(m2s[i]))
+                acc["sketch"].add(block[i][~missing[i]])
+        # int8 / float32 / float64 chunks of one column must hash alike; +0.0 folds -0.0
+        hashes = pd.util.hash_array((block + 0.0).ravel()).reshape(block.shape) | np.uint64(1)
+        hashes[missing] = 0
+        return hashes
+
+    def _text_batch(self, chunk: pd.DataFrame, cols: list) -> np.ndarray:
+        """
+        Nulls, numeric-convertible counts and hashes of text and categorical
+        columns from one factorization: every distinct value in the batch is
+        passed through pd.to_numeric and hashed once, then looked up by code.
+        """
+        dtypes = chunk.dtypes
+        plain = [col for col in cols if not _is_categorical(dtypes[col])]
+        codes, uniques = [], []
+        if plain:
+            values = chunk[plain].to_numpy(dtype=object).T.ravel()
+            plain_codes, plain_uniques = pd.factorize(values)
+            codes += list(plain_codes.reshape(len(plain), -1))
+            uniques.append(np.asarray(plain_uniques, dtype=object))
+        offset = len(uniques[0]) if plain else 0
+        order = plain + [col for col in cols if _is_categorical(dtypes[col])]
+        for col in order[len(plain):]:
+            cat = chunk[col].cat
+            cat_codes = cat.codes.to_numpy().astype(np.intp)
+            codes.append(np.where(cat_codes >= 0, cat_codes + offset, -1))
+            uniques.append(cat.categories.to_numpy(dtype=object))
+            offset += len(cat.categories)
+        uniques = np.concatenate(uniques)
+        # A trailing slot for code -1 (null): not convertible, hash 0
+        convertible = np.append(
+            pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").notna().to_numpy(),
+            False)
+        hashed = np.append(_hash_values(uniques) | np.uint64(1), np.uint64(0))
+        codes = np.vstack(codes)
+        nulls = (codes < 0).sum(axis=1)
+        counts = convertible[codes].sum(axis=1)
+        for i, col in enumerate(order):
+            self._tally(col, dtypes[col], len(chunk), int(nulls[i]), int(counts[i]))
+        hashes = hashed[codes]
+        # Rows of hashes follow cols, as update() expects
+        return hashes[[order.index(col) for col in cols]]
+
+    def _other_column(self, chunk: pd.DataFrame, col) -> np.ndarray:
+        """Booleans, dates and durations, one column at a time."""
+        series = chunk[col]
+        missing = series.isna().to_numpy()
+        nulls = int(missing.sum())
+        acc = self._tally(col, series.dtype, len(series), nulls, len(series) - nulls)
+        if series.dtype.kind == "m" and nulls < len(series):
+            # Durations are profiled as float nanoseconds
+            values = series.to_numpy(dtype="timedelta64[ns]").view(np.int64).astype(np.float64)
+            values = values[~missing]
+            mean = values.sum() / len(values)
+            self._add_moments(acc, len(values), float(values.sum()),
+                              float(((values - mean) ** 2).sum()))
+            acc["sketch"].add(values)
+        hashes = _hash_values(series.to_numpy(dtype=object)) | np.uint64(1)
+        hashes[missing] = 0
+        return hashes
+
+    @staticmethod
+    def _add_moments(acc: dict, n_b: int, sum_b: float, m2_b: float) -> None:
+        # The reported mean is sum / count like pandas; the running mean is
+        # only used to merge the sums of squared deviations (m2)
+        mean_b = sum_b / n_b
+        n_a = acc["count"]
+        total = n_a + n_b
+        delta = mean_b - acc["mean"]
+        acc["mean"] += delta * n_b / total
+        acc["m2"] += m2_b + delta * delta * n_a * n_b / total
+        acc["count"] = total
+        acc["sum"] += sum_b
+
+    def dtype(self, col):
+        return _resolve_dtype(self._cols[col]["seen"])
+
+    def _numeric_columns(self, kinds: str = "iuf") -> list:
+        """Columns whose resolved dtype kind is in kinds ("m" adds durations)."""
+        return [c for c in self.columns or []
+                if not _is_categorical(self.dtype(c)) and self.dtype(c).kind in kinds]
+
+    @property
+    def approximate(self) -> bool:
+        return any(not self._cols[c]["sketch"].exact for c in self._numeric_columns("iufm"))
+
+    # -- results ------------------------------------------------------------
+
+    def structure(self) -> dict:
+        """explore_structure() entry for this sheet."""
+        columns = self.columns or []
+        dtypes = {col: self.dtype(col) for col in columns}
+        preview = pd.concat(self._preview) if self._preview else pd.DataFrame(columns=columns)
+        for col, dtype in dtypes.items():
+            if not _is_categorical(dtype) and preview[col].dtype != dtype:
+                preview[col] = preview[col].astype(dtype)
+        result = {
+            "shape": {"rows": self.rows, "cols": len(columns)},
+            "columns": columns,
+            "dtypes": {col: str(dtype) for col, dtype in dtypes.items()},
+            "null_columns": {
+                col: {"count": acc["nulls"],
+                      "pct": round(acc["nulls"] / max(self.rows, 1) * 100, 1)}
+                for col, acc in ((c, self._cols[c]) for c in columns)
+                if acc["nulls"] > 0
+            },
+            "preview": preview.to_dict(orient="records"),
+        }
+        if self.approximate:
+            result["approximate"] = True
+        return result
+
+    def duplicate_rows(self) -> int:
+        if not self._hashes:
+            return 0
+        hashes = np.concatenate(self._hashes)
+        return int(len(hashes) - len(np.unique(hashes)))
+
+    def findings(self) -> list:
+        """audit_quality() entry for this sheet."""
+        columns = self.columns or []
+        sheet_findings = []
+
+        # Null values
+        for col in columns:
+            cnt = self._cols[col]["nulls"]
+            if cnt > 0:
+                pct = round(cnt / max(self.rows, 1) * 100, 1)
+                sheet_findings.append({
+                    "type": "null_values",
+                    "column": col,
+                    "count": cnt,
+                    "pct": pct,
+                    "note": f"Column '{col}' has {cnt} null values ({pct}%). "
+                            "If this column contains Excel formulas, null values may "
+                            "indicate that the formula cache has not been populated "
+                            "(file was never opened in Excel after the formulas were written)."
+                })
+
+        # Duplicate rows
+        dup_count = self.duplicate_rows()
+        if dup_count > 0:
+            sheet_findings.append({
+                "type": "duplicate_rows",
+                "count": dup_count,
+                "note": f"{dup_count} fully duplicate rows found."
+            })
+
+        # Mixed-type text columns (numeric data stored as text)
+        for col in columns:
+            dtype = self.dtype(col)
+            if not (_is_categorical(dtype) or dtype.kind == "O"):
+                continue
+            acc = self._cols[col]
+            convertible, non_null_total = acc["convertible"], acc["non_null"]
+            if 0 < convertible < non_null_total:
+                sheet_findings.append({
+                    "type": "mixed_type",
+                    "column": col,
+                    "convertible_to_numeric": convertible,
+                    "non_convertible": non_null_total - convertible,
+                    "note": f"Column '{col}' appears to contain mixed types: "
+                            f"{convertible} values can be parsed as numbers, "
+                            f"{non_null_total - convertible} cannot. "
+                            "Use pd.to_numeric(df[col], errors='coerce') to unify."
+                })
+
+        numeric = self._numeric_columns()
+
+        # Year column formatting (e.g., 2024.0 stored as float)
+        for col in numeric:
+            sketch = self._cols[col]["sketch"]
+            in_range = not sketch.n or (sketch.min >= 1900 and sketch.max <= 2200)
+            if _is_year_column(col) and in_range and self.dtype(col).kind == "f":
+                sheet_findings.append({
+                    "type": "year_as_float",
+                    "column": col,
+                    "note": f"Column '{col}' appears to be a year column stored as float "
+                            "(e.g., 2024.0). Convert with df[col].astype(int).astype(str) "
+                            "to get clean year strings like '2024'."
+                })
+
+        # Outliers via IQR on numeric columns
+        for col in numeric:
+            sketch = self._cols[col]["sketch"]
+            if sketch.n < 4:
+                continue
+            Q1, Q3 = sketch.quantiles([0.25, 0.75])
+            IQR = Q3 - Q1
+            if IQR == 0:
+                continue
+            outlier_count = sketch.count_outside(Q1 - 1.5 * IQR, Q3 + 1.5 * IQR)
+            if outlier_count > 0:
+                sheet_findings.append({
+                    "type": "outliers_iqr",
+                    "column": col,
+                    "count": outlier_count,
+                    "note": f"Column '{col}' has {outlier_count} potential outlier(s) "
+                            f"(outside 1.5×IQR bounds: [{Q1 - 1.5*IQR:.2f}, {Q3 + 1.5*IQR:.2f}])."
+                })
+
+        return sheet_findings
+
+    def stats(self) -> dict:
+        """compute_stats() entry for this sheet: describe() of numeric and duration columns."""
+        result = {}
+        for col in self._numeric_columns("iufm"):
+            acc = self._cols[col]
+            sketch, n = acc["sketch"], acc["count"]
+            q1, q2, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+            desc = {
+                "count": float(n),
+                "mean": acc["sum"] / n if n else math.nan,
+                "std": math.sqrt(acc["m2"] / (n - 1)) if n > 1 else math.nan,
+                "min": sketch.min if n else math.nan,
+                "25%": q1,
+                "50%": q2,
+                "75%": q3,
+                "max": sketch.max if n else math.nan,
+            }
+            if self.dtype(col).kind == "m":
+                result[col] = {k: n if k == "count" else
+                               pd.NaT if math.isnan(v) else pd.Timedelta(round(v))
+                               for k, v in desc.items()}
+            else:
+                # np.round, not round(): DataFrame.round() rounds the scaled binary value
+                result[col] = {k: float(np.round(v, 4)) for k, v in desc.items()}
+        return result
+
+
+def profile_frame(df: pd.DataFrame) -> SheetProfile:
+    """
+    Profile an in-memory DataFrame (one chunk). Its values are in memory
+    already, so the quartiles stay exact however large it is.
+    """
+    profile = SheetProfile(exact_values=max(EXACT_VALUES, df.size))
+    profile.update(df)
+    return profile
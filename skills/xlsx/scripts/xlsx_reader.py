@@ -8,10 +8,36 @@ Usage:
     python3 xlsx_reader.py <file> --sheet Sales     # analyze one sheet
     python3 xlsx_reader.py <file> --json            # machine-readable output
     python3 xlsx_reader.py <file> --quality         # data quality audit only
+    python3 xlsx_reader.py big.csv --chunksize 500000   # rows per read chunk
+    python3 xlsx_reader.py <file> --nrows 1000      # first 1,000 data rows only
 
 Supports: .xlsx, .xlsm, .csv, .tsv
 Does NOT modify the source file in any way.
 
+CSV/TSV loading:
+    The encoding is chosen once from a sample of the file (the first 1 MB
+    plus a few windows spread through the rest), trying utf-8-sig, gbk,
+    utf-8, latin-1 in that order, so the file is normally parsed once.
+    It is then read in chunks (default 100,000 rows) and each chunk is
+    shrunk before the next is read: integer columns are downcast to the
+    smallest integer type, float columns to float32 when no value changes,
+    and low-cardinality text columns become categoricals.
+
+Workbook loading:
+    .xlsx / .xlsm sheets are streamed by xlsx_stream_reader.py rather than
+    pd.read_excel: shared strings are resolved once, each worksheet's rows
+    are iterparsed into column buffers and turned into chunks of the same
+    size, shrunk the same way. With --sheet only that worksheet is parsed;
+    with --nrows parsing stops after N rows. Values and column names follow
+    pd.read_excel.
+
+Report engine:
+    The CLI builds the structure report, quality audit and statistics from
+    one pass over the data (xlsx_profile.SheetProfile). Chunks are
+    profiled as they are read and never concatenated. Quartiles are exact
+    up to 4M numeric values per sheet, then t-digest estimates (the report
+    says so).
+
 Exit codes:
     0 — success
     1 — file not found / unsupported format / encoding failure
@@ -19,18 +45,167 @@ Exit codes:
 
 import sys
 import json
+import codecs
 import argparse
+import os
 from pathlib import Path
 
+CSV_ENCODINGS = ["utf-8-sig", "gbk", "utf-8", "latin-1"]
+SNIFF_BYTES = 1 << 20          # head of the file used to choose the encoding
+SNIFF_WINDOWS = 4              # extra 64 KB windows sampled through the rest
+CHUNK_ROWS = 100_000           # default rows per CSV read chunk
+CATEGORY_MAX_RATIO = 0.5       # text column -> category if unique/non-null is below this
+
 
 # ---------------------------------------------------------------------------
 # Format detection and loading
 # ---------------------------------------------------------------------------
 
-def detect_and_load(file_path: str, sheet_name_filter: str | None = None) -> dict:
+def _decodes(data: bytes, encoding: str, resync: bool = False) -> bool:
+    """
+    True if data decodes (a trailing partial character is allowed). With
+    resync, the sample may start mid-character, so up to 3 leading bytes
+    may be skipped.
+    """
+    for skip in range(4 if resync else 1):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(data[skip:], final=False)
+            return True
+        except UnicodeDecodeError:
+            continue
+    return False
+
+
+def sniff_encoding(file_path: str) -> str:
+    """
+    Return the first of CSV_ENCODINGS that decodes a sample of the file:
+    the first SNIFF_BYTES plus SNIFF_WINDOWS windows spread over the rest
+    (so a GBK file with an ASCII-only header block is still detected).
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as fh:
+        head = fh.read(SNIFF_BYTES)
+        windows = []
+        if size > SNIFF_BYTES:
+            step = (size - SNIFF_BYTES) // SNIFF_WINDOWS
+            for i in range(1, SNIFF_WINDOWS + 1):
+                fh.seek(min(SNIFF_BYTES + i * step, size) - min(step, 1 << 16))
+                windows.append(fh.read(1 << 16))
+    for enc in CSV_ENCODINGS:
+        if _decodes(head, enc) and all(_decodes(w, enc, resync=True) for w in windows):
+            return enc
+    return CSV_ENCODINGS[-1]
+
+
+def csv_encodings(file_path: str) -> list:
+    """
+    CSV_ENCODINGS with the sniffed one first. The sniffed encoding is
+    normally right; the rest are only retried if a full read still hits an
+    undecodable byte past the sample.
+    """
+    sniffed = sniff_encoding(file_path)
+    return [sniffed] + [e for e in CSV_ENCODINGS if e != sniffed]
+
+
+def shrink_dtypes(df):
+    """
+    Shrink a DataFrame in place of its dtypes and return it: integers to the
+    smallest integer type, floats to float32 when that is lossless, and text
+    columns with few distinct values to categoricals.
+    """
+    import numpy as np
+    import pandas as pd
+
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind
+        if kind in "iu":
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif kind == "f":
+            as32 = series.astype(np.float32)
+            same = (as32.astype(np.float64) == series) | series.isna()
+            if bool(same.all()):
+                df[col] = as32
+        elif kind == "O":
+            non_null = int(series.notna().sum())
+            if non_null and series.nunique(dropna=True) < CATEGORY_MAX_RATIO * non_null:
+                df[col] = series.astype("category")
+    return df
+
+
+def iter_csv_chunks(file_path: str, sep: str, encoding: str, chunksize: int = CHUNK_ROWS,
+                    nrows: int | None = None):
+    """Yield the CSV as DataFrame chunks of chunksize rows, each passed through shrink_dtypes()."""
+    import pandas as pd
+
+    with pd.read_csv(file_path, sep=sep, encoding=encoding, chunksize=chunksize,
+                     nrows=nrows) as reader:
+        for chunk in reader:
+            yield shrink_dtypes(chunk)
+
+
+def iter_xlsx_sheets(file_path: str, sheet_name_filter: str | None = None,
+                     chunksize: int = CHUNK_ROWS, nrows: int | None = None):
+    """
+    Yield (sheet_name, chunk iterator) for each sheet to read, using the
+    streaming reader in xlsx_stream_reader.py: with a sheet filter only that
+    worksheet part is parsed. Chunks are passed through shrink_dtypes() and
+    must be consumed before moving on to the next sheet.
+
+    Raises ValueError for a missing sheet or a file that is not a workbook.
+    """
+    import zipfile
+    from xlsx_stream_reader import XlsxStreamReader
+
+    try:
+        book = XlsxStreamReader(file_path)
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ValueError(f"Cannot read {file_path} as a workbook: {e}")
+    with book:
+        names = [sheet_name_filter] if sheet_name_filter else book.sheet_names
+        for name in names:
+            if name not in book.sheets:
+                raise ValueError(f"Worksheet named '{name}' not found")
+            yield name, (shrink_dtypes(chunk)
+                         for chunk in book.iter_chunks(name, chunksize, nrows))
+
+
+def concat_chunks(chunks: list):
+    """
+    Concatenate shrunk chunks. A text column that became categorical in some
+    chunks stays categorical (a short tail chunk can miss the ratio test), with
+    the categories unioned; other dtypes upcast as pandas does.
+    """
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        return chunks[0]
+    for col in chunks[0].columns:
+        is_cat = [isinstance(ch[col].dtype, pd.CategoricalDtype) for ch in chunks]
+        if not any(is_cat):
+            continue
+        # Text (or all-empty) chunks can join; numeric chunks mean a mixed column
+        if not all(c or ch[col].dtype.kind == "O" or ch[col].isna().all()
+                   for c, ch in zip(is_cat, chunks)):
+            continue
+        for ch, c in zip(chunks, is_cat):
+            if not c:
+                ch[col] = ch[col].astype(object).astype("category")
+        categories = union_categoricals([ch[col] for ch in chunks]).categories
+        for ch in chunks:
+            ch[col] = ch[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def detect_and_load(file_path: str, sheet_name_filter: str | None = None,
+                    chunksize: int = CHUNK_ROWS, nrows: int | None = None) -> dict:
     """
     Load file into {sheet_name: DataFrame} dict.
     CSV/TSV files are mapped to a single-key dict using the file stem as key.
+    nrows limits each sheet to its first N data rows.
 
     Raises ValueError for unsupported formats or encoding failures.
     """
@@ -48,22 +223,17 @@ def detect_and_load(file_path: str, sheet_name_filter: str | None = None) -> dic
     suffix = path.suffix.lower()
 
     if suffix in (".xlsx", ".xlsm"):
-        target = sheet_name_filter if sheet_name_filter else None
-        result = pd.read_excel(file_path, sheet_name=target)
-        # pd.read_excel with sheet_name=None returns dict; with a name, returns DataFrame
-        if isinstance(result, dict):
-            return result
-        else:
-            return {sheet_name_filter: result}
+        return {name: concat_chunks(list(chunks))
+                for name, chunks in iter_xlsx_sheets(file_path, sheet_name_filter,
+                                                     chunksize, nrows)}
 
     elif suffix in (".csv", ".tsv"):
         sep = "\t" if suffix == ".tsv" else ","
-        encodings = ["utf-8-sig", "gbk", "utf-8", "latin-1"]
+        encodings = csv_encodings(file_path)
         last_error = None
         for enc in encodings:
             try:
-                import pandas as pd
-                df = pd.read_csv(file_path, sep=sep, encoding=enc)
+                df = concat_chunks(list(iter_csv_chunks(file_path, sep, enc, chunksize, nrows)))
                 df._reader_encoding = enc  # attach metadata (non-standard, for reporting)
                 return {path.stem: df}
             except (UnicodeDecodeError, Exception) as e:
@@ -87,6 +257,55 @@ def detect_and_load(file_path: str, sheet_name_filter: str | None = None) -> dic
         )
 
 
+def profile_file(file_path: str, sheet_name_filter: str | None = None,
+                 chunksize: int = CHUNK_ROWS, nrows: int | None = None) -> dict:
+    """
+    Profile each sheet in a single pass: {sheet_name: SheetProfile} (see
+    xlsx_profile.py). CSV/TSV and workbook chunks are profiled as they are
+    read and never concatenated, so the report works on files larger than
+    memory.
+
+    Raises the same errors as detect_and_load().
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+    if suffix not in (".csv", ".tsv", ".xlsx", ".xlsm") or not path.exists():
+        # Let detect_and_load() report the missing file / unsupported format
+        detect_and_load(file_path, sheet_name_filter, chunksize, nrows)
+
+    try:
+        from xlsx_profile import SheetProfile
+    except ImportError:
+        raise RuntimeError(
+            "pandas is not installed. Run: pip install pandas openpyxl"
+        )
+
+    if suffix in (".xlsx", ".xlsm"):
+        profiles = {}
+        for name, chunks in iter_xlsx_sheets(file_path, sheet_name_filter, chunksize, nrows):
+            profile = profiles[name] = SheetProfile()
+            for chunk in chunks:
+                profile.update(chunk)
+        return profiles
+
+    sep = "\t" if suffix == ".tsv" else ","
+    encodings = csv_encodings(file_path)
+    last_error = None
+    for enc in encodings:
+        profile = SheetProfile()
+        try:
+            for chunk in iter_csv_chunks(file_path, sep, enc, chunksize, nrows):
+                profile.update(chunk)
+            return {path.stem: profile}
+        except (UnicodeDecodeError, Exception) as e:
+            last_error = e
+            continue
+    raise ValueError(
+        f"Cannot decode {file_path}. Tried encodings: {encodings}. "
+        f"Last error: {last_error}"
+    )
+
+
 # ---------------------------------------------------------------------------
 # Structure discovery
 # ---------------------------------------------------------------------------
@@ -96,22 +315,8 @@ def explore_structure(sheets: dict) -> dict:
     Return a structured dict describing each sheet.
     Keys: sheet_name -> {shape, columns, dtypes, null_counts, preview}
     """
-    result = {}
-    for sheet_name, df in sheets.items():
-        null_counts = df.isnull().sum()
-        null_info = {
-            col: {"count": int(cnt), "pct": round(cnt / max(len(df), 1) * 100, 1)}
-            for col, cnt in null_counts.items()
-            if cnt > 0
-        }
-        result[sheet_name] = {
-            "shape": {"rows": df.shape[0], "cols": df.shape[1]},
-            "columns": list(df.columns),
-            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
-            "null_columns": null_info,
-            "preview": df.head(5).to_dict(orient="records"),
-        }
-    return result
+    from xlsx_profile import profile_frame
+    return {name: profile_frame(df).structure() for name, df in sheets.items()}
 
 
 # ---------------------------------------------------------------------------
@@ -121,94 +326,11 @@ def explore_structure(sheets: dict) -> dict:
 def audit_quality(sheets: dict) -> dict:
     """
     Return data quality findings per sheet.
-    Checks: nulls, duplicates, mixed-type columns, potential year formatting issues.
+    Checks: nulls, duplicates, mixed-type columns, potential year formatting
+    issues, IQR outliers (see SheetProfile.findings).
     """
-    import pandas as pd
-
-    findings = {}
-    for sheet_name, df in sheets.items():
-        sheet_findings = []
-
-        # Null values
-        null_counts = df.isnull().sum()
-        for col, cnt in null_counts.items():
-            if cnt > 0:
-                pct = round(cnt / max(len(df), 1) * 100, 1)
-                sheet_findings.append({
-                    "type": "null_values",
-                    "column": col,
-                    "count": int(cnt),
-                    "pct": pct,
-                    "note": f"Column '{col}' has {cnt} null values ({pct}%). "
-                            "If this column contains Excel formulas, null values may "
-                            "indicate that the formula cache has not been populated "
-                            "(file was never opened in Excel after the formulas were written)."
-                })
-
-        # Duplicate rows
-        dup_count = int(df.duplicated().sum())
-        if dup_count > 0:
-            sheet_findings.append({
-                "type": "duplicate_rows",
-                "count": dup_count,
-                "note": f"{dup_count} fully duplicate rows found."
-            })
-
-        # Mixed-type object columns (numeric data stored as text)
-        for col in df.select_dtypes(include="object").columns:
-            numeric_converted = pd.to_numeric(df[col], errors="coerce")
-            convertible = int(numeric_converted.notna().sum())
-            non_null_total = int(df[col].notna().sum())
-            if 0 < convertible < non_null_total:
-                sheet_findings.append({
-                    "type": "mixed_type",
-                    "column": col,
-                    "convertible_to_numeric": convertible,
-                    "non_convertible": non_null_total - convertible,
-                    "note": f"Column '{col}' appears to contain mixed types: "
-                            f"{convertible} values can be parsed as numbers, "
-                            f"{non_null_total - convertible} cannot. "
-                            "Use pd.to_numeric(df[col], errors='coerce') to unify."
-                })
-
-        # Year column formatting (e.g., 2024.0 stored as float)
-        for col in df.select_dtypes(include="number").columns:
-            col_lower = str(col).lower()
-            # "年" is the Chinese character for "year" — detect year columns in CJK spreadsheets
-            if "year" in col_lower or "yr" in col_lower or "年" in col_lower:
-                if df[col].dropna().between(1900, 2200).all():
-                    if df[col].dtype == float:
-                        sheet_findings.append({
-                            "type": "year_as_float",
-                            "column": col,
-                            "note": f"Column '{col}' appears to be a year column stored as float "
-                                    "(e.g., 2024.0). Convert with df[col].astype(int).astype(str) "
-                                    "to get clean year strings like '2024'."
-                        })
-
-        # Outliers via IQR on numeric columns
-        for col in df.select_dtypes(include="number").columns:
-            series = df[col].dropna()
-            if len(series) < 4:
-                continue
-            Q1, Q3 = series.quantile(0.25), series.quantile(0.75)
-            IQR = Q3 - Q1
-            if IQR == 0:
-                continue
-            outlier_mask = (df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)
-            outlier_count = int(outlier_mask.sum())
-            if outlier_count > 0:
-                sheet_findings.append({
-                    "type": "outliers_iqr",
-                    "column": col,
-                    "count": outlier_count,
-                    "note": f"Column '{col}' has {outlier_count} potential outlier(s) "
-                            f"(outside 1.5×IQR bounds: [{Q1 - 1.5*IQR:.2f}, {Q3 + 1.5*IQR:.2f}])."
-                })
-
-        findings[sheet_name] = sheet_findings
-
-    return findings
+    from xlsx_profile import profile_frame
+    return {name: profile_frame(df).findings() for name, df in sheets.items()}
 
 
 # ---------------------------------------------------------------------------
@@ -217,15 +339,8 @@ def audit_quality(sheets: dict) -> dict:
 
 def compute_stats(sheets: dict) -> dict:
     """Compute descriptive statistics for numeric columns per sheet."""
-    stats = {}
-    for sheet_name, df in sheets.items():
-        numeric_df = df.select_dtypes(include="number")
-        if numeric_df.empty:
-            stats[sheet_name] = {}
-            continue
-        desc = numeric_df.describe().round(4)
-        stats[sheet_name] = desc.to_dict()
-    return stats
+    from xlsx_profile import profile_frame
+    return {name: profile_frame(df).stats() for name, df in sheets.items()}
 
 
 # ---------------------------------------------------------------------------
@@ -256,6 +371,8 @@ def render_report(
         p(f"Sheet: {sheet_name}")
         p(f"{'─' * 50}")
         p(f"  Size: {info['shape']['rows']:,} rows × {info['shape']['cols']} cols")
+        if info.get("approximate"):
+            p("  (quartiles and IQR outlier counts are t-digest estimates)")
         p(f"  Columns: {info['columns']}")
 
         # Data types
@@ -332,17 +449,26 @@ def main() -> None:
         "--quality", action="store_true",
         help="Run data quality audit only (skip stats)"
     )
+    parser.add_argument(
+        "--chunksize", type=int, default=CHUNK_ROWS,
+        help=f"Rows per read chunk (default: {CHUNK_ROWS:,})"
+    )
+    parser.add_argument(
+        "--nrows", type=int, default=None,
+        help="Analyze only the first N data rows of each sheet (quick preview)"
+    )
     args = parser.parse_args()
 
     try:
-        sheets = detect_and_load(args.file, sheet_name_filter=args.sheet)
+        profiles = profile_file(args.file, sheet_name_filter=args.sheet,
+                                chunksize=max(1, args.chunksize), nrows=args.nrows)
     except (FileNotFoundError, ValueError, RuntimeError) as e:
         print(f"ERROR: {e}", file=sys.stderr)
         sys.exit(1)
 
-    structure = explore_structure(sheets)
-    quality = audit_quality(sheets)
-    stats = {} if args.quality else compute_stats(sheets)
+    structure = {name: p.structure() for name, p in profiles.items()}
+    quality = {name: p.findings() for name, p in profiles.items()}
+    stats = {} if args.quality else {name: p.stats() for name, p in profiles.items()}
 
     if args.json:
         output = {
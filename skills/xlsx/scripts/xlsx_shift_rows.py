@@ -23,12 +23,54 @@ What it updates in every XML file under <work_dir>:
   - Chart series <numRef><f> and <strRef><f> range references in xl/charts/*.xml
   - PivotCache source <worksheetSource ref="..."> in xl/pivotCaches/*.xml
 
+Streaming mode (large sheets):
+    python3 xlsx_shift_rows.py <work_dir> insert 5 2 --stream
+
+    Worksheets are rewritten in one SAX pass into a temp file next to the
+    original, which is then atomically replaced — no tree is built and no
+    pretty-printing is done, so memory stays flat for 100 MB sheets. The
+    result is the same XML as the default mode, kept in the original
+    (compact or pretty) layout.
+
+Parallel mode (many charts / pivot caches / sheets):
+    python3 xlsx_shift_rows.py <work_dir> insert 5 2 --jobs 8
+
+    Every part is an independent file, so parts are shifted in a pool of
+    worker processes (largest first) and the change counts are aggregated;
+    the report is printed in the usual order. Combines with --stream.
+
+Compact mode (no pretty-printing):
+    python3 xlsx_shift_rows.py <work_dir> insert 5 2 --compact
+
+    Parsed parts (worksheets, tables, pivot caches) are written straight
+    from ElementTree instead of being re-indented through minidom, which
+    on a large sheet costs more time and memory than the shift itself.
+    Use with xlsx_unpack.py --compact; view parts afterwards with
+    xlsx_unpack.py inspect.
+
+Sheet-scoped mode (rows move on one sheet only):
+    python3 xlsx_shift_rows.py <work_dir> insert 5 2 --sheet "Data"
+    python3 xlsx_shift_rows.py <work_dir> insert 5 2 --sheet "Data" --ref-cache
+
+    Only the named sheet's rows, cells, ranges and unqualified references
+    move. Elsewhere, only references that point into that sheet
+    ('Data'!B7, Data!$B$7:$B$20) are rewritten: a workbook-wide reference
+    index (sheet -> cells whose formulas mention it, plus <definedNames> in
+    workbook.xml) selects the dependent formulas, so other sheets are not
+    re-scanned formula by formula. Charts, tables and pivot caches are
+    limited to ranges on that sheet as well. With --ref-cache the index is
+    kept in <work_dir>.ref-index.json and only parts whose file changed are
+    re-scanned on the next run.
+
+Works on lazily unpacked directories (xlsx_unpack.py --lazy): the parts a
+shift needs are extracted first.
+
 IMPORTANT: Run this script on the UNPACKED directory before repacking.
 After running, repack with xlsx_pack.py and re-validate with formula_check.py.
 
 Limitations:
-  - Named ranges in workbook.xml <definedNames> are NOT updated automatically.
-    Review them manually after running this script.
+  - Without --sheet, named ranges in workbook.xml <definedNames> are NOT
+    updated automatically. Review them manually after running this script.
   - Structured table references (Table[@Column]) are NOT updated.
   - External workbook links in xl/externalLinks/ are NOT updated.
 """
@@ -36,45 +78,33 @@ Limitations:
 import sys
 import os
 import re
+import json
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import xml.etree.ElementTree as ET
 import xml.dom.minidom
+import xml.sax
+from xml.sax.handler import feature_namespaces
+from xml.sax.saxutils import XMLGenerator, escape, unescape
 
-
-def col_letter(n: int) -> str:
-    """Convert 1-based column number to Excel column letter(s)."""
-    r = ""
-    while n > 0:
-        n, rem = divmod(n - 1, 26)
-        r = chr(65 + rem) + r
-    return r
-
-
-def col_number(s: str) -> int:
-    """Convert Excel column letter(s) to 1-based column number."""
-    n = 0
-    for c in s.upper():
-        n = n * 26 + (ord(c) - 64)
-    return n
+from formula_tokens import col_letter, col_number, split_ref, tokenize
+from xlsx_unpack import materialize
 
 
 # ---------------------------------------------------------------------------
 # Core shifting logic for formula strings
 # ---------------------------------------------------------------------------
 
-def _shift_refs(text: str, at: int, delta: int) -> str:
-    """Shift cell references in a non-quoted formula fragment."""
-    def replacer(m: re.Match) -> str:
-        dollar_col = m.group(1)   # "$" or ""
-        col_part = m.group(2)     # e.g. "B" or "AB"
-        dollar_row = m.group(3)   # "$" or ""
-        row_str = m.group(4)      # e.g. "7"
-        row = int(row_str)
-        if row >= at:
-            row = max(1, row + delta)
-        return f"{dollar_col}{col_part}{dollar_row}{row}"
-
-    pattern = r'(\$?)([A-Z]+)(\$?)(\d+)'
-    return re.sub(pattern, replacer, text)
+def _shift_ref(text: str, at: int, delta: int) -> str:
+    """Shift the row of a single cell reference token like "$B$7"."""
+    parts = split_ref(text)
+    if parts is None:
+        return text
+    dollar_col, col_part, dollar_row, row = parts
+    if row < at:
+        return text
+    return f"{dollar_col}{col_part}{dollar_row}{max(1, row + delta)}"
 
 
 def shift_formula(formula: str, at: int, delta: int) -> str:
@@ -88,23 +118,70 @@ def shift_formula(formula: str, at: int, delta: int) -> str:
       B$7      (relative col, absolute — shifts)
       BUT NOT:  B:B  (whole-column reference — left as-is)
 
-    Skips content inside single-quoted sheet name prefixes to avoid
-    corrupting names like 'Budget FY2025' (where FY2025 is NOT a cell ref).
+    Works on the shared formula token stream (formula_tokens.py), so quoted
+    sheet names like 'Budget FY2025', string literals, and function names
+    like LOG10 are never mistaken for cell references.
 
     Does NOT handle:
       - Named ranges
       - Structured references (Table[@Col])
       - R1C1 notation
     """
-    # Split on quoted sheet names: 'Sheet Name' portions are odd-indexed
-    segments = re.split(r"('[^']*(?:''[^']*)*')", formula)
-    result = []
-    for i, seg in enumerate(segments):
-        if i % 2 == 1:
-            result.append(seg)
-        else:
-            result.append(_shift_refs(seg, at, delta))
-    return "".join(result)
+    tokens = tokenize(formula)
+    if not any(tok.kind == "ref" for tok in tokens):
+        return formula
+    return "".join(
+        _shift_ref(tok.text, at, delta) if tok.kind == "ref" else tok.text
+        for tok in tokens
+    )
+
+
+def _sheet_key(name: str) -> str:
+    """Sheet names compare case-insensitively in Excel."""
+    return name.casefold()
+
+
+def shift_formula_on_sheet(formula: str, at: int, delta: int,
+                           sheet: str, home: str | None) -> str:
+    """
+    Shift only the references that point into `sheet`.
+
+    A reference points into `sheet` when it is qualified with that sheet
+    name (Data!B7, 'Data'!$B$7:$B$9 — the qualifier covers both ends of a
+    range), or when it is unqualified and the formula lives on `sheet`
+    itself (home). Use home=None for formulas that have no home sheet
+    (defined names, chart series).
+    """
+    tokens = tokenize(formula)
+    if not any(tok.kind == "ref" for tok in tokens):
+        return formula
+    target = _sheet_key(sheet)
+    home_is_target = home is not None and _sheet_key(home) == target
+
+    out = []
+    qualifier = None    # sheet key applying to the current ref (or range)
+    for i, tok in enumerate(tokens):
+        if tok.kind == "sheet":
+            qualifier = _sheet_key(tok.value)
+            out.append(tok.text)
+            continue
+        if tok.kind == "ref":
+            on_target = (qualifier == target) if qualifier is not None else home_is_target
+            out.append(_shift_ref(tok.text, at, delta) if on_target else tok.text)
+            # The qualifier carries over ":" to the far end of a range
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+            if not (nxt is not None and nxt.text == ":"):
+                qualifier = None
+            continue
+        if tok.text != ":":
+            qualifier = None
+        out.append(tok.text)
+    return "".join(out)
+
+
+def formula_sheets(formula: str) -> set[str]:
+    """Case-folded names of the sheets a formula qualifies references with."""
+    return {_sheet_key(tok.value) for tok in tokenize(formula) if tok.kind == "sheet"}
 
 
 def shift_sqref(sqref: str, at: int, delta: int) -> str:
@@ -125,12 +202,15 @@ def shift_sqref(sqref: str, at: int, delta: int) -> str:
     return " ".join(result)
 
 
-def shift_chart_range(text: str, at: int, delta: int) -> str:
+def shift_chart_range(text: str, at: int, delta: int, sheet: str | None = None) -> str:
     """
     Shift row references inside a chart range formula like:
       Sheet1!$B$5:$B$20
       'Q1 Data'!$A$3:$A$15
+    With `sheet`, only ranges on that sheet are shifted.
     """
+    if sheet is not None:
+        return shift_formula_on_sheet(text, at, delta, sheet, None)
     # Split on the "!" to preserve sheet name
     if '!' not in text:
         return text
@@ -146,19 +226,50 @@ def shift_chart_range(text: str, at: int, delta: int) -> str:
 
 NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
 NS_DRAWING = "http://schemas.openxmlformats.org/drawingml/2006/chartDrawing"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
 
 # Namespace map used by ElementTree for tag lookup
 NSMAP = {"ss": NS_MAIN}
 
+ET.register_namespace('', NS_MAIN)
+ET.register_namespace('r', NS_REL)
+ET.register_namespace('mc', 'http://schemas.openxmlformats.org/markup-compatibility/2006')
+ET.register_namespace('x14ac', 'http://schemas.microsoft.com/office/spreadsheetml/2009/9/ac')
+ET.register_namespace('xr', 'http://schemas.microsoft.com/office/spreadsheetml/2014/revision')
+
+# Content of <f>Sheet1!$A$1:$A$10</f> / <c:f>...</c:f> elements in chart XML
+_CHART_F_RE = re.compile(r'(<(?:[^:>]+:)?f>)([^<]+)(</(?:[^:>]+:)?f>)')
+
 
 def _tag(local: str) -> str:
     return f"{{{NS_MAIN}}}{local}"
 
 
-def process_worksheet(path: str, at: int, delta: int) -> int:
-    """Update row/cell references in a worksheet XML. Returns change count."""
-    tree = ET.parse(path)
-    root = tree.getroot()
+def _formula_shifter(at: int, delta: int, sheet: str | None, home: str | None):
+    if sheet is None:
+        return lambda text: shift_formula(text, at, delta)
+    return lambda text: shift_formula_on_sheet(text, at, delta, sheet, home)
+
+
+def _is_structural(sheet: str | None, home: str | None) -> bool:
+    """True if rows move in this part (legacy mode, or it is the shifted sheet)."""
+    return sheet is None or (home is not None and _sheet_key(home) == _sheet_key(sheet))
+
+
+def shift_worksheet(root: ET.Element, at: int, delta: int,
+                    sheet: str | None = None, home: str | None = None,
+                    cells: set[str] | None = None) -> int:
+    """
+    Update row/cell references in a parsed worksheet in place. Returns change count.
+
+    sheet=None shifts every reference (workbook-wide legacy behaviour).
+    Otherwise rows move only if this part is `sheet` (home is the part's
+    own sheet name); on any other sheet only the formulas of `cells` (all
+    cells if None) are rewritten, and only their references into `sheet`.
+    """
+    shift_f = _formula_shifter(at, delta, sheet, home)
+    if not _is_structural(sheet, home):
+        return _shift_dependent_formulas(root, shift_f, cells)
     changes = 0
 
     # 1. <dimension ref="A1:D20">
@@ -186,7 +297,7 @@ def process_worksheet(path: str, at: int, delta: int) -> int:
                 for cell_el in row_el:
                     cell_ref = cell_el.get("r", "")
                     if cell_ref:
-                        new_ref = shift_formula(cell_ref, at, delta)
+                        new_ref = _shift_ref(cell_ref, at, delta)
                         if new_ref != cell_ref:
                             cell_el.set("r", new_ref)
                             changes += 1
@@ -195,7 +306,7 @@ def process_worksheet(path: str, at: int, delta: int) -> int:
             for cell_el in row_el:
                 f_el = cell_el.find(_tag("f"))
                 if f_el is not None and f_el.text:
-                    new_f = shift_formula(f_el.text, at, delta)
+                    new_f = shift_f(f_el.text)
                     if new_f != f_el.text:
                         f_el.text = new_f
                         changes += 1
@@ -224,38 +335,44 @@ def process_worksheet(path: str, at: int, delta: int) -> int:
             dv.set("sqref", new)
             changes += 1
 
-    if changes > 0:
-        _write_tree(tree, path)
     return changes
 
 
-def process_chart(path: str, at: int, delta: int) -> int:
-    """Update data range references in a chart XML."""
-    # Charts use DrawingML namespace; we look for <f> elements with range strings
-    with open(path, "r", encoding="utf-8") as fh:
-        content = fh.read()
+def _shift_dependent_formulas(root: ET.Element, shift_f, cells: set[str] | None) -> int:
+    """Rewrite formulas (of `cells` only, if given) without moving anything."""
+    sheet_data = root.find(_tag("sheetData"))
+    if sheet_data is None:
+        return 0
+    changes = 0
+    for row_el in sheet_data:
+        for cell_el in row_el:
+            if cells is not None and cell_el.get("r") not in cells:
+                continue
+            f_el = cell_el.find(_tag("f"))
+            if f_el is not None and f_el.text:
+                new_f = shift_f(f_el.text)
+                if new_f != f_el.text:
+                    f_el.text = new_f
+                    changes += 1
+    return changes
+
 
+def shift_chart(content: str, at: int, delta: int, sheet: str | None = None) -> str:
+    """Return chart XML text with its data range references shifted."""
+    # Charts use DrawingML namespace; we look for <f> elements with range strings
     # Pattern matches content of <f>Sheet1!$A$1:$A$10</f> style elements
     def replace_f(m: re.Match) -> str:
         tag_open = m.group(1)
         inner = m.group(2)
         tag_close = m.group(3)
-        new_inner = shift_chart_range(inner, at, delta)
+        new_inner = shift_chart_range(inner, at, delta, sheet)
         return f"{tag_open}{new_inner}{tag_close}"
 
-    new_content = re.sub(r'(<(?:[^:>]+:)?f>)([^<]+)(</(?:[^:>]+:)?f>)',
-                          replace_f, content)
-    changes = content != new_content
-    if changes:
-        with open(path, "w", encoding="utf-8") as fh:
-            fh.write(new_content)
-    return 1 if changes else 0
+    return _CHART_F_RE.sub(replace_f, content)
 
 
-def process_table(path: str, at: int, delta: int) -> int:
-    """Update the ref attribute on the <table> root element."""
-    tree = ET.parse(path)
-    root = tree.getroot()
+def shift_table(root: ET.Element, at: int, delta: int) -> int:
+    """Update the ref attribute on a parsed <table> root element."""
     # The root element IS the table
     old = root.get("ref", "")
     if not old:
@@ -264,58 +381,596 @@ def process_table(path: str, at: int, delta: int) -> int:
     if new == old:
         return 0
     root.set("ref", new)
-    _write_tree(tree, path)
     return 1
 
 
-def process_pivot_cache(path: str, at: int, delta: int) -> int:
-    """Update worksheetSource ref in a pivot cache definition."""
-    tree = ET.parse(path)
-    root = tree.getroot()
+def shift_pivot_cache(root: ET.Element, at: int, delta: int, sheet: str | None = None) -> int:
+    """
+    Update worksheetSource ref in a parsed pivot cache definition
+    (with `sheet`, only sources on that sheet).
+    """
     changes = 0
     # Look for <worksheetSource ref="A1:D100" ...>
     for ws in root.iter():
         if ws.tag.endswith("}worksheetSource") or ws.tag == "worksheetSource":
+            if sheet is not None and _sheet_key(ws.get("sheet", "")) != _sheet_key(sheet):
+                continue
             old = ws.get("ref", "")
             if old:
                 new = shift_sqref(old, at, delta)
                 if new != old:
                     ws.set("ref", new)
                     changes += 1
+    return changes
+
+
+# <definedName ...>text</definedName>, edited as text so the rest of
+# workbook.xml (mc:Ignorable prefixes, extLst) is left untouched
+_DEFINED_NAME_RE = re.compile(
+    r'(<(?:[^:>\s]+:)?definedName\b[^>]*>)([^<]*)(</(?:[^:>\s]+:)?definedName>)')
+_XML_ENTITIES = {"&quot;": '"', "&apos;": "'"}
+
+
+def shift_defined_names(content: str, at: int, delta: int, sheet: str) -> tuple[str, int]:
+    """
+    Shift references into `sheet` inside workbook.xml <definedName> values.
+    Returns (new content, number of names changed).
+    """
+    changed = 0
+
+    def replace(m: re.Match) -> str:
+        nonlocal changed
+        value = unescape(m.group(2), _XML_ENTITIES)
+        new_value = shift_formula_on_sheet(value, at, delta, sheet, None)
+        if new_value == value:
+            return m.group(0)
+        changed += 1
+        return m.group(1) + escape(new_value) + m.group(3)
+
+    return _DEFINED_NAME_RE.sub(replace, content), changed
+
+
+def defined_name_sheets(content: str) -> dict[str, list[str]]:
+    """Case-folded sheet name -> defined names whose value references it."""
+    refs: dict[str, list[str]] = {}
+    for m in _DEFINED_NAME_RE.finditer(content):
+        name_m = re.search(r'\bname="([^"]*)"', m.group(1))
+        name = unescape(name_m.group(1), _XML_ENTITIES) if name_m else "?"
+        for key in formula_sheets(unescape(m.group(2), _XML_ENTITIES)):
+            refs.setdefault(key, []).append(name)
+    return refs
+
+
+class _WorksheetShifter(XMLGenerator):
+    """
+    SAX filter that writes a worksheet back out with the same edits as
+    shift_worksheet(), element by element as it is parsed.
+    """
+
+    # (namespace, local name) -> attribute holding a sqref/ref range
+    _RANGE_ATTRS = {
+        (NS_MAIN, "dimension"): "ref",
+        (NS_MAIN, "mergeCell"): "ref",
+        (NS_MAIN, "conditionalFormatting"): "sqref",
+        (NS_MAIN, "dataValidation"): "sqref",
+    }
+
+    def __init__(self, out, at: int, delta: int, sheet: str | None = None,
+                 home: str | None = None, cells: set[str] | None = None):
+        super().__init__(out, encoding="utf-8", short_empty_elements=True)
+        self.at = at
+        self.delta = delta
+        self.structural = _is_structural(sheet, home)
+        self.shift_f = _formula_shifter(at, delta, sheet, home)
+        self.cells = cells
+        self._cell_ref = None
+        self.changes = 0
+        self._in_sheet_data = False
+        self._row_shifted = False
+        self._formula: list[str] | None = None   # text buffer while inside <f>
+
+    def startDocument(self):
+        # Same declaration as the tree path (XMLGenerator drops standalone="yes")
+        self._write(XML_DECLARATION.decode("ascii"))
+
+    def _set(self, attrs, key, value: str) -> dict:
+        new = dict(attrs.items())
+        new[key] = value
+        self.changes += 1
+        return new
+
+    def startElementNS(self, name, qname, attrs):
+        if name[0] == NS_MAIN:
+            local = name[1]
+            if local == "sheetData":
+                self._in_sheet_data = True
+            elif not self.structural:
+                if local == "c":
+                    self._cell_ref = attrs.get((None, "r"))
+                elif (local == "f" and self._in_sheet_data
+                      and (self.cells is None or self._cell_ref in self.cells)):
+                    self._formula = []
+            elif local == "row" and self._in_sheet_data:
+                r_str = attrs.get((None, "r"))
+                self._row_shifted = r_str is not None and int(r_str) >= self.at
+                if self._row_shifted:
+                    attrs = self._set(attrs, (None, "r"), str(max(1, int(r_str) + self.delta)))
+            elif local == "c" and self._row_shifted:
+                cell_ref = attrs.get((None, "r"), "")
+                if cell_ref:
+                    new_ref = _shift_ref(cell_ref, self.at, self.delta)
+                    if new_ref != cell_ref:
+                        attrs = self._set(attrs, (None, "r"), new_ref)
+            elif local == "f" and self._in_sheet_data:
+                self._formula = []
+            elif name in self._RANGE_ATTRS:
+                key = (None, self._RANGE_ATTRS[name])
+                old = attrs.get(key, "")
+                new = shift_sqref(old, self.at, self.delta)
+                if new != old:
+                    attrs = self._set(attrs, key, new)
+        if isinstance(attrs, dict):
+            attrs = xml.sax.xmlreader.AttributesNSImpl(
+                attrs, {k: (f"{k[0]}:{k[1]}" if k[0] else k[1]) for k in attrs})
+        super().startElementNS(name, qname, attrs)
+
+    def characters(self, content):
+        if self._formula is not None:
+            self._formula.append(content)
+        else:
+            super().characters(content)
+
+    def endElementNS(self, name, qname):
+        if name[0] == NS_MAIN:
+            if name[1] == "f" and self._formula is not None:
+                text = "".join(self._formula)
+                self._formula = None
+                if text:
+                    new_f = self.shift_f(text)
+                    if new_f != text:
+                        text = new_f
+                        self.changes += 1
+                    super().characters(text)
+            elif name[1] == "row":
+                self._row_shifted = False
+            elif name[1] == "sheetData":
+                self._in_sheet_data = False
+        super().endElementNS(name, qname)
+
+
+def stream_shift_worksheet(path: str, at: int, delta: int, sheet: str | None = None,
+                           home: str | None = None, cells: set[str] | None = None) -> int:
+    """
+    Streaming counterpart of process_worksheet(): one SAX pass into a temp
+    file in the same directory, then os.replace() over the original (only if
+    something changed). Returns change count.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=".shift-", suffix=".xml",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            handler = _WorksheetShifter(out, at, delta, sheet, home, cells)
+            parser = xml.sax.make_parser()
+            parser.setFeature(feature_namespaces, True)
+            parser.setContentHandler(handler)
+            parser.parse(path)
+        if handler.changes:
+            shutil.copymode(path, tmp_path)   # mkstemp creates 0600
+            os.replace(tmp_path, path)
+            tmp_path = None
+        return handler.changes
+    finally:
+        if tmp_path is not None:
+            os.unlink(tmp_path)
+
+
+def process_worksheet(path: str, at: int, delta: int, stream: bool = False,
+                      sheet: str | None = None, home: str | None = None,
+                      cells: set[str] | None = None, pretty: bool = True) -> int:
+    """Update row/cell references in a worksheet XML. Returns change count."""
+    if stream:
+        return stream_shift_worksheet(path, at, delta, sheet, home, cells)
+    tree = ET.parse(path)
+    changes = shift_worksheet(tree.getroot(), at, delta, sheet, home, cells)
+    if changes > 0:
+        _write_tree(tree, path, pretty)
+    return changes
+
+
+def process_chart(path: str, at: int, delta: int, sheet: str | None = None) -> int:
+    """Update data range references in a chart XML."""
+    with open(path, "r", encoding="utf-8") as fh:
+        content = fh.read()
+
+    new_content = shift_chart(content, at, delta, sheet)
+    changes = content != new_content
+    if changes:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(new_content)
+    return 1 if changes else 0
+
+
+def process_table(path: str, at: int, delta: int, pretty: bool = True) -> int:
+    """Update the ref attribute on the <table> root element."""
+    tree = ET.parse(path)
+    changes = shift_table(tree.getroot(), at, delta)
+    if changes:
+        _write_tree(tree, path, pretty)
+    return changes
+
+
+def process_pivot_cache(path: str, at: int, delta: int, sheet: str | None = None,
+                        pretty: bool = True) -> int:
+    """Update worksheetSource ref in a pivot cache definition."""
+    tree = ET.parse(path)
+    changes = shift_pivot_cache(tree.getroot(), at, delta, sheet)
     if changes:
-        _write_tree(tree, path)
+        _write_tree(tree, path, pretty)
     return changes
 
 
-def _write_tree(tree: ET.ElementTree, path: str) -> None:
-    """Write ElementTree back to file with pretty-printing."""
+def process_workbook(path: str, at: int, delta: int, sheet: str) -> int:
+    """Update references into `sheet` in workbook.xml <definedNames>."""
+    with open(path, "r", encoding="utf-8") as fh:
+        content = fh.read()
+    new_content, changes = shift_defined_names(content, at, delta, sheet)
+    if changes:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(new_content)
+    return changes
+
+
+def shift_targets(work_dir: str) -> list[tuple[str, str]]:
+    """
+    List every part a row shift must touch as (kind, path relative to work_dir),
+    where kind is "worksheet", "chart", "table" or "pivotCache".
+    """
+    materialize(work_dir, ["xl/worksheets/*.xml", "xl/charts/*.xml",
+                           "xl/tables/*.xml", "xl/pivotCaches/*.xml"])
+    targets = []
+    for kind, sub, accept in (
+        ("worksheet", "worksheets", lambda f: True),
+        ("chart", "charts", lambda f: True),
+        ("table", "tables", lambda f: True),
+        ("pivotCache", "pivotCaches", lambda f: "Definition" in f),
+    ):
+        part_dir = os.path.join(work_dir, "xl", sub)
+        if not os.path.isdir(part_dir):
+            continue
+        for fname in sorted(os.listdir(part_dir)):
+            if fname.endswith(".xml") and accept(fname):
+                targets.append((kind, f"xl/{sub}/{fname}"))
+    return targets
+
+
+# Progress line printed for each updated part, by kind
+SHIFT_MESSAGES = {
+    "worksheet":  "  Updated {n:3d} references in {part}",
+    "chart":      "  Updated chart ranges in {part}",
+    "table":      "  Updated table ref in {part}",
+    "pivotCache": "  Updated pivot source range in {part}",
+    "workbook":   "  Updated {n:3d} defined names in {part}",
+}
+
+_PROCESSORS = {
+    "worksheet": process_worksheet,
+    "chart": process_chart,
+    "table": process_table,
+    "pivotCache": process_pivot_cache,
+    "workbook": process_workbook,
+}
+
+
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+def _write_tree(tree: ET.ElementTree, path: str, pretty: bool = True) -> None:
+    """
+    Write ElementTree back to file, re-indented through minidom (pretty=True)
+    or serialized directly, whitespace as parsed (pretty=False).
+    """
+    if not pretty:
+        with open(path, "wb") as fh:
+            fh.write(XML_DECLARATION)
+            tree.write(fh, encoding="utf-8", xml_declaration=False)
+        return
     tree.write(path, encoding="unicode", xml_declaration=False)
     # Re-pretty-print for readability
     with open(path, "r", encoding="utf-8") as fh:
         raw = fh.read()
     try:
         dom = xml.dom.minidom.parseString(raw.encode("utf-8"))
-        pretty = dom.toprettyxml(indent="  ", encoding="utf-8").decode("utf-8")
-        lines = [line for line in pretty.splitlines() if line.strip()]
+        pretty_xml = dom.toprettyxml(indent="  ", encoding="utf-8").decode("utf-8")
+        lines = [line for line in pretty_xml.splitlines() if line.strip()]
         with open(path, "w", encoding="utf-8") as fh:
             fh.write("\n".join(lines) + "\n")
     except Exception:
         pass  # If pretty-print fails, leave the file as-is
 
 
+def _rel_target(base_dir: str, target: str) -> str:
+    """Resolve a relationship Target against the part's directory ("xl/worksheets")."""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return os.path.normpath(os.path.join(base_dir, target)).replace(os.sep, "/")
+
+
+def workbook_sheet_parts(work_dir: str) -> dict[str, str]:
+    """Sheet name -> worksheet part path ("xl/worksheets/sheet1.xml"), in tab order."""
+    materialize(work_dir, ["xl/workbook.xml", "xl/_rels/workbook.xml.rels"])
+    rels_root = ET.parse(os.path.join(work_dir, "xl", "_rels", "workbook.xml.rels")).getroot()
+    rels = {rel.get("Id"): rel.get("Target", "") for rel in rels_root}
+    parts = {}
+    for sheet_el in ET.parse(os.path.join(work_dir, "xl", "workbook.xml")).getroot().iter(_tag("sheet")):
+        target = rels.get(sheet_el.get(f"{{{NS_REL}}}id"))
+        if target:
+            parts[sheet_el.get("name")] = _rel_target("xl", target)
+    return parts
+
+
+def sheet_table_parts(work_dir: str, sheet_part: str) -> list[str]:
+    """Table parts linked from a worksheet's relationships."""
+    base, fname = sheet_part.rsplit("/", 1)
+    materialize(work_dir, [f"{base}/_rels/{fname}.rels"])
+    rels_path = os.path.join(work_dir, *base.split("/"), "_rels", fname + ".rels")
+    if not os.path.isfile(rels_path):
+        return []
+    return sorted(
+        _rel_target(base, rel.get("Target", ""))
+        for rel in ET.parse(rels_path).getroot()
+        if rel.get("Type", "").endswith("/table")
+    )
+
+
+def sheet_refs(cells) -> dict[str, list[str]]:
+    """
+    Case-folded sheet name -> addresses of the cells whose formula names that
+    sheet, for an iterable of <c> elements.
+    """
+    refs: dict[str, list[str]] = {}
+    for cell_el in cells:
+        f_el = cell_el.find(_tag("f"))
+        if f_el is not None and f_el.text and "!" in f_el.text:
+            for key in formula_sheets(f_el.text):
+                refs.setdefault(key, []).append(cell_el.get("r"))
+    return refs
+
+
+def _iter_worksheet_cells(path: str):
+    """Stream the <c> elements of a worksheet file, clearing each row after use."""
+    c_tag, row_tag = _tag("c"), _tag("row")
+    for _, el in ET.iterparse(path, events=("end",)):
+        if el.tag == c_tag:
+            yield el
+        elif el.tag == row_tag:
+            el.clear()
+
+
+class RefIndex:
+    """
+    Workbook-wide cross-sheet reference index for an unpacked xlsx.
+
+    For every worksheet part it records which cells hold formulas naming
+    another sheet, and for workbook.xml which defined names do, so a shift
+    on one sheet can go straight to the formulas that depend on it. Each
+    entry carries the part's (size, mtime_ns); refresh() re-scans only
+    parts whose file changed. With cache_path the index is kept as JSON
+    between runs.
+    """
+
+    VERSION = 1
+    WORKBOOK = "xl/workbook.xml"
+
+    def __init__(self, work_dir: str, cache_path: str | None = None):
+        self.work_dir = work_dir
+        self.cache_path = cache_path
+        self.sheets = workbook_sheet_parts(work_dir)     # name -> part
+        self.parts: dict[str, dict] = {}                 # part -> {"stat", "refs"}
+        if cache_path:
+            self._load_cache()
+        self.refresh()
+
+    def _stat(self, part: str) -> list[int]:
+        st = os.stat(os.path.join(self.work_dir, *part.split("/")))
+        return [st.st_size, st.st_mtime_ns]
+
+    def _load_cache(self) -> None:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION:
+            self.parts = data.get("parts", {})
+
+    def save(self) -> None:
+        if not self.cache_path:
+            return
+        with open(self.cache_path, "w", encoding="utf-8") as fh:
+            json.dump({"version": self.VERSION, "parts": self.parts}, fh)
+
+    def _scan(self, part: str) -> dict[str, list[str]]:
+        path = os.path.join(self.work_dir, *part.split("/"))
+        if part == self.WORKBOOK:
+            with open(path, "r", encoding="utf-8") as fh:
+                return defined_name_sheets(fh.read())
+        return sheet_refs(_iter_worksheet_cells(path))
+
+    def refresh(self) -> int:
+        """Re-scan new or changed parts and drop vanished ones. Returns parts scanned."""
+        wanted = set(self.sheets.values()) | {self.WORKBOOK}
+        materialize(self.work_dir, sorted(wanted))
+        wanted = {p for p in wanted
+                  if os.path.isfile(os.path.join(self.work_dir, *p.split("/")))}
+        for part in set(self.parts) - wanted:
+            del self.parts[part]
+        scanned = 0
+        for part in sorted(wanted):
+            stat = self._stat(part)
+            entry = self.parts.get(part)
+            if entry is None or entry["stat"] != stat:
+                self.parts[part] = {"stat": stat, "refs": self._scan(part)}
+                scanned += 1
+        return scanned
+
+    def sheet_name(self, name: str) -> str | None:
+        """Workbook spelling of a sheet name (matched case-insensitively), or None."""
+        key = _sheet_key(name)
+        return next((n for n in self.sheets if _sheet_key(n) == key), None)
+
+    def dependents(self, sheet: str) -> dict[str, list[str]]:
+        """
+        Parts (other than the sheet's own) referencing `sheet` -> the cells
+        (worksheets) or defined names (workbook.xml) that do.
+        """
+        key = _sheet_key(sheet)
+        own = self.sheets.get(self.sheet_name(sheet))
+        return {part: entry["refs"][key]
+                for part, entry in sorted(self.parts.items())
+                if part != own and key in entry["refs"]}
+
+    def touch(self, part: str) -> None:
+        """Record a part rewritten without changing where its cross-sheet refs are."""
+        if part in self.parts:
+            self.parts[part]["stat"] = self._stat(part)
+
+    def forget(self, part: str) -> None:
+        """Drop a part whose cells moved; the next refresh() re-scans it."""
+        self.parts.pop(part, None)
+
+
+def ref_cache_path(work_dir: str) -> str:
+    """Default location of the --ref-cache index: beside the working directory."""
+    return os.path.abspath(work_dir).rstrip(os.sep) + ".ref-index.json"
+
+
+def scoped_shift_tasks(work_dir: str, sheet: str,
+                       index: RefIndex) -> list[tuple[str, str, dict]]:
+    """
+    (kind, part, scope kwargs) for a row shift limited to one sheet: the
+    sheet itself, the dependent worksheet cells and defined names from the
+    index, every chart and pivot cache (filtered by sheet inside), and the
+    tables linked from the sheet.
+    """
+    name = index.sheet_name(sheet)
+    if name is None:
+        raise ValueError(f"Sheet not found: {sheet}")
+    sheet = name
+    own = index.sheets[sheet]
+    home_of = {part: name for name, part in index.sheets.items()}
+
+    tasks = [("worksheet", own, {"sheet": sheet, "home": sheet})]
+    for part, deps in index.dependents(sheet).items():
+        if part == RefIndex.WORKBOOK:
+            tasks.append(("workbook", part, {"sheet": sheet}))
+        else:
+            tasks.append(("worksheet", part,
+                          {"sheet": sheet, "home": home_of[part], "cells": set(deps)}))
+    for kind, part in shift_targets(work_dir):
+        if kind in ("chart", "pivotCache"):
+            tasks.append((kind, part, {"sheet": sheet}))
+    tasks.extend(("table", part, {}) for part in sheet_table_parts(work_dir, own))
+    return tasks
+
+
+def _shift_part(work_dir: str, kind: str, part: str, at: int, delta: int,
+                stream: bool = False, scope: dict | None = None, pretty: bool = True) -> int:
+    """Shift one part file in place (also the worker-process entry point)."""
+    fpath = os.path.join(work_dir, part)
+    if kind == "worksheet":
+        return process_worksheet(fpath, at, delta, stream=stream, pretty=pretty, **(scope or {}))
+    if kind in ("table", "pivotCache"):
+        return _PROCESSORS[kind](fpath, at, delta, pretty=pretty, **(scope or {}))
+    return _PROCESSORS[kind](fpath, at, delta, **(scope or {}))
+
+
+def shift_parts(work_dir: str, at: int, delta: int, stream: bool = False,
+                jobs: int = 1, sheet: str | None = None,
+                index: RefIndex | None = None,
+                pretty: bool = True) -> list[tuple[str, str, int]]:
+    """
+    Shift every part under work_dir. Returns (kind, part, changes) for each
+    part in shift_targets() order (scoped_shift_tasks() order with `sheet`).
+
+    With `sheet`, rows move on that sheet only and the parts to touch come
+    from scoped_shift_tasks() (index is built if not given, and updated
+    afterwards). pretty=False writes parsed parts without re-indenting them.
+
+    With jobs > 1 the parts are processed in a pool of worker processes;
+    the largest files are submitted first so a big sheet does not end up
+    queued behind many small charts.
+    """
+    if sheet is None:
+        tasks = [(kind, part, None) for kind, part in shift_targets(work_dir)]
+    else:
+        if index is None:
+            index = RefIndex(work_dir)
+        tasks = scoped_shift_tasks(work_dir, sheet, index)
+
+    if jobs > 1 and len(tasks) > 1:
+        by_size = sorted(range(len(tasks)),
+                         key=lambda i: os.path.getsize(os.path.join(work_dir, tasks[i][1])),
+                         reverse=True)
+        counts = [0] * len(tasks)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            futures = {
+                i: pool.submit(_shift_part, work_dir, tasks[i][0], tasks[i][1],
+                               at, delta, stream, tasks[i][2], pretty)
+                for i in by_size
+            }
+            for i, future in futures.items():
+                counts[i] = future.result()
+    else:
+        counts = [_shift_part(work_dir, kind, part, at, delta, stream, scope, pretty)
+                  for kind, part, scope in tasks]
+
+    if index is not None:
+        own = index.sheets[index.sheet_name(sheet)]
+        index.forget(own)
+        for (kind, part, _), n in zip(tasks, counts):
+            if n and part != own:
+                index.touch(part)
+        index.save()
+    return [(kind, part, n) for (kind, part, _), n in zip(tasks, counts)]
+
+
 # ---------------------------------------------------------------------------
 # Main driver
 # ---------------------------------------------------------------------------
 
 def main() -> None:
-    if len(sys.argv) < 5:
+    stream = "--stream" in sys.argv
+    ref_cache = "--ref-cache" in sys.argv
+    compact = "--compact" in sys.argv
+    jobs = 1
+    sheet = None
+    argv = []
+    i = 0
+    while i < len(sys.argv):
+        arg = sys.argv[i]
+        if arg == "--sheet" and i + 1 < len(sys.argv):
+            sheet = sys.argv[i + 1]
+            i += 2
+            continue
+        if arg == "--jobs" and i + 1 < len(sys.argv):
+            try:
+                jobs = max(1, int(sys.argv[i + 1]))
+            except ValueError:
+                print(f"ERROR: --jobs expects an integer, got '{sys.argv[i + 1]}'")
+                sys.exit(1)
+            i += 2
+            continue
+        if arg not in ("--stream", "--ref-cache", "--compact"):
+            argv.append(arg)
+        i += 1
+    if len(argv) < 5:
         print(__doc__)
         sys.exit(1)
 
-    work_dir = sys.argv[1]
-    operation = sys.argv[2].lower()
-    at = int(sys.argv[3])
-    count = int(sys.argv[4])
+    work_dir = argv[1]
+    operation = argv[2].lower()
+    at = int(argv[3])
+    count = int(argv[4])
 
     if operation not in ("insert", "delete"):
         print(f"ERROR: operation must be 'insert' or 'delete', got '{operation}'")
@@ -332,59 +987,36 @@ def main() -> None:
 
     print(f"Operation : {operation} {count} row(s) at row {at} (delta={delta:+d})")
     print(f"Work dir  : {work_dir}")
+    if sheet is not None:
+        print(f"Sheet     : {sheet}")
     print()
 
-    total_changes = 0
+    index = None
+    if sheet is not None:
+        try:
+            index = RefIndex(work_dir, ref_cache_path(work_dir) if ref_cache else None)
+        except (OSError, ET.ParseError) as e:
+            print(f"ERROR: cannot index workbook: {e}")
+            sys.exit(1)
+        if index.sheet_name(sheet) is None:
+            print(f"ERROR: Sheet not found: {sheet}")
+            sys.exit(1)
 
-    # Process all worksheets
-    ws_dir = os.path.join(work_dir, "xl", "worksheets")
-    if os.path.isdir(ws_dir):
-        for fname in sorted(os.listdir(ws_dir)):
-            if fname.endswith(".xml"):
-                fpath = os.path.join(ws_dir, fname)
-                n = process_worksheet(fpath, at, delta)
-                if n:
-                    print(f"  Updated {n:3d} references in xl/worksheets/{fname}")
-                    total_changes += n
-
-    # Process all charts
-    charts_dir = os.path.join(work_dir, "xl", "charts")
-    if os.path.isdir(charts_dir):
-        for fname in sorted(os.listdir(charts_dir)):
-            if fname.endswith(".xml"):
-                fpath = os.path.join(charts_dir, fname)
-                n = process_chart(fpath, at, delta)
-                if n:
-                    print(f"  Updated chart ranges in xl/charts/{fname}")
-                    total_changes += n
-
-    # Process all tables
-    tables_dir = os.path.join(work_dir, "xl", "tables")
-    if os.path.isdir(tables_dir):
-        for fname in sorted(os.listdir(tables_dir)):
-            if fname.endswith(".xml"):
-                fpath = os.path.join(tables_dir, fname)
-                n = process_table(fpath, at, delta)
-                if n:
-                    print(f"  Updated table ref in xl/tables/{fname}")
-                    total_changes += n
-
-    # Process pivot cache definitions
-    cache_dir = os.path.join(work_dir, "xl", "pivotCaches")
-    if os.path.isdir(cache_dir):
-        for fname in sorted(os.listdir(cache_dir)):
-            if "Definition" in fname and fname.endswith(".xml"):
-                fpath = os.path.join(cache_dir, fname)
-                n = process_pivot_cache(fpath, at, delta)
-                if n:
-                    print(f"  Updated pivot source range in xl/pivotCaches/{fname}")
-                    total_changes += n
+    total_changes = 0
+    for kind, part, n in shift_parts(work_dir, at, delta, stream=stream, jobs=jobs,
+                                     sheet=sheet, index=index, pretty=not compact):
+        if n:
+            print(SHIFT_MESSAGES[kind].format(n=n, part=part))
+            total_changes += n
 
     print()
     print(f"Total changes: {total_changes}")
     print()
-    print("IMPORTANT: Review named ranges in xl/workbook.xml <definedNames> manually.")
-    print("           Structured table references (Table[@Col]) are NOT updated.")
+    if sheet is None:
+        print("IMPORTANT: Review named ranges in xl/workbook.xml <definedNames> manually.")
+        print("           Structured table references (Table[@Col]) are NOT updated.")
+    else:
+        print("IMPORTANT: Structured table references (Table[@Col]) are NOT updated.")
     print()
     print("Next steps:")
     print("  1. Review the changes above")
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+"""
+xlsx_stream_reader.py — Streaming worksheet reader used by xlsx_reader.py.
+
+Reads worksheets straight out of the .xlsx zip instead of going through
+openpyxl's object model:
+
+    - workbook.xml, its rels and styles.xml are read once when the workbook
+      is opened (sheet names -> parts, date / duration number formats)
+    - sharedStrings.xml is resolved once, on the first sheet read
+    - only the requested sheet's part is opened; its rows are iterparsed
+      into per-column buffers (plain lists), and every `chunksize` rows the
+      buffers become a DataFrame, so memory is bounded by the chunk size
+    - with nrows, parsing stops after the first N data rows
+
+Cell values follow pd.read_excel (openpyxl engine), so the frames match what
+xlsx_reader.py used to load:
+
+    - row 1 is the header; blank header cells become "Unnamed: <i>" and
+      repeated names "a.1", "a.2"; columns start at A
+    - blank rows are kept as all-NaN rows, trailing blank rows are dropped
+    - integral numbers load as int, other numbers as float; date-formatted
+      numbers as datetime (time for values below one day, timedelta for
+      [h]:mm style formats); booleans as bool; error cells as NaN
+    - text in pandas' default NA set ("", "NA", "#N/A", "null", ...) is NaN,
+      and a text column whose values all parse as numbers becomes numeric;
+      like read_csv's chunks, that inference is made per chunk, so a column
+      holding "3" and "a" in different chunks keeps 3 as a number
+
+A column that first appears after the first chunk (a row wider than every
+row before it) is added from that chunk on; pd.concat fills the earlier
+rows with NaN.
+
+pandas is imported only when frames are built (iter_chunks), so the
+workbook, shared string and row reading also serves stdlib-only callers
+such as formula_eval.py.
+
+Usage (library):
+    from xlsx_stream_reader import XlsxStreamReader
+    with XlsxStreamReader("book.xlsx") as book:
+        book.sheet_names
+        for chunk in book.iter_chunks("Sales", chunksize=100_000, nrows=None):
+            ...
+"""
+
+import datetime as dt
+import math
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+from formula_tokens import col_number
+
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NSP = f"{{{NS_MAIN}}}"
+
+NAN = math.nan
+
+# pandas' default na_values (applied by read_excel to text cells)
+NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+})
+
+# Built-in number formats that are dates / times, and the [h]:mm:ss duration
+BUILTIN_DATE_FORMATS = frozenset(range(14, 23)) | {45, 46, 47}
+BUILTIN_TIMEDELTA_FORMATS = frozenset({46})
+
+# Same tests openpyxl applies to custom format codes
+_LITERAL_OR_LOCALE_RE = re.compile(r'".*?"|\[(?!hh?\]|mm?\]|ss?\])[^\]]*\]')
+_DATE_TOKEN_RE = re.compile(r"(?<![_\\])[dmhysDMHYS]")
+_TIMEDELTA_RE = re.compile(
+    r"\[hh?\](:mm(:ss(\.0*)?)?)?|\[mm?\](:ss(\.0*)?)?|\[ss?\](\.0*)?", re.I)
+
+EPOCH_1900 = dt.datetime(1899, 12, 30)
+EPOCH_1904 = dt.datetime(1904, 1, 1)
+
+
+def is_date_format(code: str) -> bool:
+    code = _LITERAL_OR_LOCALE_RE.sub("", code.split(";")[0])
+    return _DATE_TOKEN_RE.search(code) is not None
+
+
+def is_timedelta_format(code: str) -> bool:
+    return _TIMEDELTA_RE.search(code.split(";")[0]) is not None
+
+
+def from_excel(value: float, epoch: dt.datetime, timedelta: bool = False):
+    """Excel serial -> datetime / time / timedelta, as openpyxl converts it."""
+    if timedelta:
+        td = dt.timedelta(days=value)
+        if td.microseconds:
+            td = dt.timedelta(seconds=td.total_seconds() // 1,
+                              microseconds=round(td.microseconds, -3))
+        return td
+    day, fraction = divmod(value, 1)
+    diff = dt.timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        minutes, seconds = divmod(diff.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return dt.time(hours, minutes, seconds, diff.microseconds)
+    if 0 < value < 60 and epoch == EPOCH_1900:
+        day += 1   # Excel's phantom 29 Feb 1900
+    return epoch + dt.timedelta(days=day) + diff
+
+
+def element_text(elem: ET.Element) -> str:
+    """Plain text of an <si> / <is> element: <t>, or its <r><t> runs (not <rPh>)."""
+    t = elem.find(f"{NSP}t")
+    if t is not None:
+        return t.text or ""
+    return "".join(r.findtext(f"{NSP}t", "") for r in elem.findall(f"{NSP}r"))
+
+
+def header_names(values: list) -> list:
+    """Column labels from the header row, deduplicated the way read_excel does."""
+    names, counts = [], {}
+    for i, col in enumerate(values):
+        if col is None or (isinstance(col, float) and math.isnan(col)):
+            col = f"Unnamed: {i}"
+        cur_count = counts.get(col, 0)
+        while cur_count > 0:
+            counts[col] = cur_count + 1
+            col = f"{col}.{cur_count}"
+            cur_count = counts.get(col, 0)
+        names.append(col)
+        counts[col] = cur_count + 1
+    return names
+
+
+class XlsxStreamReader:
+    """Sheet-at-a-time, chunked reader over one .xlsx / .xlsm file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        try:
+            self._read_workbook()
+            self._read_styles()
+        except Exception:
+            self.zip.close()
+            raise
+        self._strings = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self.zip.close()
+
+    def _read_workbook(self) -> None:
+        wb = ET.fromstring(self.zip.read("xl/workbook.xml"))
+        pr = wb.find(f"{NSP}workbookPr")
+        date1904 = pr is not None and pr.get("date1904", "").lower() in ("1", "true")
+        self.epoch = EPOCH_1904 if date1904 else EPOCH_1900
+
+        rels = ET.fromstring(self.zip.read("xl/_rels/workbook.xml.rels"))
+        targets = {}
+        for rel in rels.iter(f"{{{NS_PKG_REL}}}Relationship"):
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            targets[rel.get("Id", "")] = target
+
+        # {sheet name: worksheet part}, in workbook order (chartsheets skipped)
+        self.sheets = {}
+        for sheet in wb.iter(f"{NSP}sheet"):
+            part = targets.get(sheet.get(f"{{{NS_REL}}}id", ""), "")
+            if "worksheets/" in part:
+                self.sheets[sheet.get("name", "")] = part
+
+    def _read_styles(self) -> None:
+        """Indexes of cellXfs whose number format is a date, and a duration."""
+        self._date_styles, self._timedelta_styles = set(), set()
+        try:
+            root = ET.fromstring(self.zip.read("xl/styles.xml"))
+        except KeyError:
+            return
+        custom = {int(nf.get("numFmtId", "0")): nf.get("formatCode", "")
+                  for nf in root.iter(f"{NSP}numFmt")}
+        xfs = root.find(f"{NSP}cellXfs")
+        for i, xf in enumerate(xfs if xfs is not None else []):
+            fid = int(xf.get("numFmtId", "0"))
+            if fid in custom:
+                if is_date_format(custom[fid]):
+                    self._date_styles.add(i)
+                    if is_timedelta_format(custom[fid]):
+                        self._timedelta_styles.add(i)
+            elif fid in BUILTIN_DATE_FORMATS:
+                self._date_styles.add(i)
+                if fid in BUILTIN_TIMEDELTA_FORMATS:
+                    self._timedelta_styles.add(i)
+
+    @property
+    def sheet_names(self) -> list:
+        return list(self.sheets)
+
+    def shared_strings(self) -> list:
+        """The shared string table, parsed once per workbook."""
+        if self._strings is None:
+            self._strings = []
+            try:
+                src = self.zip.open("xl/sharedStrings.xml")
+            except KeyError:
+                return self._strings
+            with src:
+                for _, elem in ET.iterparse(src):
+                    if elem.tag == f"{NSP}si":
+                        self._strings.append(element_text(elem).replace("x005F_", ""))
+                        elem.clear()
+        return self._strings
+
+    def _value(self, c: ET.Element, strings: list):
+        """
+        Cell value as openpyxl hands it to read_excel; None for an empty
+        cell. NA_STRINGS are applied later, to data rows only.
+        """
+        t = c.get("t", "n")
+        if t == "inlineStr":
+            inline = c.find(f"{NSP}is")
+            value = element_text(inline) if inline is not None else None
+        else:
+            value = c.findtext(f"{NSP}v") or None
+            if value is None:
+                return None
+            if t == "n":
+                value = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+                style = int(c.get("s", "0"))
+                if style in self._date_styles:
+                    try:
+                        return from_excel(value, self.epoch, style in self._timedelta_styles)
+                    except (OverflowError, ValueError):
+                        return NAN
+                if isinstance(value, float) and value.is_integer():
+                    return int(value)
+                return value
+            if t == "s":
+                value = strings[int(value)]
+            elif t == "b":
+                return bool(int(value))
+            elif t == "e":
+                return NAN
+            elif t == "d":
+                return dt.datetime.fromisoformat(value)
+        return value or None
+
+    def iter_rows(self, sheet: str):
+        """Yield (row number, {0-based column: value}) for each non-empty row."""
+        if sheet not in self.sheets:
+            raise ValueError(f"Worksheet named '{sheet}' not found")
+        strings = self.shared_strings()
+        with self.zip.open(self.sheets[sheet]) as src:
+            sheet_data = None
+            row_no = 0
+            for event, elem in ET.iterparse(src, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{NSP}sheetData":
+                        sheet_data = elem
+                    continue
+                if elem.tag != f"{NSP}row":
+                    continue
+                row_no = int(elem.get("r", row_no + 1))
+                values, col = {}, -1
+                for c in elem.iter(f"{NSP}c"):
+                    ref = c.get("r")
+                    col = col_number(ref.rstrip("0123456789")) - 1 if ref else col + 1
+                    value = self._value(c, strings)
+                    if value is not None:
+                        values[col] = value
+                if values:
+                    yield row_no, values
+                elem.clear()
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+    def iter_chunks(self, sheet: str, chunksize: int = 100_000, nrows: int | None = None):
+        """
+        Yield the sheet as DataFrames of up to chunksize rows (see module
+        docstring for the read_excel rules). An empty sheet yields one
+        empty DataFrame.
+        """
+        import pandas as pd
+
+        rows = self.iter_rows(sheet)
+        first = next(rows, None)
+        if first is None:
+            yield pd.DataFrame()
+            return
+        if first[0] == 1:
+            header, pending = first[1], None
+        else:
+            header, pending = {}, first
+        names = header_names([header.get(i) for i in range(max(header, default=-1) + 1)])
+        buffers = [[] for _ in names]
+        count = emitted = 0
+        last_row = 1
+
+        def add_row(values: dict) -> None:
+            nonlocal count
+            width = max(values, default=-1) + 1
+            if width > len(names):
+                names[:] = header_names(names + [None] * (width - len(names)))
+                buffers.extend([NAN] * count for _ in range(width - len(buffers)))
+            for i, buf in enumerate(buffers):
+                value = values.get(i, NAN)
+                if isinstance(value, str) and value in NA_STRINGS:
+                    value = NAN
+                buf.append(value)
+            count += 1
+
+        def flush() -> pd.DataFrame:
+            nonlocal count, emitted, buffers
+            frame = _frame(names, buffers)
+            emitted += count
+            count = 0
+            buffers = [[] for _ in names]
+            return frame
+
+        source = rows if pending is None else _chain(pending, rows)
+        for row_no, values in source:
+            # Blank rows between data rows load as all-NaN rows
+            for _ in range(row_no - last_row - 1):
+                if nrows is not None and emitted + count >= nrows:
+                    break
+                add_row({})
+                if count == chunksize:
+                    yield flush()
+            if nrows is not None and emitted + count >= nrows:
+                break
+            add_row(values)
+            last_row = row_no
+            if count == chunksize:
+                yield flush()
+        if count or not emitted:
+            yield flush()
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def _frame(names: list, buffers: list) -> "pd.DataFrame":
+    """Column buffers -> DataFrame, with read_excel's text-to-number inference."""
+    import pandas as pd
+
+    frame = pd.DataFrame(dict(zip(range(len(names)), buffers)))
+    frame.columns = names
+    for i, buf in enumerate(buffers):
+        if frame.iloc[:, i].dtype.kind != "O":
+            continue
+        # Only text / number / bool columns (bools with gaps become 1.0 / 0.0)
+        if any(not isinstance(v, (str, int, float)) for v in buf):
+            continue
+        converted = pd.to_numeric(frame.iloc[:, i], errors="coerce")
+        if converted.notna().sum() == frame.iloc[:, i].notna().sum():
+            frame.isetitem(i, converted)
+    return frame
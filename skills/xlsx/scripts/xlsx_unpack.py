@@ -5,19 +5,63 @@ xlsx_unpack.py — Unpack an xlsx file into a working directory for XML editing.
 
 Usage:
     python3 xlsx_unpack.py <input.xlsx> <output_dir>
+    python3 xlsx_unpack.py <input.xlsx> <output_dir> --compact
+    python3 xlsx_unpack.py <input.xlsx> <output_dir> --lazy [--compact]
+
+    python3 xlsx_unpack.py fetch <work_dir> <part|glob> [...]     # lazy dirs
+    python3 xlsx_unpack.py inspect <work_dir|input.xlsx> <part> [part ...]
+    python3 xlsx_unpack.py inspect <work_dir> <part> [part ...] --write
 
 What it does:
 1. Unzips the xlsx (which is a ZIP archive)
 2. Pretty-prints all XML and .rels files for readability
 3. Prints a summary of key files to edit
+
+Compact mode (--compact):
+    Skips step 2 and leaves every part exactly as stored in the xlsx.
+    Pretty-printing a large worksheet through minidom takes longer than
+    most edits and holds the whole DOM in memory; pair this with the
+    --compact flag of the editing scripts (xlsx_shift_rows.py,
+    xlsx_insert_row.py, xlsx_add_column.py, xlsx_batch_edit.py) so they
+    write parts back directly as well.
+
+Lazy mode (--lazy):
+    Nothing is extracted up front: only a manifest (.xlsx_lazy.json: source
+    path, member CRCs, parts extracted so far) is written to <output_dir>. A part is extracted and
+    formatted the first time it is needed — by the editing scripts
+    (xlsx_shift_rows.py, xlsx_batch_edit.py and the scripts built on it),
+    style_audit.py, or explicitly with "fetch" before reading or editing a
+    file by hand:
+        python3 xlsx_unpack.py fetch /tmp/work xl/worksheets/sheet1.xml
+        python3 xlsx_unpack.py fetch /tmp/work 'xl/charts/*.xml'
+    Formatted XML parts are kept in a content-addressed cache keyed on the
+    zip member CRC-32 and size ($XLSX_UNPACK_CACHE, default
+    ~/.cache/xlsx_unpack), so re-unpacking an unchanged workbook copies the
+    parts out of the cache without decompressing or pretty-printing again.
+    Media and other binary parts are never extracted unless fetched;
+    xlsx_pack.py copies every part that was never extracted straight from the
+    source xlsx; deleting an extracted part removes it from the package.
+
+inspect:
+    Pretty-prints the named parts on demand, e.g. xl/worksheets/sheet1.xml,
+    from an unpacked directory or straight from an xlsx. Output goes to
+    stdout; with --write the files in the working directory are
+    re-indented in place instead (for grep/line-based review).
 """
 
 import sys
 import zipfile
 import os
+import json
 import shutil
+import tempfile
+import fnmatch
 import xml.dom.minidom
 
+LAZY_MANIFEST = ".xlsx_lazy.json"
+CACHE_DIR = os.environ.get("XLSX_UNPACK_CACHE") or os.path.join(
+    os.path.expanduser("~"), ".cache", "xlsx_unpack")
+
 
 def pretty_print_xml(content: bytes) -> str:
     """Pretty-print XML bytes. Returns original content on parse failure."""
@@ -31,7 +75,102 @@ def pretty_print_xml(content: bytes) -> str:
         return content.decode("utf-8", errors="replace")
 
 
-def unpack(xlsx_path: str, output_dir: str) -> None:
+def _is_xml_part(name: str) -> bool:
+    return name.endswith(".xml") or name.endswith(".rels")
+
+
+def _cached_part(z: zipfile.ZipFile, info: zipfile.ZipInfo, pretty: bool) -> bytes:
+    """
+    Bytes of a member as it should appear in the working directory. XML parts
+    are formatted once and kept in CACHE_DIR under their CRC-32/size; other
+    parts are read straight from the zip.
+    """
+    if not _is_xml_part(info.filename):
+        return z.read(info)
+    key = f"{info.CRC:08x}-{info.file_size}-{'pretty' if pretty else 'raw'}"
+    cache_path = os.path.join(CACHE_DIR, key[:2], key)
+    try:
+        with open(cache_path, "rb") as f:
+            return f.read()
+    except OSError:
+        pass
+    data = z.read(info)
+    if pretty:
+        data = pretty_print_xml(data).encode("utf-8")
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Cache is best-effort; the part itself is still returned
+    return data
+
+
+def read_manifest(work_dir: str) -> dict | None:
+    """The lazy-unpack manifest of work_dir, or None for a fully unpacked directory."""
+    try:
+        with open(os.path.join(work_dir, LAZY_MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(work_dir: str, manifest: dict) -> None:
+    """Replace the lazy-unpack manifest of work_dir atomically."""
+    fd, tmp_path = tempfile.mkstemp(dir=work_dir, prefix=LAZY_MANIFEST)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(work_dir, LAZY_MANIFEST))
+
+
+def pending_parts(work_dir: str, manifest: dict) -> list[str]:
+    """
+    Parts of a lazily unpacked work_dir that still live only in the source
+    xlsx: never extracted and not on disk. A part that was extracted and is
+    gone from disk has been deleted and is not pending.
+    """
+    extracted = set(manifest.get("extracted", ()))
+    return [name for name in manifest["members"]
+            if name not in extracted
+            and not os.path.exists(os.path.join(work_dir, *name.split("/")))]
+
+
+def materialize(work_dir: str, patterns: list[str] | None = None) -> list[str]:
+    """
+    Extract the parts of a lazily unpacked work_dir that match any of the
+    fnmatch patterns (all parts if None) and are not on disk yet. Parts
+    already on disk are never overwritten, so edits are kept, and parts
+    deleted after extraction stay deleted. Returns the parts written; a
+    no-op for fully unpacked directories.
+    """
+    manifest = read_manifest(work_dir)
+    if manifest is None:
+        return []
+    pending = [
+        name for name in pending_parts(work_dir, manifest)
+        if patterns is None
+        or any(name == p or fnmatch.fnmatchcase(name, p) for p in patterns)
+    ]
+    if not pending:
+        return []
+    with zipfile.ZipFile(manifest["source"], "r") as z:
+        for name in pending:
+            info = z.getinfo(name)
+            if [info.CRC, info.file_size] != manifest["members"][name]:
+                raise ValueError(f"{manifest['source']} changed since it was unpacked "
+                                 f"({name}); unpack it again")
+            fpath = os.path.join(work_dir, *name.split("/"))
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+            with open(fpath, "wb") as f:
+                f.write(_cached_part(z, info, manifest["pretty"]))
+    manifest["extracted"] = sorted(set(manifest.get("extracted", ())) | set(pending))
+    write_manifest(work_dir, manifest)
+    return pending
+
+
+def unpack(xlsx_path: str, output_dir: str, compact: bool = False, lazy: bool = False) -> None:
     if not os.path.isfile(xlsx_path):
         print(f"ERROR: File not found: {xlsx_path}", file=sys.stderr)
         sys.exit(1)
@@ -52,27 +191,44 @@ def unpack(xlsx_path: str, output_dir: str) -> None:
                     print(f"ERROR: Zip entry '{member}' would escape target directory (path traversal blocked)", file=sys.stderr)
                     shutil.rmtree(output_dir, ignore_errors=True)
                     sys.exit(1)
-            z.extractall(output_dir)
+            if lazy:
+                manifest = {
+                    "source": os.path.abspath(xlsx_path),
+                    "pretty": not compact,
+                    "members": {info.filename: [info.CRC, info.file_size]
+                                for info in z.infolist() if not info.is_dir()},
+                    "extracted": [],
+                }
+                write_manifest(output_dir, manifest)
+            else:
+                z.extractall(output_dir)
     except zipfile.BadZipFile:
         shutil.rmtree(output_dir, ignore_errors=True)
         print(f"ERROR: '{xlsx_path}' is not a valid ZIP/xlsx file", file=sys.stderr)
         sys.exit(1)
 
-    # Pretty-print XML and .rels files
+    # Pretty-print XML and .rels files (left as stored in compact mode)
     xml_count = 0
-    for dirpath, _, filenames in os.walk(output_dir):
-        for fname in filenames:
-            if fname.endswith(".xml") or fname.endswith(".rels"):
-                fpath = os.path.join(dirpath, fname)
-                with open(fpath, "rb") as f:
-                    raw = f.read()
-                pretty = pretty_print_xml(raw)
-                with open(fpath, "w", encoding="utf-8") as f:
-                    f.write(pretty)
-                xml_count += 1
+    if not compact and not lazy:
+        for dirpath, _, filenames in os.walk(output_dir):
+            for fname in filenames:
+                if fname.endswith(".xml") or fname.endswith(".rels"):
+                    fpath = os.path.join(dirpath, fname)
+                    with open(fpath, "rb") as f:
+                        raw = f.read()
+                    pretty = pretty_print_xml(raw)
+                    with open(fpath, "w", encoding="utf-8") as f:
+                        f.write(pretty)
+                    xml_count += 1
 
     print(f"Unpacked '{xlsx_path}' → '{output_dir}'")
-    print(f"Pretty-printed {xml_count} XML/rels files\n")
+    if lazy:
+        print(f"Lazy mode: {len(manifest['members'])} parts listed in {LAZY_MANIFEST}, "
+              "extracted on first use (xlsx_unpack.py fetch)\n")
+    elif compact:
+        print("Compact mode: XML left as stored (use 'xlsx_unpack.py inspect' to view)\n")
+    else:
+        print(f"Pretty-printed {xml_count} XML/rels files\n")
 
     # Print key files grouped by category
     categories = {
@@ -82,14 +238,18 @@ def unpack(xlsx_path: str, output_dir: str) -> None:
         "Worksheets": [],
     }
 
-    all_files = []
-    for dirpath, _, filenames in os.walk(output_dir):
-        for fname in filenames:
-            rel = os.path.relpath(os.path.join(dirpath, fname), output_dir)
-            all_files.append(rel)
+    # Part path -> size (uncompressed size from the manifest in lazy mode)
+    sizes = {}
+    if lazy:
+        sizes = {name: size for name, (_, size) in manifest["members"].items()}
+    else:
+        for dirpath, _, filenames in os.walk(output_dir):
+            for fname in filenames:
+                full = os.path.join(dirpath, fname)
+                sizes[os.path.relpath(full, output_dir).replace(os.sep, "/")] = os.path.getsize(full)
 
     # Collect worksheets
-    for rel in sorted(all_files):
+    for rel in sorted(sizes):
         if rel.startswith("xl/worksheets/") and rel.endswith(".xml"):
             categories["Worksheets"].append(rel)
 
@@ -99,10 +259,8 @@ def unpack(xlsx_path: str, output_dir: str) -> None:
             continue
         print(f"\n  [{category}]")
         for f in files:
-            full = os.path.join(output_dir, f)
-            if os.path.isfile(full):
-                size = os.path.getsize(full)
-                print(f"    {f}  ({size:,} bytes)")
+            if f in sizes:
+                print(f"    {f}  ({sizes[f]:,} bytes)")
             else:
                 print(f"    {f}  (not found)")
 
@@ -115,16 +273,87 @@ def unpack(xlsx_path: str, output_dir: str) -> None:
     print("\n  [High-risk content detected:]")
     found_any = False
     for path, warning in risky.items():
-        full = os.path.join(output_dir, path)
-        if os.path.exists(full):
+        if any(rel == path or rel.startswith(path + "/") for rel in sizes):
             print(f"    ⚠️  {path} — {warning}")
             found_any = True
     if not found_any:
         print("    ✓ None (safe to edit)")
 
 
+def inspect(source: str, parts: list[str], write: bool = False) -> int:
+    """
+    Pretty-print parts of an unpacked directory or an xlsx file. Prints to
+    stdout, or re-indents the files in place with write=True (directories
+    only). Returns the number of parts not found.
+    """
+    missing = 0
+    z = zipfile.ZipFile(source, "r") if os.path.isfile(source) else None
+    try:
+        for part in parts:
+            part = part.replace(os.sep, "/").lstrip("/")
+            if z is not None:
+                try:
+                    raw = z.read(part)
+                except KeyError:
+                    raw = None
+            else:
+                materialize(source, [part])
+                fpath = os.path.join(source, *part.split("/"))
+                raw = None
+                if os.path.isfile(fpath):
+                    with open(fpath, "rb") as f:
+                        raw = f.read()
+            if raw is None:
+                print(f"ERROR: Part not found: {part}", file=sys.stderr)
+                missing += 1
+                continue
+            pretty = pretty_print_xml(raw)
+            if write:
+                with open(os.path.join(source, *part.split("/")), "w", encoding="utf-8") as f:
+                    f.write(pretty)
+                print(f"Pretty-printed {part}")
+            else:
+                if len(parts) > 1:
+                    print(f"── {part} ──")
+                sys.stdout.write(pretty)
+    finally:
+        if z is not None:
+            z.close()
+    return missing
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: xlsx_unpack.py <input.xlsx> <output_dir>")
+    args = [a for a in sys.argv[1:] if a not in ("--compact", "--write", "--lazy")]
+    if len(args) >= 3 and args[0] == "fetch":
+        if read_manifest(args[1]) is None:
+            print(f"ERROR: {args[1]} is not a lazily unpacked directory", file=sys.stderr)
+            sys.exit(1)
+        try:
+            fetched = materialize(args[1], args[2:])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        for part in fetched:
+            print(f"Fetched {part}")
+        if not fetched:
+            print("Nothing to fetch (no matching parts, or already on disk)")
+        sys.exit(0)
+    if len(args) >= 3 and args[0] == "inspect":
+        write = "--write" in sys.argv
+        if write and not os.path.isdir(args[1]):
+            print("ERROR: --write needs an unpacked directory", file=sys.stderr)
+            sys.exit(1)
+        if not os.path.exists(args[1]):
+            print(f"ERROR: Not found: {args[1]}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            sys.exit(1 if inspect(args[1], args[2:], write=write) else 0)
+        except zipfile.BadZipFile:
+            print(f"ERROR: '{args[1]}' is not a valid ZIP/xlsx file", file=sys.stderr)
+            sys.exit(1)
+    if len(args) != 2:
+        print("Usage: xlsx_unpack.py <input.xlsx> <output_dir> [--compact] [--lazy]\n"
+              "       xlsx_unpack.py fetch <work_dir> <part|glob> [...]\n"
+              "       xlsx_unpack.py inspect <work_dir|input.xlsx> <part> [part ...] [--write]")
         sys.exit(1)
-    unpack(sys.argv[1], sys.argv[2])
+    unpack(args[0], args[1], compact="--compact" in sys.argv, lazy="--lazy" in sys.argv)